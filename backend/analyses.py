@@ -0,0 +1,92 @@
+"""Separate storage for full AI analysis results.
+
+Moderation and enhancement outputs (reasoning text, keywords, scores and, on
+parse failures, the raw model response) are several times the size of the
+confession itself. They live in the ``analyses`` collection keyed by the
+confession or reply id, read only when a client asks for them. Confession and
+reply documents keep just the compact fields that queries filter and sort on:
+``mood``, ``tags``, ``crisis_level`` and the ``moderation`` flags.
+
+Analyses are never archived: the id key is the same whether the confession is
+in the hot collection or its archive.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+KINDS = {"confessions": "confession", "replies": "reply",
+         "confessions_archive": "confession", "replies_archive": "reply"}
+
+
+def compact_fields(analysis: Dict[str, Any], kind: str) -> Dict[str, Any]:
+    """The fields a document derives from its analysis, as create_confession / create_reply set them"""
+    moderation = analysis.get("moderation") or {}
+    fields = {
+        "crisis_level": moderation.get("crisis_level", "none"),
+        "moderation": {
+            "flagged": moderation.get("recommended_action") == "flag",
+            "reviewed": False,
+            "approved": moderation.get("recommended_action") == "approve"
+        }
+    }
+    mood = (analysis.get("enhancement") or {}).get("mood")
+    if kind == "confession" and mood:
+        fields["mood"] = mood
+    return fields
+
+
+class AnalysisStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def _doc(subject_id: str, kind: str, analysis: Dict[str, Any]) -> dict:
+        return {"_id": subject_id, "kind": kind, "analysis": analysis, "created_at": datetime.utcnow()}
+
+    async def save(self, subject_id: str, kind: str, analysis: Dict[str, Any]):
+        await self.collection.replace_one({"_id": subject_id}, self._doc(subject_id, kind, analysis), upsert=True)
+
+    async def save_many(self, items: List[tuple], overwrite: bool = True):
+        """Store ``(subject_id, kind, analysis)`` items; with ``overwrite=False`` existing analyses are kept"""
+        if not items:
+            return
+        update = "$set" if overwrite else "$setOnInsert"
+        requests = []
+        for subject_id, kind, analysis in items:
+            doc = self._doc(subject_id, kind, analysis)
+            del doc["_id"]  # comes from the filter on insert
+            requests.append(UpdateOne({"_id": subject_id}, {update: doc}, upsert=True))
+        await self.collection.bulk_write(requests, ordered=False)
+
+    async def get(self, subject_id: str) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one({"_id": subject_id}, {"analysis": 1})
+        return doc["analysis"] if doc else None
+
+    async def migrate(self, db, collection: str, batch_size: int = 500) -> int:
+        """Move embedded ``ai_analysis`` out of ``collection``; safe to rerun after an interruption"""
+        kind = KINDS[collection]
+        moved = 0
+        while True:
+            docs = await db[collection].find(
+                {"ai_analysis": {"$exists": True}},
+                {"id": 1, "ai_analysis": 1, "crisis_level": 1, "moderation": 1, "mood": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                break
+            # Analyses are stored before the source field is removed, so a crash loses nothing
+            await self.save_many([(doc["id"], kind, doc["ai_analysis"]) for doc in docs if doc.get("ai_analysis")],
+                                 overwrite=False)
+            updates = []
+            for doc in docs:
+                missing = {field: value for field, value in compact_fields(doc.get("ai_analysis") or {}, kind).items()
+                           if doc.get(field) is None}
+                update = {"$unset": {"ai_analysis": ""}}
+                if missing:
+                    update["$set"] = missing
+                updates.append(UpdateOne({"_id": doc["_id"]}, update))
+            await db[collection].bulk_write(updates, ordered=False)
+            moved += len(docs)
+            logging.info(f"Moved {moved} analyses out of {collection}")
+        return moved
@@ -0,0 +1,121 @@
+"""Hot/cold split for old confessions.
+
+Confessions older than the archive age move, together with their replies and
+votes, from the hot collections into ``<name>_archive`` collections with the
+same documents and a small set of lookup indexes. Feed, trending, search and
+stats queries keep running over the hot collections only, so their working set
+and indexes stay bounded; direct lookups (``get_confession``,
+``verify_transaction``, ``get_replies``) fall through to the archive.
+
+A thread moves as a unit, keyed by the confession's age: a recent reply to an
+old confession is archived with it. Replies and votes move before the
+confession and are swept again after it, once the thread is read-only, so
+nothing written in between is left behind. Every document is copied before it
+is deleted, so an interrupted run leaves at most duplicates that the next run
+copies again (by id) and removes.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+ARCHIVE_SUFFIX = "_archive"
+ARCHIVED_COLLECTIONS = ("confessions", "replies", "votes", "reply_votes")
+
+
+def archive_name(collection: str) -> str:
+    return f"{collection}{ARCHIVE_SUFFIX}"
+
+
+async def find_with_archive(db, collection: str, query: dict, projection: Optional[dict] = None) -> Tuple[Optional[dict], bool]:
+    """Look a document up in the hot collection, then its archive; returns (document, archived)"""
+    doc = await db[collection].find_one(query, projection)
+    if doc is not None:
+        return doc, False
+    doc = await db[archive_name(collection)].find_one(query, projection)
+    return doc, doc is not None
+
+
+class Archiver:
+    def __init__(self, db, max_age: timedelta, batch_size: int = 500):
+        self.db = db
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.last_run: Optional[dict] = None
+
+    def eligible(self, now: Optional[datetime] = None) -> dict:
+        # Confessions still waiting for their Irys upload stay hot until the upload queue fills in tx_id
+        cutoff = (now or datetime.utcnow()) - self.max_age
+        return {"timestamp": {"$lt": cutoff}, "tx_id": {"$ne": None}}
+
+    async def run(self, now: Optional[datetime] = None, on_archived: Optional[Callable[[List[dict]], None]] = None) -> Dict[str, int]:
+        """Archive every eligible confession in batches; returns documents moved per collection"""
+        moved = {name: 0 for name in ARCHIVED_COLLECTIONS}
+        query = self.eligible(now)
+        while True:
+            confessions = await self.db.confessions.find(query).sort("timestamp", 1).to_list(length=self.batch_size)
+            if not confessions:
+                break
+            for name, count in (await self.archive_batch(confessions)).items():
+                moved[name] += count
+            if on_archived:
+                on_archived(confessions)
+            if len(confessions) < self.batch_size:
+                break
+        self.last_run = {"finished_at": datetime.utcnow().isoformat(), "moved": moved}
+        if moved["confessions"]:
+            logging.info(f"Archived {moved['confessions']} confessions, {moved['replies']} replies, "
+                         f"{moved['votes'] + moved['reply_votes']} votes")
+        return moved
+
+    async def archive_batch(self, confessions: List[dict]) -> Dict[str, int]:
+        confession_ids = [c["id"] for c in confessions]
+        reply_ids: List[str] = []
+        moved = await self._sweep(confession_ids, reply_ids)
+        # Once the confession leaves the hot collection the routes answer 410 for new replies and votes on
+        # it; sweeping again picks up whatever was written in between, which would otherwise stay in the
+        # hot collection where get_replies, now reading the archive, never sees it
+        moved["confessions"] = await self._move("confessions", confessions)
+        for name, count in (await self._sweep(confession_ids, reply_ids)).items():
+            moved[name] += count
+        return moved
+
+    async def _sweep(self, confession_ids: List[str], reply_ids: List[str]) -> Dict[str, int]:
+        """Move the replies and votes of ``confession_ids`` until a pass finds none; ``reply_ids`` collects
+        the replies moved so far, whose votes are swept on every pass"""
+        moved = {name: 0 for name in ARCHIVED_COLLECTIONS}
+        while True:
+            replies = await self.db.replies.find({"confession_id": {"$in": confession_ids}}).to_list(length=None)
+            votes = await self.db.votes.find({"confession_id": {"$in": confession_ids}}).to_list(length=None)
+            reply_ids.extend(r["id"] for r in replies)
+            reply_votes = (await self.db.reply_votes.find({"reply_id": {"$in": reply_ids}}).to_list(length=None)
+                           if reply_ids else [])
+            batches = (("reply_votes", reply_votes), ("votes", votes), ("replies", replies))
+            if not any(docs for _, docs in batches):
+                return moved
+            for name, docs in batches:
+                moved[name] += await self._move(name, docs)
+
+    async def _move(self, name: str, docs: List[dict]) -> int:
+        """Copy ``docs`` to the archive, then delete them from the hot collection; returns the number moved"""
+        if not docs:
+            return 0
+        await self._copy(name, docs)
+        # Deleting one by one returns each document as it was removed, so a vote or counter update that
+        # landed after the copy is copied again instead of lost
+        deleted = await asyncio.gather(*(self.db[name].find_one_and_delete({"_id": doc["_id"]}) for doc in docs))
+        await self._copy(name, [doc for doc, copied in zip(deleted, docs) if doc is not None and doc != copied])
+        return len(docs)
+
+    async def _copy(self, name: str, docs: List[dict]):
+        if not docs:
+            return
+        # _id is kept, so copying the same batch again replaces rather than duplicates
+        await self.db[archive_name(name)].bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False
+        )
+
+    async def counts(self) -> Dict[str, int]:
+        return {name: await self.db[archive_name(name)].estimated_document_count() for name in ARCHIVED_COLLECTIONS}
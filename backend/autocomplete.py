@@ -0,0 +1,86 @@
+"""Prefix index for tag and username autocomplete.
+
+A character trie where every node caches the top-K terms of its subtree by
+popularity weight, so a lookup costs O(len(prefix)) regardless of how many
+terms share the prefix. Weight updates recompute the cached top-K along the
+term's path only.
+"""
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_TOP_K = 10
+
+
+def _rank(entry: Tuple[float, str]):
+    # Highest weight first, alphabetical among ties
+    return -entry[0], entry[1]
+
+
+class _Node:
+    __slots__ = ("children", "term", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.term: Optional[str] = None
+        self.top: List[Tuple[float, str]] = []
+
+
+class PrefixIndex:
+    def __init__(self, top_k: int = DEFAULT_TOP_K):
+        self.top_k = top_k
+        self.root = _Node()
+        self.weights: Dict[str, float] = {}
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __contains__(self, term: str):
+        return term in self.weights
+
+    def _path(self, key: str, create: bool) -> List[_Node]:
+        node = self.root
+        path = [node]
+        for ch in key:
+            child = node.children.get(ch)
+            if child is None:
+                if not create:
+                    return []
+                child = node.children[ch] = _Node()
+            node = child
+            path.append(node)
+        return path
+
+    def _refresh(self, node: _Node):
+        candidates = [entry for child in node.children.values() for entry in child.top]
+        if node.term is not None:
+            candidates.append((self.weights[node.term], node.term))
+        node.top = heapq.nsmallest(self.top_k, candidates, key=_rank)
+
+    def add(self, term: str, delta: float = 1.0):
+        """Add ``delta`` to a term's weight, inserting it if new (weights never go below 0)"""
+        if not term:
+            return
+        path = self._path(term.lower(), create=True)
+        leaf = path[-1]
+        if leaf.term is None:
+            leaf.term = term
+        term = leaf.term
+        self.weights[term] = max(0.0, self.weights.get(term, 0.0) + delta)
+
+        for node in reversed(path):
+            self._refresh(node)
+
+    def set(self, term: str, weight: float):
+        """Set a term's weight outright"""
+        if not term:
+            return
+        path = self._path(term.lower(), create=True)
+        current = self.weights.get(path[-1].term or term, 0.0)
+        self.add(term, weight - current)
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_TOP_K) -> List[dict]:
+        """Most popular terms starting with ``prefix`` (case-insensitive)"""
+        path = self._path(prefix.lower(), create=False)
+        if not path:
+            return []
+        return [{"value": term, "weight": weight} for weight, term in path[-1].top[:limit]]
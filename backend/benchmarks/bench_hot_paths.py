@@ -0,0 +1,151 @@
+"""
+pytest-benchmark suite for the pure-Python work done inline on every request:
+reply threading, Claude response parsing, request model validation, JWT
+encode/decode and broadcast payload encoding, each with synthetic data at
+several sizes.
+
+Record a baseline, then compare later runs against it and fail on regressions:
+
+    pytest backend/benchmarks/bench_hot_paths.py --benchmark-autosave
+    pytest backend/benchmarks/bench_hot_paths.py --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Baselines are stored under .benchmarks/ (per machine and Python version), so
+compare runs on the same host that saved them.
+"""
+import json
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Importing server creates a Motor client, which does not connect until first use
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmarks")
+
+import jwt  # noqa: E402
+
+import server  # noqa: E402
+from responses import dumps  # noqa: E402
+
+SIZES = [10, 100, 1000]
+WORDS = "i never told anyone that my family thinks i love my job but secretly i am exhausted".split()
+
+
+def random_text(length: int) -> str:
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(random.choice(WORDS))
+    return " ".join(words)[:length]
+
+
+def make_replies(count: int, thread_ratio: float = 0.6) -> list:
+    """Replies oldest first, as get_replies reads them; ``thread_ratio`` of them answer an earlier reply"""
+    rng = random.Random(count)
+    now = datetime.utcnow()
+    replies = []
+    for i in range(count):
+        parent = replies[rng.randrange(len(replies))]["id"] if replies and rng.random() < thread_ratio else None
+        replies.append({
+            "id": str(uuid.uuid4()),
+            "confession_id": "c1",
+            "parent_reply_id": parent,
+            "content": random_text(120),
+            "author": "anonymous",
+            "timestamp": now + timedelta(seconds=i),
+            "upvotes": i % 9,
+            "downvotes": i % 4,
+        })
+    return replies
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_build_reply_tree(benchmark, count):
+    replies = make_replies(count)
+    # The tree builder mutates its input, so each round gets fresh copies
+    roots = benchmark.pedantic(
+        server.build_reply_tree,
+        setup=lambda: (([dict(reply) for reply in replies],), {}),
+        rounds=200,
+    )
+    assert roots
+
+
+ENHANCEMENT = {
+    "mood": "anxious",
+    "tags": ["work", "stress", "career"],
+    "keywords": ["job", "boss", "deadline"],
+    "viral_score": 0.42,
+    "engagement_prediction": "medium",
+    "category": "work",
+}
+
+
+@pytest.mark.parametrize("keywords", [3, 30, 300])
+def test_parse_analysis_response(benchmark, keywords):
+    response = "  " + json.dumps({**ENHANCEMENT, "keywords": [random_text(12) for _ in range(keywords)]}) + "\n"
+    result = benchmark(server.parse_analysis_response, response)
+    assert "error" not in result
+
+
+@pytest.mark.parametrize("length", [100, 1000, 10000])
+def test_parse_analysis_response_fallback(benchmark, length):
+    # Claude sometimes wraps the JSON in prose; parsing fails and the raw text is kept
+    response = "Here is the analysis: " + random_text(length)
+    result = benchmark(server.parse_analysis_response, response)
+    assert result["error"] == "Failed to parse AI response"
+
+
+@pytest.mark.parametrize("length", [20, 140, 280])
+def test_confession_create(benchmark, length):
+    payload = {"content": "  " + random_text(length - 4) + "  ", "tags": ["work", "family", "secrets"], "is_public": True}
+    confession = benchmark(server.ConfessionCreate, **payload)
+    assert len(confession.content) <= 280
+
+
+@pytest.mark.parametrize("length", [20, 140, 280])
+def test_reply_create(benchmark, length):
+    reply = benchmark(server.ReplyCreate, content=random_text(length), parent_reply_id=str(uuid.uuid4()))
+    assert reply.content
+
+
+def test_create_access_token(benchmark):
+    token = benchmark(server.create_access_token, {"sub": "someone"}, timedelta(minutes=30))
+    assert token
+
+
+def test_decode_access_token(benchmark):
+    token = server.create_access_token({"sub": "someone"}, timedelta(minutes=30))
+    payload = benchmark(jwt.decode, token, server.JWT_SECRET, algorithms=[server.JWT_ALGORITHM])
+    assert payload["sub"] == "someone"
+
+
+def broadcast_payload(tags: int) -> dict:
+    return {
+        "type": "new_confession",
+        "confession": {
+            "id": str(uuid.uuid4()),
+            "content": random_text(280),
+            "author": "anonymous",
+            "timestamp": datetime.utcnow().isoformat(),
+            "upvotes": 0,
+            "mood": "anxious",
+            "tags": [random_text(10) for _ in range(tags)],
+        },
+    }
+
+
+@pytest.mark.parametrize("tags", [3, 30, 300])
+def test_broadcast_payload_json(benchmark, tags):
+    # What the routes do today before manager.broadcast
+    assert benchmark(json.dumps, broadcast_payload(tags))
+
+
+@pytest.mark.parametrize("tags", [3, 30, 300])
+def test_broadcast_payload_orjson(benchmark, tags):
+    assert benchmark(dumps, broadcast_payload(tags))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Encode time per feed page: FastAPI's default path (jsonable_encoder + stdlib
+json) versus FastJSONResponse rendering the documents directly.
+
+Usage: python backend/benchmarks/bench_json_encoding.py [--page-size 50] [--rounds 2000]
+"""
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from responses import FastJSONResponse  # noqa: E402
+
+
+def make_confession(i: int) -> dict:
+    """A confession document shaped like the ones stored by create_confession"""
+    now = datetime.utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "tx_id": uuid.uuid4().hex,
+        "content": f"Confession number {i}: " + "I never told anyone this before. " * 6,
+        "is_public": True,
+        "author": "anonymous" if i % 3 else f"user_{i}",
+        "author_id": None if i % 3 else str(uuid.uuid4()),
+        "timestamp": now - timedelta(minutes=i),
+        "verified": True,
+        "gateway_url": f"https://gateway.irys.xyz/{uuid.uuid4().hex}",
+        "upvotes": i * 3,
+        "downvotes": i,
+        "reply_count": i % 7,
+        "view_count": i * 11,
+        "tags": ["work", "family", "secrets"][: 1 + i % 3],
+        "mood": "anxious",
+        "crisis_level": "none",
+        "moderation": {"flagged": False, "reviewed": False, "approved": True},
+        "ai_analysis": {
+            "moderation": {
+                "toxic": False,
+                "spam": False,
+                "personal_info": False,
+                "crisis_level": "none",
+                "crisis_keywords": [],
+                "recommended_action": "approve",
+                "confidence": 0.93,
+                "reasoning": "The confession expresses mild workplace anxiety without harmful content.",
+                "support_resources": False,
+            },
+            "enhancement": {
+                "mood": "anxious",
+                "tags": ["work", "stress", "career"],
+                "keywords": ["job", "boss", "deadline"],
+                "viral_score": 0.41,
+                "engagement_prediction": "medium",
+                "category": "work",
+            },
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    page = {
+        "confessions": [make_confession(i) for i in range(args.page_size)],
+        "count": args.page_size,
+        "offset": 0,
+        "limit": args.page_size,
+    }
+
+    # What FastAPI does for a route returning a dict with the stock JSONResponse
+    def before():
+        return JSONResponse(jsonable_encoder(page)).body
+
+    # Route returning FastJSONResponse directly
+    def after():
+        return FastJSONResponse(page).body
+
+    assert json.loads(before()) == json.loads(after()), "encoders disagree"
+
+    results = {}
+    for name, fn in (("jsonable_encoder+json", before), ("orjson direct", after)):
+        seconds = min(timeit.repeat(fn, number=args.rounds, repeat=5)) / args.rounds
+        results[name] = seconds
+        print(f"{name:>24}: {seconds * 1e6:9.1f} us/page")
+
+    speedup = results["jsonable_encoder+json"] / results["orjson direct"]
+    print(f"{'speedup':>24}: {speedup:9.1f}x ({args.page_size} confessions per page)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Offline load test: boots the API in-process against local stand-ins and drives a
+mixed workload with many concurrent clients.
+
+Stand-ins:
+- MongoDB: a local mongod (--mongo-url, default mongodb://localhost:27017) with a
+  throwaway database that is dropped afterwards
+- Irys: server.run_irys_service is replaced by a fake with configurable latency
+- Claude: server.LlmChat is replaced by a fake returning canned JSON
+
+The report (throughput and p50/p95/p99 per endpoint) is JSON, for regression
+tracking:
+
+    python backend/benchmarks/load_test.py --clients 50 --duration 30 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+MODERATION_RESPONSE = {
+    "toxic": False,
+    "spam": False,
+    "personal_info": False,
+    "crisis_level": "none",
+    "crisis_keywords": [],
+    "recommended_action": "approve",
+    "confidence": 0.95,
+    "reasoning": "Benign personal confession",
+    "support_resources": False,
+}
+MOODS = ["happy", "sad", "anxious", "angry", "excited", "frustrated", "hopeful", "neutral"]
+TAGS = ["work", "family", "love", "school", "friends", "health", "money", "secrets"]
+WORDS = ("i never told anyone that i secretly love my job even though "
+         "everyone thinks i hate it and my family keeps asking why").split()
+
+# Operation -> relative weight in the mixed workload
+WORKLOAD = {
+    "feed": 45,
+    "confession": 15,
+    "vote": 20,
+    "reply": 8,
+    "post": 7,
+    "search": 5,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def random_text(words: int = 12) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def percentile(ordered, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class FakeLlmChat:
+    """Stand-in for emergentintegrations' LlmChat returning canned analysis JSON"""
+    latency = 0.05
+
+    def __init__(self, api_key=None, session_id=None, system_message=""):
+        self.system_message = system_message
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if "moderation" in self.system_message:
+            return json.dumps(MODERATION_RESPONSE)
+        return json.dumps({
+            "mood": random.choice(MOODS),
+            "tags": random.sample(TAGS, 2),
+            "keywords": random.sample(WORDS, 2),
+            "viral_score": round(random.random(), 2),
+            "engagement_prediction": "medium",
+            "category": "personal",
+        })
+
+
+def fake_irys_service(latency: float):
+    async def run_irys_service(request_data):
+        await asyncio.sleep(random.uniform(0.5, 1.5) * latency)
+        if request_data.get("action") != "upload":
+            return {"success": True, "balance": "0", "address": "0x0"}
+        tx_id = uuid.uuid4().hex
+        return {
+            "success": True,
+            "tx_id": tx_id,
+            "gateway_url": f"https://gateway.irys.xyz/{tx_id}",
+            "explorer_url": f"https://devnet.irys.xyz/tx/{tx_id}",
+            "timestamp": int(time.time() * 1000),
+            "verified": True,
+        }
+    return run_irys_service
+
+
+def load_server(args):
+    """Import the app with test configuration and fakes in place"""
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="irys-loadtest-")
+    os.environ.setdefault("JWT_SECRET", "load-test-secret")
+    # The harness is one client IP; don't let per-client budgets throttle it
+    for route_class in ("CONFESSIONS", "REPLIES", "VOTES"):
+        os.environ[f"RATE_LIMIT_{route_class}"] = "1000000/1"
+    os.environ["RATE_LIMIT_STORE"] = "memory"
+
+    import server
+
+    FakeLlmChat.latency = args.llm_latency
+    server.LlmChat = FakeLlmChat
+    server.run_irys_service = fake_irys_service(args.irys_latency)
+    return server
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, name: str, seconds: float, ok: bool):
+        self.samples.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            endpoints[name] = {
+                "requests": len(ordered),
+                "errors": self.errors.get(name, 0),
+                "throughput_rps": round(len(ordered) / elapsed, 2),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        return {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+class Workload:
+    def __init__(self, http, recorder: Recorder, tokens: list):
+        self.http = http
+        self.recorder = recorder
+        self.tokens = tokens
+        self.confession_ids: list = []
+
+    def auth(self) -> dict:
+        if self.tokens and random.random() < 0.5:
+            return {"Authorization": f"Bearer {random.choice(self.tokens)}"}
+        return {}
+
+    async def call(self, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.recorder.record(name, time.perf_counter() - start, ok)
+        return response
+
+    async def post(self):
+        response = await self.call("POST /confessions", "POST", "/api/confessions", headers=self.auth(), json={
+            "content": random_text(),
+            "is_public": random.random() < 0.9,
+            "tags": random.sample(TAGS, 2),
+        })
+        if response is not None and response.status_code == 200:
+            self.confession_ids.append(response.json()["id"])
+
+    async def feed(self):
+        sort_by = random.choice(["timestamp", "timestamp", "upvotes", "reply_count"])
+        await self.call("GET /confessions/public", "GET", "/api/confessions/public",
+                        params={"limit": 20, "offset": random.choice([0, 0, 0, 20, 40]), "sort_by": sort_by})
+
+    async def confession(self):
+        if self.confession_ids:
+            await self.call("GET /confessions/{tx_id}", "GET", f"/api/confessions/{random.choice(self.confession_ids)}")
+
+    async def vote(self):
+        if self.confession_ids:
+            await self.call("POST /confessions/{id}/vote", "POST",
+                            f"/api/confessions/{random.choice(self.confession_ids)}/vote",
+                            json={"vote_type": random.choice(["upvote", "upvote", "downvote"]),
+                                  "user_address": uuid.uuid4().hex})
+
+    async def reply(self):
+        if self.confession_ids:
+            await self.call("POST /confessions/{id}/replies", "POST",
+                            f"/api/confessions/{random.choice(self.confession_ids)}/replies",
+                            headers=self.auth(), json={"content": random_text(8)})
+
+    async def search(self):
+        await self.call("POST /search", "POST", "/api/search",
+                        json={"query": random.choice(WORDS), "limit": 20, "sort_by": "relevance"})
+
+    async def client(self, deadline: float):
+        operations = list(WORKLOAD)
+        weights = [WORKLOAD[name] for name in operations]
+        while time.monotonic() < deadline:
+            await getattr(self, random.choices(operations, weights)[0])()
+
+
+async def websocket_listener(url: str, deadline: float, counts: dict):
+    import websockets
+
+    try:
+        async with websockets.connect(url) as ws:
+            counts["connected"] += 1
+            while time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(ws.recv(), timeout=max(0.01, deadline - time.monotonic()))
+                    counts["messages"] += 1
+                except asyncio.TimeoutError:
+                    break
+    except Exception:
+        counts["failed"] += 1
+
+
+async def run(args) -> dict:
+    import httpx
+    import uvicorn
+
+    server = load_server(args)
+    port = free_port()
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    uvicorn_server = uvicorn.Server(config)
+    serve_task = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+            # Users for authenticated requests
+            tokens = []
+            for i in range(args.users):
+                response = await http.post("/api/auth/register", json={
+                    "username": f"load_{uuid.uuid4().hex[:10]}",
+                    "password": "load-test-password",
+                })
+                if response.status_code == 200:
+                    tokens.append(response.json()["access_token"])
+
+            warmup = Workload(http, Recorder(), tokens)
+            for _ in range(args.seed):
+                await warmup.post()
+
+            recorder = Recorder()
+            workload = Workload(http, recorder, tokens)
+            workload.confession_ids = list(warmup.confession_ids)
+
+            start = time.monotonic()
+            deadline = start + args.duration
+            ws_counts = {"connected": 0, "failed": 0, "messages": 0}
+            listeners = [
+                websocket_listener(f"ws://127.0.0.1:{port}/ws/load-{i}", deadline, ws_counts)
+                for i in range(args.websockets)
+            ]
+            clients = [workload.client(deadline) for _ in range(args.clients)]
+            await asyncio.gather(*listeners, *clients)
+            elapsed = time.monotonic() - start
+    finally:
+        uvicorn_server.should_exit = True
+        await serve_task
+        if not args.keep_db:
+            await server.client.drop_database(args.db_name)
+        server.client.close()
+
+    report = recorder.report(elapsed)
+    report["websocket"] = ws_counts
+    report["config"] = {
+        "clients": args.clients,
+        "duration_seconds": round(elapsed, 2),
+        "websockets": args.websockets,
+        "users": len(tokens),
+        "seed_confessions": args.seed,
+        "llm_latency_ms": args.llm_latency * 1000,
+        "irys_latency_ms": args.irys_latency * 1000,
+        "mongo": args.mongo_url,
+        "workload": WORKLOAD,
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mixed-workload load test for the API")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of measured load")
+    parser.add_argument("--websockets", type=int, default=100, help="Concurrent WebSocket listeners")
+    parser.add_argument("--users", type=int, default=10, help="Registered users for authenticated calls")
+    parser.add_argument("--seed", type=int, default=200, help="Confessions posted before measuring")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mean fake Claude latency (s)")
+    parser.add_argument("--irys-latency", type=float, default=0.1, help="Mean fake Irys latency (s)")
+    parser.add_argument("--mongo-url", default=os.environ.get("LOADTEST_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=f"loadtest_{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--keep-db", action="store_true", help="Don't drop the test database afterwards")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload + "\n")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
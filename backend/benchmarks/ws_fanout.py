@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+WebSocket fan-out benchmark and soak test.
+
+Starts the API in a child process (with the fake Irys and Claude from
+load_test.py, against a throwaway database on a local mongod) so the server's
+memory and event loop are measured apart from the clients. For each connection
+level it opens clients against /ws/{user_id} up to that count, fires bursts of
+confessions and votes, and records:
+
+- end-to-end delivery latency (POST sent -> message received) per message and client
+- fan-out spread (first to last client receiving the same message)
+- server-side broadcast time, from the websocket_broadcast_duration_seconds metric
+- server RSS growth per connection
+- with --slow-readers, how clients that read slowly hold up everyone else
+
+Output is a JSON scaling curve, one row per level:
+
+    python backend/benchmarks/ws_fanout.py --levels 100,1000,2500,5000 --output fanout.json
+    python backend/benchmarks/ws_fanout.py --levels 1000 --slow-readers 0.05 --slow-delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_test import free_port, load_server, percentile  # noqa: E402
+
+CONNECT_BATCH = 200
+
+
+def raise_fd_limit():
+    """Thousands of sockets need more file descriptors than the usual default of 1024"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def rss_bytes(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def latency_summary(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+# Server side (child process)
+
+async def serve(args):
+    import uvicorn
+
+    # Bursts should measure fan-out, not load shedding in front of the fakes
+    for name in ("ANALYSIS_MAX_CONCURRENCY", "ANALYSIS_MAX_QUEUE", "IRYS_MAX_CONCURRENCY", "IRYS_MAX_QUEUE"):
+        os.environ[name] = "10000"
+    server = load_server(args)
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning", backlog=4096)
+    try:
+        await uvicorn.Server(config).serve()
+    finally:
+        if not args.keep_db:
+            await server.client.drop_database(args.db_name)
+        server.client.close()
+
+
+# Client side
+
+class Listener:
+    """One WebSocket client recording when each tagged message arrives"""
+
+    def __init__(self, url: str, slow_delay: float = 0.0):
+        self.url = url
+        self.slow_delay = slow_delay
+        self.received = {}
+        self.ws = None
+        self.task = None
+
+    async def connect(self):
+        import websockets
+
+        self.ws = await websockets.connect(self.url, max_queue=32, open_timeout=60)
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                now = time.perf_counter()
+                key = message_key(json.loads(raw))
+                if key is not None:
+                    self.received[key] = now
+                if self.slow_delay:
+                    await asyncio.sleep(self.slow_delay)
+        except Exception:
+            pass
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+        if self.ws:
+            try:
+                await asyncio.wait_for(self.ws.close(), timeout=1)
+            except Exception:
+                pass
+
+
+def message_key(message: dict):
+    """Identify a broadcast with the request that caused it"""
+    if message.get("type") == "new_confession":
+        return ("confession", message["confession"]["content"])
+    if message.get("type") == "vote_update":
+        return ("vote", message["confession_id"])
+    return None
+
+
+async def broadcast_seconds(http):
+    """Total seconds and count of server-side broadcasts so far"""
+    text = (await http.get("/metrics")).text
+    total = re.search(r"^websocket_broadcast_duration_seconds_sum (\S+)$", text, re.M)
+    count = re.search(r"^websocket_broadcast_duration_seconds_count (\S+)$", text, re.M)
+    return (float(total.group(1)) if total else 0.0, int(count.group(1)) if count else 0)
+
+
+async def fire_burst(http, burst: int, vote_targets: list) -> dict:
+    """Post ``burst`` confessions and ``burst`` votes concurrently; returns message key -> send time"""
+    sent = {}
+
+    async def post_confession():
+        content = f"Fanout probe {uuid.uuid4().hex}"
+        sent[("confession", content)] = time.perf_counter()
+        await http.post("/api/confessions", json={"content": content, "is_public": True})
+
+    async def vote(confession_id: str):
+        sent[("vote", confession_id)] = time.perf_counter()
+        await http.post(f"/api/confessions/{confession_id}/vote",
+                        json={"vote_type": "upvote", "user_address": uuid.uuid4().hex})
+
+    targets = [vote_targets.pop() for _ in range(min(burst, len(vote_targets)))]
+    await asyncio.gather(*(post_confession() for _ in range(burst)), *(vote(t) for t in targets))
+    return sent
+
+
+async def run_level(http, listeners: list, args, vote_targets: list) -> dict:
+    for listener in listeners:
+        listener.received.clear()
+    broadcast_before = await broadcast_seconds(http)
+
+    start = time.perf_counter()
+    sent = {}
+    for _ in range(args.bursts):
+        sent.update(await fire_burst(http, args.burst, vote_targets))
+        await asyncio.sleep(args.burst_interval)
+    burst_seconds = time.perf_counter() - start
+
+    # Wait for fast readers to catch up; slow readers are measured on whatever arrived by then
+    fast = [listener for listener in listeners if not listener.slow_delay]
+    deadline = time.perf_counter() + args.drain_timeout
+    while time.perf_counter() < deadline and any(len(l.received) < len(sent) for l in fast):
+        await asyncio.sleep(0.05)
+    broadcast_after = await broadcast_seconds(http)
+
+    latencies = {"fast": [], "slow": []}
+    missing = {"fast": 0, "slow": 0}
+    spreads = []
+    for key, sent_at in sent.items():
+        arrivals = []
+        for listener in listeners:
+            kind = "slow" if listener.slow_delay else "fast"
+            received_at = listener.received.get(key)
+            if received_at is None:
+                missing[kind] += 1
+                continue
+            latencies[kind].append(received_at - sent_at)
+            arrivals.append(received_at)
+        if arrivals:
+            spreads.append(max(arrivals) - min(arrivals))
+
+    broadcasts = broadcast_after[1] - broadcast_before[1]
+    broadcast_total = broadcast_after[0] - broadcast_before[0]
+    row = {
+        "connections": len(listeners),
+        "slow_readers": len(listeners) - len(fast),
+        "messages": len(sent),
+        "burst_seconds": round(burst_seconds, 3),
+        "delivery": latency_summary(latencies["fast"]),
+        "fanout_spread": latency_summary(spreads),
+        "undelivered": missing["fast"],
+        "server_broadcast_ms_avg": round(broadcast_total / broadcasts * 1000, 3) if broadcasts else None,
+    }
+    if row["slow_readers"]:
+        row["slow_delivery"] = latency_summary(latencies["slow"])
+        row["slow_undelivered"] = missing["slow"]
+    return row
+
+
+async def wait_until_ready(http, process, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if (await http.get("/api/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def run(args) -> dict:
+    import httpx
+
+    port = free_port()
+    command = [sys.executable, __file__, "--serve", "--port", str(port), "--db-name", args.db_name,
+               "--mongo-url", args.mongo_url, "--llm-latency", str(args.llm_latency),
+               "--irys-latency", str(args.irys_latency)] + (["--keep-db"] if args.keep_db else [])
+    process = subprocess.Popen(command)
+    levels = sorted(int(level) for level in args.levels.split(","))
+    listeners = []
+    curve = []
+    try:
+        limits = httpx.Limits(max_connections=args.burst * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as http:
+            await wait_until_ready(http, process)
+
+            # Each vote in a run targets its own confession so its broadcast is identifiable
+            votes_needed = args.burst * args.bursts * len(levels)
+            vote_targets = []
+            for _ in range(0, votes_needed, args.burst):
+                responses = await asyncio.gather(*(
+                    http.post("/api/confessions", json={"content": f"Vote target {uuid.uuid4().hex}", "is_public": True})
+                    for _ in range(args.burst)
+                ))
+                vote_targets.extend(r.json()["id"] for r in responses if r.status_code == 200)
+
+            baseline_rss = rss_bytes(process.pid)
+            for level in levels:
+                while len(listeners) < level:
+                    batch = []
+                    for i in range(len(listeners), min(level, len(listeners) + CONNECT_BATCH)):
+                        # Spread slow readers evenly through the broadcast order
+                        slow = args.slow_readers and i % round(1 / args.slow_readers) == 0
+                        batch.append(Listener(f"ws://127.0.0.1:{port}/ws/fanout-{i}",
+                                              args.slow_delay if slow else 0.0))
+                    await asyncio.gather(*(listener.connect() for listener in batch))
+                    listeners.extend(batch)
+                await asyncio.sleep(1)
+                rss = rss_bytes(process.pid)
+
+                row = await run_level(http, listeners, args, vote_targets)
+                row["server_rss_mb"] = round(rss / 2**20, 1) if rss else None
+                row["rss_per_connection_kb"] = (
+                    round((rss - baseline_rss) / level / 1024, 2) if rss and baseline_rss else None
+                )
+                curve.append(row)
+                print(f"{level:>6} connections: p50 {row['delivery']['p50_ms']}ms, "
+                      f"p99 {row['delivery']['p99_ms']}ms, spread p99 {row['fanout_spread']['p99_ms']}ms",
+                      file=sys.stderr)
+    finally:
+        await asyncio.gather(*(listener.close() for listener in listeners))
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        "config": {
+            "levels": levels,
+            "bursts": args.bursts,
+            "burst_size": args.burst,
+            "slow_readers": args.slow_readers,
+            "slow_delay_seconds": args.slow_delay,
+            "llm_latency_ms": args.llm_latency * 1000,
+            "irys_latency_ms": args.irys_latency * 1000,
+            "mongo": args.mongo_url,
+        },
+        "curve": curve,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket fan-out scaling benchmark")
+    parser.add_argument("--levels", default="100,500,1000,2500,5000", help="Comma-separated connection counts")
+    parser.add_argument("--bursts", type=int, default=5, help="Bursts per level")
+    parser.add_argument("--burst", type=int, default=20, help="Confessions and votes per burst")
+    parser.add_argument("--burst-interval", type=float, default=0.5, help="Seconds between bursts")
+    parser.add_argument("--drain-timeout", type=float, default=30, help="Seconds to wait for delivery")
+    parser.add_argument("--slow-readers", type=float, default=0.0, help="Fraction of clients that read slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="Seconds a slow reader waits per message")
+    parser.add_argument("--llm-latency", type=float, default=0.01, help="Mean fake Claude latency (s)")
+    parser.add_argument("--irys-latency", type=float, default=0.01, help="Mean fake Irys latency (s)")
+    parser.add_argument("--mongo-url", default=os.environ.get("LOADTEST_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=f"fanout_{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--keep-db", action="store_true", help="Don't drop the test database afterwards")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    if args.serve:
+        asyncio.run(serve(args))
+        return
+
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload + "\n")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Bulk import / replay of confessions and replies.
+
+Reads newline-delimited JSON in either of two shapes:
+
+- records as written by ``/api/export/confessions`` and ``/api/export/replies``
+- Irys upload payloads, i.e. ``{"tx_id": ..., "data": {...}, "tags": [...]}``
+  where ``data`` and ``tags`` are what ``IrysService.upload`` was given
+
+Every record is validated with the server's ``Confession`` / ``Reply`` models.
+AI analysis only runs for records that carry neither the analysis nor its
+compact fields (exports carry only the latter); full analyses go to the
+analyses collection. Documents are written with unordered ``bulk_write``
+batches; records whose id already exists are counted as duplicates, so
+replaying a file is idempotent.
+
+Progress is checkpointed (input byte offset and line number after each
+written batch), and a rerun with the same ``--checkpoint`` continues where the
+last run stopped.
+Stats rollups are reconciled at the end; running servers pick imported
+documents up in their search and trending indexes on their next restart.
+
+Usage:
+    python bulk_import.py dump.ndjson --kind confessions --checkpoint import.ckpt
+    python bulk_import.py irys_uploads.ndjson --batch-size 2000 --no-analysis
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from analyses import KINDS as ANALYSIS_KINDS, compact_fields
+from snapshots import read_snapshot, write_snapshot
+
+import server
+from server import Confession, Reply, analyze_content_with_claude
+
+DUPLICATE_KEY = 11000
+KINDS = ("confessions", "replies")
+GATEWAY_URL = "https://gateway.irys.xyz/{tx_id}"
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.analyzed = 0
+        self.started = time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "analyzed": self.analyzed,
+        }
+
+    def load(self, state: dict):
+        for name, value in (state or {}).items():
+            setattr(self, name, value)
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (f"read={self.read} inserted={self.inserted} duplicates={self.duplicates} "
+                f"invalid={self.invalid} analyzed={self.analyzed} ({self.read / elapsed:.0f} records/s)")
+
+
+def irys_tag(tags: list, name: str) -> Optional[str]:
+    for tag in tags or []:
+        if tag.get("name") == name:
+            return tag.get("value")
+    return None
+
+
+def normalize(record: dict, kind: Optional[str]) -> Tuple[str, dict]:
+    """(kind, fields) for an export record or an Irys upload payload"""
+    if isinstance(record.get("data"), dict):
+        tags = record.get("tags") or []
+        kind = kind or {"confession": "confessions", "reply": "replies"}.get(irys_tag(tags, "Content-Type"))
+        fields = dict(record["data"])
+        tx_id = record.get("tx_id") or record.get("id")
+        if tx_id:
+            fields["tx_id"] = tx_id
+            fields.setdefault("gateway_url", record.get("gateway_url") or GATEWAY_URL.format(tx_id=tx_id))
+            fields.setdefault("verified", True)
+            # Irys payloads carry no database id; derive one so replays dedupe
+            fields.setdefault("id", str(uuid.uuid5(uuid.NAMESPACE_URL, tx_id)))
+        if "is_public" not in fields and irys_tag(tags, "Public") is not None:
+            fields["is_public"] = irys_tag(tags, "Public") == "true"
+    else:
+        fields = dict(record)
+        fields.pop("_id", None)
+        fields.pop("children", None)
+        kind = kind or ("replies" if "confession_id" in fields else "confessions")
+    if kind not in KINDS:
+        raise ValueError(f"Cannot tell whether record is a confession or a reply (kind={kind})")
+    return kind, fields
+
+
+def needs_analysis(fields: dict, kind: str) -> bool:
+    analysis = fields.get("ai_analysis")
+    if analysis is None and isinstance(fields.get("moderation"), dict) and "crisis_level" in fields:
+        # Exported documents carry only the compact fields; their full analysis is in the analyses collection
+        return False
+    if not isinstance(analysis, dict) or "moderation" not in analysis:
+        return True
+    if kind == "confessions" and "enhancement" not in analysis:
+        return True
+    return any("error" in (result or {}) for result in analysis.values())
+
+
+async def analyze(fields: dict, kind: str):
+    """Fill in the fields create_confession / create_reply derive from AI analysis"""
+    moderation = await analyze_content_with_claude(fields["content"], "moderation")
+    analysis = {"moderation": moderation}
+    if kind == "confessions":
+        enhancement = await analyze_content_with_claude(fields["content"], "enhancement")
+        analysis["enhancement"] = enhancement
+        fields["mood"] = enhancement.get("mood", fields.get("mood"))
+        fields["tags"] = list(set((fields.get("tags") or []) + enhancement.get("tags", [])))
+    fields["ai_analysis"] = analysis
+    fields.update(compact_fields(analysis, ANALYSIS_KINDS[kind]))
+
+
+def fill_compact_fields(fields: dict, kind: str):
+    """Derive missing crisis_level / moderation / mood from a carried analysis.
+
+    Irys payloads carry the full analysis but not the fields derived from it;
+    model defaults would leave them unmoderated (listed) with no crisis level.
+    """
+    analysis = fields.get("ai_analysis")
+    if not isinstance(analysis, dict):
+        return
+    for field, value in compact_fields(analysis, ANALYSIS_KINDS[kind]).items():
+        if fields.get(field) is None:
+            fields[field] = value
+
+
+async def prepare(line_no: int, raw: bytes, args, stats: ImportStats, semaphore: asyncio.Semaphore):
+    """Validated (kind, document) for one input line, or None if it was rejected"""
+    try:
+        kind, fields = normalize(json.loads(raw), args.kind)
+        if not args.no_analysis and needs_analysis(fields, kind):
+            async with semaphore:
+                await analyze(fields, kind)
+            stats.analyzed += 1
+        else:
+            fill_compact_fields(fields, kind)
+        model = Confession if kind == "confessions" else Reply
+        return kind, model(**fields).dict()
+    except (ValueError, ValidationError, KeyError, TypeError) as e:
+        stats.invalid += 1
+        logging.warning(f"Line {line_no}: skipped invalid record: {str(e)}")
+        return None
+
+
+async def write_batch(database, docs: List[Tuple[str, dict]], stats: ImportStats):
+    # Full analyses go to the analyses collection; existing ones (from an earlier run) are kept
+    found = []
+    for kind, doc in docs:
+        analysis = doc.pop("ai_analysis", None)
+        if analysis:
+            found.append((doc["id"], ANALYSIS_KINDS[kind], analysis))
+    await server.analyses.save_many(found, overwrite=False)
+    
+    for kind in KINDS:
+        requests = [InsertOne(doc) for doc_kind, doc in docs if doc_kind == kind]
+        if not requests:
+            continue
+        try:
+            result = await database[kind].bulk_write(requests, ordered=False)
+            stats.inserted += result.inserted_count
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicates = sum(1 for error in errors if error.get("code") == DUPLICATE_KEY)
+            stats.inserted += e.details.get("nInserted", 0)
+            stats.duplicates += duplicates
+            if duplicates != len(errors):
+                raise
+
+
+async def run(args) -> ImportStats:
+    stats = ImportStats()
+    offset = line_no = 0
+    checkpoint = read_snapshot(args.checkpoint) if args.checkpoint else None
+    if checkpoint and checkpoint.get("input") == str(args.input.resolve()):
+        offset = checkpoint["offset"]
+        # Keeps warnings pointing at the right input line
+        line_no = checkpoint.get("line", 0)
+        stats.load(checkpoint.get("stats"))
+        logging.info(f"Resuming {args.input} at byte {offset} ({stats.line()})")
+
+    semaphore = asyncio.Semaphore(args.analysis_concurrency)
+    database = server.posts_db
+
+    async def flush(lines: List[Tuple[int, bytes]], end_offset: int, end_line: int):
+        prepared = await asyncio.gather(*(prepare(n, raw, args, stats, semaphore) for n, raw in lines))
+        docs = [doc for doc in prepared if doc is not None]
+        if docs and not args.dry_run:
+            await write_batch(database, docs, stats)
+        if args.checkpoint and not args.dry_run:
+            write_snapshot(args.checkpoint, {
+                "input": str(args.input.resolve()),
+                "offset": end_offset,
+                "line": end_line,
+                "stats": stats.as_dict()
+            })
+        logging.info(stats.line())
+
+    with open(args.input, "rb") as f:
+        f.seek(offset)
+        batch: List[Tuple[int, bytes]] = []
+        for raw in iter(f.readline, b""):
+            line_no += 1
+            if not raw.strip():
+                continue
+            stats.read += 1
+            batch.append((line_no, raw))
+            if len(batch) >= args.batch_size:
+                await flush(batch, f.tell(), line_no)
+                batch = []
+        if batch:
+            await flush(batch, f.tell(), line_no)
+
+    if not args.dry_run and stats.inserted:
+        # Imported documents bypass the write-path rollup hooks
+        await server.stats_rollup.reconcile(server.db, hours=None)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import confessions and replies from NDJSON")
+    parser.add_argument("input", type=Path, help="NDJSON file of export records or Irys upload payloads")
+    parser.add_argument("--kind", choices=KINDS, help="Record kind (default: detect per record)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint file to resume from and update")
+    parser.add_argument("--no-analysis", action="store_true", help="Never run AI analysis, even when missing")
+    parser.add_argument("--analysis-concurrency", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true", help="Validate only; write nothing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stats = asyncio.run(run(args))
+    logging.info(f"Import finished: {stats.line()}")
+    server.client.close()
+
+
+if __name__ == "__main__":
+    main()
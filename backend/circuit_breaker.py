@@ -0,0 +1,130 @@
+"""Circuit breakers for upstream dependencies (Claude, the Irys service).
+
+Each call runs under a timeout. Consecutive failures past a threshold open the
+breaker; while open, calls fail immediately with ``CircuitOpenError`` so
+callers can fall back instead of waiting on a struggling upstream. After the
+recovery timeout a limited number of half-open probe calls decide whether to
+close the breaker again or keep it open.
+
+Thresholds are configurable per breaker through ``BREAKER_<NAME>_TIMEOUT``,
+``BREAKER_<NAME>_FAILURES`` and ``BREAKER_<NAME>_RECOVERY`` (seconds).
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, timeout: float = 30.0, failure_threshold: int = 5,
+                 recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        env = f"BREAKER_{name.upper()}"
+        self.name = name
+        self.timeout = float(os.environ.get(f"{env}_TIMEOUT", timeout))
+        self.failure_threshold = int(os.environ.get(f"{env}_FAILURES", failure_threshold))
+        self.recovery_timeout = float(os.environ.get(f"{env}_RECOVERY", recovery_timeout))
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.trips = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.recovery_timeout
+
+    def _admit(self):
+        if self.state == OPEN:
+            remaining = self.recovery_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+            logging.info(f"Circuit {self.name} half-open, probing upstream")
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.recovery_timeout)
+            self.half_open_calls += 1
+
+    def _success(self):
+        if self.state == HALF_OPEN:
+            logging.info(f"Circuit {self.name} closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+
+    def _failure(self, error: str):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+                logging.warning(f"Circuit {self.name} opened after {self.consecutive_failures} failures: {error}")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    async def call(self, fn: Callable[[], Awaitable], failed: Callable[[object], Optional[str]] = lambda result: None):
+        """Run ``fn()`` under the timeout. ``failed(result)`` returns an error message for
+        results that count as failures (for helpers that report errors instead of raising)."""
+        self._admit()
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(fn(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._failure(f"timed out after {self.timeout:g}s")
+            raise
+        except Exception as e:
+            self._failure(str(e))
+            raise
+        except asyncio.CancelledError:
+            # The caller went away; a half-open probe slot must not leak
+            if self.state == HALF_OPEN:
+                self.half_open_calls -= 1
+            raise
+
+        error = failed(result)
+        if error:
+            self._failure(error)
+        else:
+            self._success()
+        return result
+
+    def snapshot(self) -> dict:
+        state = self.state
+        if state == OPEN and not self.is_open:
+            state = HALF_OPEN  # next call will probe
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+            "timeout_seconds": self.timeout,
+            "failure_threshold": self.failure_threshold,
+            "recovery_seconds": self.recovery_timeout,
+        }
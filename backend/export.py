@@ -0,0 +1,104 @@
+"""Streaming NDJSON export.
+
+Documents are read from a Mongo cursor in (timestamp, id) order and written
+one JSON object per line, so memory stays flat however large the export is.
+The ``id`` of the last line received doubles as the resume token: passing it
+back as ``cursor`` continues with the record right after it.
+"""
+import logging
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from responses import dumps
+
+EXPORT_SORT = [("timestamp", 1), ("id", 1)]
+EXPORT_BATCH_SIZE = 1000
+# Bytes buffered before a chunk is handed to the response
+CHUNK_SIZE = 64 * 1024
+# gzip container around a deflate stream
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+VISIBILITIES = ("public", "private", "all")
+COMPRESSIONS = ("gzip",)
+
+
+def export_query(visible: Optional[dict], visibility: str,
+                 date_from: Optional[datetime], date_to: Optional[datetime]) -> dict:
+    """Filter for an export; ``visible`` is what counts as public for the collection"""
+    if visibility not in VISIBILITIES:
+        raise ValueError(f"Unknown visibility: {visibility}")
+    clauses = []
+    if visibility == "public":
+        clauses.append(visible)
+    elif visibility == "private":
+        clauses.append({"$nor": [visible]})
+    if date_from or date_to:
+        timestamp = {}
+        if date_from:
+            timestamp["$gte"] = date_from
+        if date_to:
+            timestamp["$lte"] = date_to
+        clauses.append({"timestamp": timestamp})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def resume_after(query: dict, last: dict) -> dict:
+    """Restrict ``query`` to records sorting after ``last`` in (timestamp, id) order"""
+    after = {"$or": [
+        {"timestamp": {"$gt": last["timestamp"]}},
+        {"timestamp": last["timestamp"], "id": {"$gt": last["id"]}},
+    ]}
+    return {"$and": [query, after]} if query else after
+
+
+def joined_pipeline(query: dict, visibility_query: dict, join: dict) -> list:
+    """Export aggregation for records whose visibility depends on a parent document.
+
+    ``query`` (date range, resume point) is matched first so the (timestamp, id)
+    index drives the scan; the parent from ``join`` (a ``$lookup`` spec) is then
+    attached for ``visibility_query`` and projected away again.
+    """
+    parent = join["as"]
+    return [
+        {"$match": query},
+        {"$sort": dict(EXPORT_SORT)},
+        {"$lookup": join},
+        {"$set": {parent: {"$arrayElemAt": [f"${parent}", 0]}}},
+        {"$match": visibility_query},
+        {"$project": {"_id": 0, parent: 0}},
+    ]
+
+
+async def ndjson_lines(cursor, compress: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Encode cursor documents as NDJSON chunks, optionally gzip-compressed"""
+    if compress is not None and compress not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compress}")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS) if compress == "gzip" else None
+    buffer = bytearray()
+    count = 0
+    try:
+        async for doc in cursor:
+            buffer += dumps(doc)
+            buffer += b"\n"
+            count += 1
+            if len(buffer) >= CHUNK_SIZE:
+                chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                buffer.clear()
+                if chunk:
+                    yield chunk
+    except Exception as e:
+        # Headers are already sent: re-raise so the server aborts the connection instead of
+        # finishing the body (and gzip trailer), which would make a truncated export look complete.
+        # The client resumes from the last id it received.
+        logging.error(f"Export stream aborted after {count} records: {str(e)}")
+        raise
+    finally:
+        await cursor.close()
+
+    if compressor:
+        yield compressor.compress(bytes(buffer)) + compressor.flush()
+    elif buffer:
+        yield bytes(buffer)
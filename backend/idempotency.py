@@ -0,0 +1,136 @@
+"""Idempotency keys for write endpoints.
+
+A request carrying an ``Idempotency-Key`` header runs its handler at most once
+per (scope, client, key). The outcome is stored in a TTL collection and
+replayed to retries. Duplicates that arrive while the first request is still
+running wait for it: in the same process through a shared future, across
+workers by polling the pending record.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+KEY_TTL = timedelta(hours=24)
+# A pending record older than this is assumed to belong to a crashed worker
+PENDING_TIMEOUT = timedelta(minutes=2)
+POLL_INTERVAL = 0.25
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotentResult:
+    def __init__(self, status_code: int, body, request_hash: str, replayed: bool = False):
+        self.status_code = status_code
+        self.body = body
+        self.request_hash = request_hash
+        self.replayed = replayed
+
+
+class IdempotencyStore:
+    def __init__(self, collection, ttl: timedelta = KEY_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, scope: str, key: str, client_id: str, payload,
+                  handler: Callable[[], Awaitable]) -> IdempotentResult:
+        """Run ``handler`` once for this key; later calls get the stored outcome"""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        record_id = f"{scope}:{client_id}:{key}"
+        request_hash = fingerprint(payload)
+
+        inflight = self._inflight.get(record_id)
+        if inflight is not None:
+            result = await asyncio.shield(inflight)
+            return self._replay(result, request_hash)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[record_id] = future
+        try:
+            result = await self._run_once(record_id, request_hash, handler)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting on the future; don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[record_id]
+
+    def _replay(self, result: IdempotentResult, request_hash: str) -> IdempotentResult:
+        if result.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was reused with a different request")
+        return IdempotentResult(result.status_code, result.body, request_hash, replayed=True)
+
+    async def _run_once(self, record_id: str, request_hash: str, handler) -> IdempotentResult:
+        now = datetime.utcnow()
+        pending = {
+            "_id": record_id,
+            "state": "pending",
+            "request_hash": request_hash,
+            "created_at": now,
+            "expires_at": now + self.ttl
+        }
+        while True:
+            try:
+                await self.collection.insert_one(pending)
+                break
+            except DuplicateKeyError:
+                stored = await self._wait_for(record_id)
+                if stored is not None:
+                    result = IdempotentResult(stored["status_code"], stored["body"], stored["request_hash"])
+                    return self._replay(result, request_hash)
+                # The pending record was abandoned or released; claim the key ourselves
+
+        try:
+            body = await handler()
+            status_code = 200
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await self._release(record_id)
+                raise
+            # Client errors are deterministic (e.g. content rejected by moderation): store them too
+            body = {"detail": e.detail}
+            status_code = e.status_code
+        except BaseException:
+            await self._release(record_id)
+            raise
+
+        try:
+            await self.collection.update_one(
+                {"_id": record_id},
+                {"$set": {"state": "done", "status_code": status_code, "body": body}}
+            )
+        except Exception as e:
+            logging.error(f"Failed to store idempotent response for {record_id}: {str(e)}")
+        return IdempotentResult(status_code, body, request_hash)
+
+    async def _wait_for(self, record_id: str) -> Optional[dict]:
+        """Stored record once it completes; None if it disappears or its owner seems dead"""
+        while True:
+            stored = await self.collection.find_one({"_id": record_id})
+            if stored is None:
+                return None
+            if stored["state"] == "done":
+                return stored
+            if datetime.utcnow() - stored["created_at"] > PENDING_TIMEOUT:
+                await self.collection.delete_one({"_id": record_id, "state": "pending"})
+                return None
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _release(self, record_id: str):
+        try:
+            await self.collection.delete_one({"_id": record_id, "state": "pending"})
+        except Exception as e:
+            logging.error(f"Failed to release idempotency key {record_id}: {str(e)}")
@@ -0,0 +1,209 @@
+"""Declarative MongoDB index manifest and query-plan verification.
+
+``ensure_indexes`` diffs ``INDEX_MANIFEST`` against the indexes that already
+exist and creates only the missing ones, one collection per task, concurrently.
+Indexes that exist but are not in the manifest are reported, never dropped.
+``verify_query_plans`` explains each hot query shape and warns when the winning
+plan scans the whole collection or sorts in memory.
+"""
+import asyncio
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+INDEX_MANIFEST: Dict[str, List[IndexModel]] = {
+    "confessions": [
+        IndexModel([("content", TEXT), ("tags", TEXT)], name="content_text_tags_text", background=True),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True, background=True),
+        IndexModel([("tx_id", ASCENDING)], name="tx_id_1", background=True),
+        # Public feed: equality on visibility + moderation, then the sort key
+        IndexModel([("is_public", ASCENDING), ("moderation.approved", ASCENDING), ("timestamp", DESCENDING)],
+                   name="feed_timestamp", background=True),
+        IndexModel([("is_public", ASCENDING), ("moderation.approved", ASCENDING), ("upvotes", DESCENDING)],
+                   name="feed_upvotes", background=True),
+        IndexModel([("is_public", ASCENDING), ("moderation.approved", ASCENDING), ("reply_count", DESCENDING)],
+                   name="feed_reply_count", background=True),
+        IndexModel([("timestamp", DESCENDING)], name="timestamp_-1", background=True),
+        IndexModel([("author", ASCENDING), ("timestamp", DESCENDING)], name="author_timestamp", background=True),
+        IndexModel([("mood", ASCENDING)], name="mood_1", background=True),
+        # Export order, also used to resume from the last exported id
+        IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id", background=True),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_1", unique=True, background=True),
+        IndexModel([("email", ASCENDING)], name="email_1", unique=True, sparse=True, background=True),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True, background=True),
+        IndexModel([("created_at", DESCENDING)], name="created_at_-1", background=True),
+    ],
+    "replies": [
+        IndexModel([("confession_id", ASCENDING), ("timestamp", ASCENDING)],
+                   name="confession_id_timestamp", background=True),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True, background=True),
+        IndexModel([("tx_id", ASCENDING)], name="tx_id_1", sparse=True, background=True),
+        IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id", background=True),
+    ],
+    "votes": [
+        IndexModel([("confession_id", ASCENDING), ("user_identifier", ASCENDING)],
+                   name="confession_id_1_user_identifier_1", unique=True, background=True),
+    ],
+    "reply_votes": [
+        IndexModel([("reply_id", ASCENDING), ("user_identifier", ASCENDING)],
+                   name="reply_id_1_user_identifier_1", unique=True, background=True),
+    ],
+    # Cold tier: only what direct lookups and the archiver's re-copies need
+    "confessions_archive": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True, background=True),
+        IndexModel([("tx_id", ASCENDING)], name="tx_id_1", background=True),
+    ],
+    "replies_archive": [
+        IndexModel([("confession_id", ASCENDING), ("timestamp", ASCENDING)],
+                   name="confession_id_timestamp", background=True),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True, background=True),
+        IndexModel([("tx_id", ASCENDING)], name="tx_id_1", sparse=True, background=True),
+    ],
+    "votes_archive": [
+        IndexModel([("confession_id", ASCENDING)], name="confession_id_1", background=True),
+    ],
+    "reply_votes_archive": [
+        IndexModel([("reply_id", ASCENDING)], name="reply_id_1", background=True),
+    ],
+    "stats": [
+        IndexModel([("kind", ASCENDING), ("hour", ASCENDING)], name="kind_hour", background=True),
+    ],
+    "idempotency_keys": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0, background=True),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0, background=True),
+    ],
+    "pending_uploads": [
+        IndexModel([("next_attempt", ASCENDING), ("created_at", ASCENDING)], name="next_attempt_created_at", background=True),
+    ],
+}
+
+# Not explicitly rejected by moderation. Point bounds (not $ne: False, which splits into two ranges)
+# let the feed indexes merge their sort order instead of sorting in memory
+APPROVED = {"$in": [True, None]}
+# Confessions that show up in public feeds and search
+LISTED = {"is_public": True, "moderation.approved": APPROVED}
+
+# Hot query shapes: (name, collection, filter, sort, limit)
+HOT_QUERIES = [
+    ("feed by timestamp", "confessions", LISTED, [("timestamp", -1)], 50),
+    ("feed by upvotes", "confessions", LISTED, [("upvotes", -1)], 50),
+    ("feed by replies", "confessions", LISTED, [("reply_count", -1)], 50),
+    ("confession by id", "confessions", {"id": "x"}, None, 1),
+    ("confession by id or tx_id", "confessions", {"$or": [{"id": "x"}, {"tx_id": "x"}]}, None, 1),
+    ("confessions by id list", "confessions", {"id": {"$in": ["x", "y"]}}, None, 50),
+    ("trending window", "confessions", dict(LISTED, timestamp={"$gte": 0}), None, 0),
+    ("replies for confession", "replies", {"confession_id": "x"}, [("timestamp", 1)], 50),
+    ("reply by id", "replies", {"id": "x"}, None, 1),
+    ("existing vote", "votes", {"confession_id": "x", "user_identifier": "y"}, None, 1),
+    ("existing reply vote", "reply_votes", {"reply_id": "x", "user_identifier": "y"}, None, 1),
+    ("user by username", "users", {"username": "x"}, None, 1),
+    ("user by id", "users", {"id": "x"}, None, 1),
+    ("confession export", "confessions", LISTED, [("timestamp", 1), ("id", 1)], 0),
+    ("reply export", "replies", {}, [("timestamp", 1), ("id", 1)], 0),
+    ("archive candidates", "confessions", {"timestamp": {"$lt": 0}, "tx_id": {"$ne": None}}, [("timestamp", 1)], 500),
+    ("archived confession by id or tx_id", "confessions_archive", {"$or": [{"id": "x"}, {"tx_id": "x"}]}, None, 1),
+]
+
+
+def _key_signature(key) -> tuple:
+    """Comparable form of an index key; text indexes compare equal regardless of fields"""
+    items = list(key.items()) if hasattr(key, "items") else list(key)
+    if any(direction == "text" for _, direction in items) or ("_fts", "text") in items:
+        return (("_fts", "text"),)
+    return tuple((field, direction) for field, direction in items)
+
+
+async def _apply_collection(collection, models: List[IndexModel]) -> dict:
+    existing = await collection.index_information()
+    existing_keys = {_key_signature(info["key"]): name for name, info in existing.items()}
+    wanted_keys = {_key_signature(model.document["key"]) for model in models}
+
+    missing = [m for m in models if _key_signature(m.document["key"]) not in existing_keys]
+    unmanaged = [
+        name for key, name in existing_keys.items()
+        if name != "_id_" and key not in wanted_keys
+    ]
+    if missing:
+        await collection.create_indexes(missing)
+    return {
+        "created": [m.document["name"] for m in missing],
+        "unmanaged": unmanaged,
+    }
+
+
+async def ensure_indexes(db, manifest: Dict[str, List[IndexModel]] = INDEX_MANIFEST) -> dict:
+    """Create missing manifest indexes concurrently; returns a per-collection report"""
+    names = list(manifest)
+    results = await asyncio.gather(
+        *(_apply_collection(db[name], manifest[name]) for name in names),
+        return_exceptions=True
+    )
+    report = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logging.error(f"Failed to apply indexes on {name}: {str(result)}")
+            report[name] = {"error": str(result)}
+            continue
+        if result["created"]:
+            logging.info(f"Created indexes on {name}: {', '.join(result['created'])}")
+        if result["unmanaged"]:
+            logging.warning(f"Indexes on {name} not in manifest: {', '.join(result['unmanaged'])}")
+        report[name] = result
+    return report
+
+
+def plan_stages(plan: dict) -> List[str]:
+    """Stage names of a winning plan, outermost first, e.g. ['LIMIT', 'FETCH', 'IXSCAN(feed_timestamp)']"""
+    plan = plan.get("queryPlan", plan)  # slot-based engine nests the classic plan
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop(0)
+        stage = node.get("stage", "?")
+        if stage == "IXSCAN" and node.get("indexName"):
+            stage = f"IXSCAN({node['indexName']})"
+        stages.append(stage)
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return stages
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Compact summary of an explain() result"""
+    winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = plan_stages(winning)
+    return {
+        "plan": " <- ".join(stages),
+        "collscan": any(stage == "COLLSCAN" for stage in stages),
+        "in_memory_sort": any(stage in ("SORT", "SORT_KEY_GENERATOR") for stage in stages),
+    }
+
+
+async def verify_query_plans(db, queries=HOT_QUERIES) -> List[dict]:
+    """Explain each hot query shape and warn about collection scans and in-memory sorts"""
+    results = []
+    for name, collection, query, sort, limit in queries:
+        try:
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            summary = summarize_explain(await cursor.explain())
+        except Exception as e:
+            logging.error(f"Failed to explain '{name}': {str(e)}")
+            continue
+
+        summary["query"] = name
+        if summary["collscan"]:
+            logging.warning(f"Hot query '{name}' does a COLLSCAN: {summary['plan']}")
+        if summary["in_memory_sort"]:
+            logging.warning(f"Hot query '{name}' sorts in memory: {summary['plan']}")
+        results.append(summary)
+    return results
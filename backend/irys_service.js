@@ -157,6 +157,11 @@ async function main() {
             }
 
             const request = JSON.parse(inputData);
+            // W3C trace context from the API request that spawned this process
+            const traceId = request.traceparent ? request.traceparent.split('-')[1] : null;
+            if (traceId) {
+                console.log(`🔗 trace ${traceId} action ${request.action}`);
+            }
             let response;
 
             switch (request.action) {
@@ -173,6 +178,9 @@ async function main() {
                     response = { success: false, error: 'Unknown action' };
             }
 
+            if (traceId) {
+                response.trace_id = traceId;
+            }
             console.log(JSON.stringify(response));
         } catch (error) {
             console.log(JSON.stringify({
@@ -0,0 +1,64 @@
+"""Local stand-ins for Claude analysis, used while the Claude circuit is open.
+
+The results have the same shape as the Claude responses, so the write paths
+need no special casing. They fail closed: keywords cannot rule out toxicity,
+so every post is flagged for human review (``moderation.approved`` stays
+False) and stays out of the public feed until a moderator approves it.
+"""
+import re
+from typing import List, Tuple
+
+CRISIS_TERMS = {
+    "critical": ("kill myself", "end my life", "suicide", "want to die", "better off dead"),
+    "high": ("self harm", "self-harm", "cutting myself", "hurt myself", "no reason to live"),
+    "medium": ("hopeless", "can't go on", "cant go on", "worthless", "give up on everything"),
+}
+URL_PATTERN = re.compile(r"https?://|www\.", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{8,}\d")
+HASHTAG_PATTERN = re.compile(r"#(\w{2,30})")
+
+
+def crisis_matches(text: str) -> Tuple[str, List[str]]:
+    lowered = text.lower()
+    for level in ("critical", "high", "medium"):
+        hits = [term for term in CRISIS_TERMS[level] if term in lowered]
+        if hits:
+            return level, hits
+    return "none", []
+
+
+def local_moderation(content: str) -> dict:
+    crisis_level, keywords = crisis_matches(content)
+    spam = len(URL_PATTERN.findall(content)) >= 2
+    personal_info = bool(EMAIL_PATTERN.search(content) or PHONE_PATTERN.search(content))
+    return {
+        "toxic": None,  # unknown without the model
+        "spam": spam,
+        "personal_info": personal_info,
+        "crisis_level": crisis_level,
+        "crisis_keywords": keywords,
+        "recommended_action": "flag",
+        "confidence": 0.3,
+        "reasoning": "Local keyword moderation; AI analysis was unavailable, held for review",
+        "support_resources": crisis_level in ("high", "critical"),
+        "fallback": True
+    }
+
+
+def local_enhancement(content: str) -> dict:
+    # No "mood" key, so the mood the author picked is kept
+    return {
+        "tags": list(dict.fromkeys(tag.lower() for tag in HASHTAG_PATTERN.findall(content)))[:5],
+        "keywords": [],
+        "viral_score": 0.0,
+        "engagement_prediction": "low",
+        "category": "other",
+        "fallback": True
+    }
+
+
+def local_analysis(content: str, analysis_type: str) -> dict:
+    if analysis_type == "enhancement":
+        return local_enhancement(content)
+    return local_moderation(content)
@@ -0,0 +1,123 @@
+"""Event-loop lag monitor and blocking-call detector.
+
+A probe task sleeps for a fixed interval and records how late it wakes up:
+that delay is the scheduling lag every other coroutine sees too. A watchdog
+thread checks the probe's heartbeat, and while the loop is stuck it samples the
+loop thread's stack with ``sys._current_frames``. Stacks are aggregated per
+stall, so each slow-callback event shows which code was holding the loop
+(synchronous bcrypt, a large broadcast, a CPU-heavy rebuild, ...).
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import List, Optional
+
+MAX_STACK_DEPTH = 64
+
+
+def collapse_stack(frame, max_depth: int = MAX_STACK_DEPTH) -> str:
+    """Root-first 'file:function:line;...' form of a frame's stack (flame graph input)"""
+    parts = []
+    while frame is not None and len(parts) < max_depth:
+        code = frame.f_code
+        filename = code.co_filename.rsplit("/", 1)[-1]
+        parts.append(f"{filename}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LoopMonitor:
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, sample_interval: float = 0.01,
+                 window: int = 2000, max_events: int = 50, on_lag=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.on_lag = on_lag
+        self.lags: deque = deque(maxlen=window)
+        self.events: deque = deque(maxlen=max_events)
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start monitoring the running loop; call from inside it"""
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _probe(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if self.on_lag:
+                self.on_lag(lag)
+
+    def _watch(self):
+        stall = None
+        while not self._stopped.wait(self.sample_interval):
+            behind = time.monotonic() - self._heartbeat - self.interval
+            if behind >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                if stall is None:
+                    stall = {"started_at": time.time() - behind, "stacks": Counter()}
+                stall["stacks"][collapse_stack(frame)] += 1
+                del frame
+            elif stall is not None:
+                self._finish(stall)
+                stall = None
+
+    def _finish(self, stall: dict):
+        duration = time.time() - stall["started_at"]
+        samples = sum(stall["stacks"].values())
+        top = stall["stacks"].most_common(5)
+        self.events.append({
+            "started_at": stall["started_at"],
+            "duration_seconds": round(duration, 4),
+            "samples": samples,
+            "stacks": [{"stack": stack, "samples": count} for stack, count in top],
+        })
+        # Innermost frame of the most common stack is usually the culprit
+        culprit = top[0][0].rsplit(";", 1)[-1] if top else "?"
+        logging.warning(f"Event loop blocked for {duration * 1000:.0f}ms in {culprit}")
+
+    def percentiles(self) -> dict:
+        ordered = sorted(self.lags)
+        return {
+            "p50": percentile(ordered, 0.50),
+            "p90": percentile(ordered, 0.90),
+            "p99": percentile(ordered, 0.99),
+            "max": self.max_lag,
+        }
+
+    def snapshot(self, limit: int = 20) -> dict:
+        return {
+            "threshold_seconds": self.threshold,
+            "lag_seconds": {k: round(v, 6) for k, v in self.percentiles().items()},
+            "slow_callbacks": list(self.events)[-limit:][::-1],
+        }
@@ -0,0 +1,263 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters and histograms are sharded per thread: each thread updates its own
+dict without taking a lock, and ``render`` sums the shards when ``/metrics``
+is scraped. The event loop, executor threads running driver callbacks and
+any worker threads therefore never contend on a metric update.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Seconds; tuned for API requests and upstream calls (LLM calls take seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Sharded:
+    """Per-thread shards of ``labels -> value``; only the owning thread writes to a shard"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+            return shard
+
+    def _items(self) -> Iterable[Tuple[tuple, object]]:
+        for shard in list(self._shards):
+            # list() of a dict snapshot is atomic under the GIL
+            yield from list(shard.items())
+
+
+class Counter(_Sharded):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        for labels, value in self._items():
+            totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram(_Sharded):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def merged(self) -> Dict[tuple, list]:
+        merged: Dict[tuple, list] = {}
+        for labels, state in self._items():
+            state = list(state)
+            if labels in merged:
+                merged[labels] = [a + b for a, b in zip(merged[labels], state)]
+            else:
+                merged[labels] = state
+        return merged
+
+    def samples(self) -> Iterable[str]:
+        bounds = self.buckets + (math.inf,)
+        for labels, state in sorted(self.merged().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}"
+
+
+class Gauge:
+    """Value read from a callback at scrape time: ``{labels: value}`` or a bare number"""
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, callback: Callable, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[str]:
+        value = self.callback()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for labels, sample in sorted(value.items()):
+            labels = labels if isinstance(labels, tuple) else (labels,)
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(sample)}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, callback, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            try:
+                lines.extend(metric.samples())
+            except Exception as e:
+                lines.append(f"# error collecting {metric.name}: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+http_latency = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+mongo_latency = REGISTRY.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command"), FAST_BUCKETS)
+mongo_failures = REGISTRY.counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command"))
+claude_latency = REGISTRY.histogram(
+    "claude_analysis_duration_seconds", "Claude analysis latency", ("analysis_type", "outcome"))
+irys_latency = REGISTRY.histogram(
+    "irys_service_duration_seconds", "Irys service call latency", ("action", "outcome"))
+websocket_fanout = REGISTRY.histogram(
+    "websocket_broadcast_duration_seconds", "Time to fan a message out to every WebSocket", (), FAST_BUCKETS)
+websocket_messages = REGISTRY.counter(
+    "websocket_messages_total", "WebSocket messages sent", ("kind", "outcome"))
+event_loop_lag = REGISTRY.histogram(
+    "event_loop_lag_seconds", "Event loop scheduling lag measured by the loop monitor", (), FAST_BUCKETS)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_latency.observe(time.perf_counter() - start, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status[0]))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Command latency by collection and command name"""
+
+    def __init__(self):
+        self._inflight: Dict[tuple, str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection", "-")  # getMore carries a cursor id
+        self._inflight[(event.connection_id, event.request_id)] = target if isinstance(target, str) else "-"
+
+    def succeeded(self, event):
+        collection = self._inflight.pop((event.connection_id, event.request_id), "-")
+        mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._inflight.pop((event.connection_id, event.request_id), "-")
+        mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_failures.inc(collection, event.command_name)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Move embedded ``ai_analysis`` payloads into the analyses collection.
+
+Covers confessions and replies in the hot collections and their archives.
+Each batch is copied to ``analyses`` before the field is removed from the
+source documents, and documents missing a compact field (``crisis_level``,
+``moderation``, ``mood``) get it derived from their analysis on the way. The
+migration only touches documents that still have ``ai_analysis``, so it can be
+rerun at any time and resumes after an interruption.
+
+Usage:
+    python migrate_analyses.py
+    python migrate_analyses.py --collections confessions --batch-size 200
+"""
+import argparse
+import asyncio
+import logging
+
+from analyses import KINDS
+
+import server
+
+
+async def run(args) -> dict:
+    moved = {}
+    for collection in args.collections:
+        moved[collection] = await server.analyses.migrate(server.posts_db, collection, args.batch_size)
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move embedded AI analyses into the analyses collection")
+    parser.add_argument("--collections", nargs="+", choices=list(KINDS), default=list(KINDS))
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    moved = asyncio.run(run(args))
+    logging.info("Migration finished: " + ", ".join(f"{name} {count}" for name, count in moved.items()))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""MongoDB client configuration: pool sizing, read routing and write concerns.
+
+Everything is driven by environment variables so deployments can tune the
+pool and routing without code changes:
+
+- ``MONGO_MAX_POOL_SIZE``, ``MONGO_MIN_POOL_SIZE``, ``MONGO_MAX_IDLE_TIME_MS``,
+  ``MONGO_WAIT_QUEUE_TIMEOUT_MS``, ``MONGO_CONNECT_TIMEOUT_MS``,
+  ``MONGO_SERVER_SELECTION_TIMEOUT_MS``, ``MONGO_SOCKET_TIMEOUT_MS``
+- ``MONGO_READ_PREFERENCE`` (default ``secondaryPreferred``) and
+  ``MONGO_MAX_STALENESS_SECONDS`` (default 90, ``-1`` disables) for hot read
+  paths, overridable per class with ``MONGO_READ_PREFERENCE_<CLASS>``
+- ``MONGO_WRITE_CONCERN_<CLASS>`` (``majority``, ``0``, ``1``, ...) and
+  ``MONGO_WRITE_CONCERN_TIMEOUT_MS`` per write class
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from pymongo import monitoring
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+
+# Client option -> (environment variable, default); None leaves the driver default
+POOL_SETTINGS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", 100),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", None),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", None),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", None),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", None),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", None),
+}
+
+# Read classes routed away from the primary; everything else reads from the primary
+READ_CLASSES = ("feed", "search", "trending", "analytics")
+
+# Write classes with tunable write concern
+WRITE_CLASSES = {
+    "posts": None,  # confessions, replies, user stats; None keeps the server default
+    "votes": None,
+    "telemetry": "1",  # view counts, stats rollups and other best-effort counters
+}
+
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def pool_options() -> dict:
+    options = {}
+    for option, (env_name, default) in POOL_SETTINGS.items():
+        value = os.environ.get(env_name)
+        value = int(value) if value not in (None, "") else default
+        if value is not None:
+            options[option] = value
+    return options
+
+
+def read_preference_for(read_class: str):
+    mode = os.environ.get(f"MONGO_READ_PREFERENCE_{read_class.upper()}") or \
+        os.environ.get("MONGO_READ_PREFERENCE", "secondaryPreferred")
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference: {mode}")
+    if mode == "primary":
+        return Primary()
+    max_staleness = int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", "90"))
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness)
+
+
+def write_concern_for(write_class: str) -> Optional[WriteConcern]:
+    w = os.environ.get(f"MONGO_WRITE_CONCERN_{write_class.upper()}", WRITE_CLASSES.get(write_class))
+    if w in (None, ""):
+        return None
+    timeout = os.environ.get("MONGO_WRITE_CONCERN_TIMEOUT_MS")
+    return WriteConcern(
+        w=int(w) if w.isdigit() else w,
+        wtimeout=int(timeout) if timeout and w != "0" else None
+    )
+
+
+def routed_database(client, name: str, read_class: Optional[str] = None, write_class: Optional[str] = None):
+    """Database handle with the read preference / write concern of the given classes"""
+    options = {}
+    if read_class:
+        options["read_preference"] = read_preference_for(read_class)
+    if write_class:
+        write_concern = write_concern_for(write_class)
+        if write_concern is not None:
+            options["write_concern"] = write_concern
+    return client.get_database(name, **options)
+
+
+def routing_summary() -> dict:
+    return {
+        "reads": {cls: read_preference_for(cls).document for cls in READ_CLASSES},
+        "writes": {
+            cls: (write_concern_for(cls).document if write_concern_for(cls) else "server default")
+            for cls in WRITE_CLASSES
+        },
+    }
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters: checkouts, failures, connections in use and wait time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.checkins = 0
+        self.checkout_failures: Dict[str, int] = defaultdict(int)
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pools_cleared = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "in_use": self.checkouts - self.checkins,
+                "checkout_failures": dict(self.checkout_failures),
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "connections_open": self.connections_created - self.connections_closed,
+                "pools_cleared": self.pools_cleared,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+    def _waited(self) -> float:
+        # Check-out started and finished events fire on the same (executor) thread
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def connection_check_out_failed(self, event):
+        self._waited()
+        with self._lock:
+            self.checkout_failures[str(event.reason)] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checkins += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
@@ -0,0 +1,200 @@
+"""Query-shape profiler and slow-query log for MongoDB commands.
+
+A command listener reduces every query to its shape: field names and
+operators are kept, literal values become ``?`` (so ``{"id": "abc"}`` and
+``{"id": "xyz"}`` are the same shape). Count, total and max latency are
+aggregated per shape. Operations slower than the threshold are explained in
+the background (at most once per shape per cooldown) and logged with the
+winning plan, so a slow ``$or`` or an unindexed sort points at its cause.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+
+from indexes import summarize_explain
+
+PROFILED_COMMANDS = ("find", "aggregate", "count", "distinct", "update", "delete",
+                     "findAndModify", "insert", "getMore")
+EXPLAINABLE_COMMANDS = ("find", "aggregate", "count", "distinct", "update", "delete", "findAndModify")
+# Command fields that identify the operation rather than its session or transport
+SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection", "hint"),
+    "aggregate": ("pipeline", "hint"),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort", "update", "upsert", "remove"),
+}
+SESSION_FIELDS = ("lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern", "readConcern", "$db",
+                  "$clusterTime", "$readPreference", "apiVersion", "apiStrict", "apiDeprecationErrors")
+# Operators whose literal arguments are part of the shape (sort directions, projections, ...)
+KEEP_LITERALS = ("$meta", "$sort", "$project", "format")
+
+MAX_SHAPES = 1000
+EXPLAIN_COOLDOWN = 600
+
+
+def normalize(value, keep: bool = False):
+    """Shape of a query document: structure and operators kept, literal values replaced by '?'"""
+    if isinstance(value, dict):
+        return {key: normalize(item, keep or key in KEEP_LITERALS) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = normalize(item, keep)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if keep or (isinstance(value, str) and value.startswith("$")):
+        # Field paths such as "$mood" are structure, not user input
+        return value
+    return "?"
+
+
+def normalize_sort(sort) -> Optional[dict]:
+    # Sort directions and projections are part of the shape
+    return dict(sort) if sort else None
+
+
+def command_shape(command_name: str, command: dict) -> dict:
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or []
+        return {"q": normalize([s.get("q", {}) for s in statements]),
+                "multi": sorted({bool(s.get("multi") or s.get("limit") == 0) for s in statements})}
+    if command_name in ("insert", "getMore"):
+        return {}
+    shape = {}
+    for field in SHAPE_FIELDS.get(command_name, ()):
+        if field not in command:
+            continue
+        if field in ("sort", "projection", "hint", "key"):
+            shape[field] = normalize_sort(command[field]) if isinstance(command[field], dict) else command[field]
+        else:
+            shape[field] = normalize(command[field])
+    return shape
+
+
+def explain_command(command_name: str, command: dict) -> dict:
+    explained = {key: value for key, value in command.items() if key not in SESSION_FIELDS}
+    return {"explain": explained, "verbosity": "queryPlanner"}
+
+
+class QueryProfiler(monitoring.CommandListener):
+    def __init__(self, slow_ms: float = 100.0, max_shapes: int = MAX_SHAPES):
+        self.slow_seconds = slow_ms / 1000
+        self.max_shapes = max_shapes
+        self.shapes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._inflight: Dict[tuple, tuple] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._explained: Dict[str, float] = {}
+
+    def start(self, client):
+        """Enable background explains of slow operations; call from the event loop"""
+        self._client = client
+        self._loop = asyncio.get_running_loop()
+
+    # Listener callbacks run on the driver's executor threads
+    def started(self, event):
+        name = event.command_name
+        if name not in PROFILED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get("collection") if name == "getMore" else command.get(name)
+        if not isinstance(collection, str):
+            collection = "-"
+        shape = command_shape(name, command)
+        key = json.dumps({"op": name, "collection": collection, **shape}, sort_keys=True, default=str)
+        explain = explain_command(name, command) if name in EXPLAINABLE_COMMANDS else None
+        self._inflight[(event.connection_id, event.request_id)] = (key, name, collection, shape, event.database_name, explain)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        entry = self._inflight.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+        key, name, collection, shape, database, explain = entry
+        seconds = event.duration_micros / 1e6
+        with self._lock:
+            stats = self.shapes.get(key)
+            if stats is None:
+                if len(self.shapes) >= self.max_shapes:
+                    key = "other"
+                    stats = self.shapes.setdefault(key, self._new_stats("*", "*", {"note": "shape table full"}))
+                else:
+                    stats = self.shapes[key] = self._new_stats(name, collection, shape)
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if failed:
+                stats["errors"] += 1
+            if seconds >= self.slow_seconds:
+                stats["slow"] += 1
+
+        if seconds >= self.slow_seconds and not failed:
+            if explain is not None and self._should_explain(key):
+                self._loop.call_soon_threadsafe(
+                    lambda: self._loop.create_task(self._explain_slow(key, name, collection, shape, database, explain, seconds))
+                )
+            else:
+                plan = (stats.get("plan") or {}).get("plan")
+                logging.warning(f"Slow {name} on {collection}: {seconds * 1000:.0f}ms" + (f" plan={plan}" if plan else ""))
+
+    @staticmethod
+    def _new_stats(op: str, collection: str, shape: dict) -> dict:
+        return {"op": op, "collection": collection, "shape": shape, "count": 0, "errors": 0, "slow": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0, "plan": None}
+
+    def _should_explain(self, key: str) -> bool:
+        if self._loop is None or self._client is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(key, -EXPLAIN_COOLDOWN) < EXPLAIN_COOLDOWN:
+                return False
+            self._explained[key] = now
+        return True
+
+    async def _explain_slow(self, key: str, name: str, collection: str, shape: dict,
+                            database: str, explain: dict, seconds: float):
+        try:
+            summary = summarize_explain(await self._client[database].command(explain))
+        except Exception as e:
+            logging.warning(f"Slow {name} on {collection} ({seconds * 1000:.0f}ms), explain failed: {str(e)}")
+            return
+        with self._lock:
+            if key in self.shapes:
+                self.shapes[key]["plan"] = summary
+        logging.warning(
+            f"Slow {name} on {collection} ({seconds * 1000:.0f}ms) shape={json.dumps(shape, default=str)} "
+            f"plan={summary['plan']}"
+            + (" [COLLSCAN]" if summary["collscan"] else "")
+            + (" [in-memory sort]" if summary["in_memory_sort"] else "")
+        )
+
+    def top(self, limit: int = 20, sort: str = "total") -> List[dict]:
+        """Shapes ordered by total time (or 'count', 'max', 'avg')"""
+        with self._lock:
+            rows = [dict(stats) for stats in self.shapes.values()]
+        for row in rows:
+            row["avg_ms"] = round(row["total_seconds"] / row["count"] * 1000, 3) if row["count"] else 0.0
+            row["total_ms"] = round(row.pop("total_seconds") * 1000, 3)
+            row["max_ms"] = round(row.pop("max_seconds") * 1000, 3)
+        sort_key = {"total": "total_ms", "count": "count", "max": "max_ms", "avg": "avg_ms"}.get(sort, "total_ms")
+        rows.sort(key=lambda row: row[sort_key], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+            self._explained.clear()
@@ -0,0 +1,220 @@
+"""Per-client rate limiting and load shedding.
+
+``RateLimiter`` keeps a token bucket per (route class, client), where the
+client is the signed-in user id or, failing that, the client IP. Buckets live
+in a shared Mongo collection updated atomically with a pipeline update, so
+every worker draws from the same budget; if Mongo is unavailable the limiter
+falls back to per-process buckets rather than blocking writes.
+
+``ConcurrencyLimiter`` caps in-flight calls to an expensive dependency (LLM
+analysis, Irys uploads) with a bounded wait queue. Excess requests fail fast
+with 503 and a Retry-After hint instead of piling up.
+
+Budgets are ``capacity/seconds`` strings, overridable per route class with
+``RATE_LIMIT_<CLASS>`` (e.g. ``RATE_LIMIT_CONFESSIONS=5/60``).
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import jwt
+from fastapi import HTTPException, Request
+from pymongo import ReturnDocument
+
+# Route class -> "capacity/seconds": bursts of up to capacity, refilled evenly over the period
+DEFAULT_BUDGETS = {
+    "confessions": "5/60",
+    "replies": "20/60",
+    "votes": "120/60",
+    "profiles": "3/600",
+}
+
+# Proxies in front of the app that append to X-Forwarded-For. Off by default: without a proxy the
+# header is whatever the client sent, so deployments behind one set this to their hop count
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+
+# Idle buckets are dropped once they would have refilled anyway
+BUCKET_TTL = timedelta(hours=1)
+
+
+def parse_budget(spec: str) -> Tuple[float, float]:
+    """(capacity, tokens per second) from 'capacity/seconds'"""
+    capacity, _, seconds = spec.partition("/")
+    capacity, seconds = float(capacity), float(seconds or 1)
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit budget: {spec}")
+    return capacity, capacity / seconds
+
+
+def budget_for(route_class: str) -> Tuple[float, float]:
+    return parse_budget(os.environ.get(f"RATE_LIMIT_{route_class.upper()}", DEFAULT_BUDGETS[route_class]))
+
+
+def client_ip(request: Request, trusted_hops: Optional[int] = None) -> str:
+    """Address of the client as seen by the outermost trusted proxy.
+
+    Clients can put anything in X-Forwarded-For; only the entries appended by
+    our own proxies are trustworthy. With ``trusted_hops`` proxies in front of
+    the app, the client is the ``trusted_hops``-th entry from the right.
+    """
+    hops = TRUSTED_PROXY_HOPS if trusted_hops is None else trusted_hops
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and hops > 0:
+        entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+        if entries:
+            return entries[-hops] if len(entries) >= hops else entries[0]
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request, jwt_secret: str, jwt_algorithm: str) -> str:
+    """'user:<id>' for a valid bearer token, else 'ip:<address>'"""
+    authorization = request.headers.get("authorization", "")
+    if authorization.startswith("Bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], jwt_secret, algorithms=[jwt_algorithm])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except jwt.PyJWTError:
+            pass
+    return f"ip:{client_ip(request)}"
+
+
+class MemoryBuckets:
+    """Per-process token buckets"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        if len(self._buckets) >= self.max_keys and key not in self._buckets:
+            self._prune(now, rate)
+        self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def _prune(self, now: float, rate: float):
+        idle = BUCKET_TTL.total_seconds()
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated > idle]:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class MongoBuckets:
+    """Token buckets shared by all workers, one document per (route class, client)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        now = datetime.utcnow()
+        refilled = {"$min": [
+            capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", capacity]},
+                {"$multiply": [
+                    {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, 1000]},
+                    rate
+                ]}
+            ]}
+        ]}
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated": now, "expires_at": now + BUCKET_TTL}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", cost]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", cost]}, {"$subtract": ["$tokens", cost]}, "$tokens"]}
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["allowed"], doc["tokens"]
+
+
+class RateLimiter:
+    def __init__(self, shared: Optional[MongoBuckets] = None):
+        self.shared = shared
+        self.local = MemoryBuckets()
+        self.rejected: Dict[str, int] = {}
+
+    async def check(self, route_class: str, client: str, cost: float = 1):
+        """Take ``cost`` tokens from the client's bucket or raise 429 with Retry-After"""
+        capacity, rate = budget_for(route_class)
+        key = f"{route_class}:{client}"
+        allowed, tokens = None, 0.0
+        if self.shared is not None:
+            try:
+                allowed, tokens = await self.shared.take(key, capacity, rate, cost)
+            except Exception as e:
+                logging.error(f"Shared rate limit store failed, using local buckets: {str(e)}")
+        if allowed is None:
+            allowed, tokens = await self.local.take(key, capacity, rate, cost)
+        if not allowed:
+            self.rejected[route_class] = self.rejected.get(route_class, 0) + 1
+            retry_after = max(1, math.ceil((cost - tokens) / rate))
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {route_class}; retry in {retry_after}s",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` concurrent holders and ``max_waiting`` queued ones"""
+
+    def __init__(self, name: str, limit: int, max_waiting: int, max_wait: float, retry_after: int = 1):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+
+    def _reject(self):
+        self.shed += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"{self.name} is at capacity, please retry shortly",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+    async def __aenter__(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self._reject()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._reject()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "shed": self.shed,
+        }
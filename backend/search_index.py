@@ -0,0 +1,521 @@
+"""In-process inverted index search engine for confessions.
+
+Indexes ``content`` and ``tags`` of public confessions into delta + varint
+compressed posting lists and ranks matches with BM25. Filters (mood, author,
+tags, day buckets) are kept as bitsets over internal document numbers, using
+plain Python ints as the bitset type.
+"""
+import base64
+import bisect
+import heapq
+import json
+import math
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "if", "in",
+    "into", "is", "it", "no", "not", "of", "on", "or", "so", "such", "that",
+    "the", "their", "then", "there", "these", "they", "this", "to", "was",
+    "will", "with",
+})
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TAG_WEIGHT = 2  # a tag counts as two occurrences of its tokens
+PREFIX_WEIGHT = 0.5  # score multiplier for prefix-expanded terms
+MAX_PREFIX_EXPANSIONS = 50
+COMPACT_MIN_DEAD = 1000
+COMPACT_DEAD_RATIO = 0.25
+DAY_SECONDS = 86400
+SNAPSHOT_VERSION = 2
+
+EPOCH = datetime(1970, 1, 1)
+
+# Sort keys the index can order by itself; anything else is sorted by the caller
+INDEX_SORT_FIELDS = ("relevance", "timestamp")
+
+# Day-aligned, non-overlapping date facet buckets: (name, first day offset, last day offset)
+DATE_FACET_BUCKETS = (("today", 0, 0), ("last_7d", 1, 6), ("last_30d", 7, 29))
+MAX_TAG_FACETS = 20
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed"""
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def to_epoch(value) -> float:
+    """Convert a (naive UTC or aware) datetime or ISO string to epoch seconds"""
+    if value is None:
+        return 0.0
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH).total_seconds()
+
+
+def day_bucket(epoch_seconds: float) -> int:
+    return int(epoch_seconds // DAY_SECONDS)
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode an opaque pagination cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    return data
+
+
+# Posting list encoding: (doc delta, term frequency) pairs as LEB128 varints
+def _append_varint(buf: bytearray, value: int):
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def iter_postings(buf) -> Iterator[Tuple[int, int]]:
+    doc = 0
+    i = 0
+    n = len(buf)
+    while i < n:
+        delta = shift = 0
+        while True:
+            b = buf[i]
+            i += 1
+            delta |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        tf = shift = 0
+        while True:
+            b = buf[i]
+            i += 1
+            tf |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        doc += delta
+        yield doc, tf
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the positions of set bits in ascending order"""
+    if mask <= 0:
+        return
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+        base = byte_index << 3
+        while byte:
+            low = byte & -byte
+            yield base + low.bit_length() - 1
+            byte ^= low
+
+
+def bits_from(docs) -> int:
+    """Build a bitset from an iterable of document numbers"""
+    docs = list(docs)
+    if not docs:
+        return 0
+    bitmap = bytearray((max(docs) >> 3) + 1)
+    for d in docs:
+        bitmap[d >> 3] |= 1 << (d & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+class SearchHits(NamedTuple):
+    ids: List[str]
+    total: int
+    next_cursor: Optional[str]
+    mask: int  # bitset of every matching document, for facet counting
+
+
+class SearchIndex:
+    def __init__(self):
+        self.ready = False
+        self.dirty = False
+        self.version = 0
+        self._reset()
+
+    def _reset(self):
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_timestamps: List[float] = []
+        self.doc_lengths: List[int] = []
+        self.doc_terms: List[Tuple[str, ...]] = []
+        self.id_to_doc: Dict[str, int] = {}
+        self.postings: Dict[str, bytearray] = {}
+        self.last_doc: Dict[str, int] = {}
+        self.doc_freq: Dict[str, int] = {}
+        self.vocabulary: List[str] = []
+        self.live = 0
+        self.live_count = 0
+        self.dead_count = 0
+        self.total_length = 0
+        self.mood_bits: Dict[str, int] = {}
+        self.author_bits: Dict[str, int] = {}
+        self.tag_bits: Dict[str, int] = {}
+        self.day_bits: Dict[int, int] = {}
+        self.last_object_id: Optional[str] = None
+
+    def __len__(self):
+        return self.live_count
+
+    def _touch(self):
+        self.version += 1
+        self.dirty = True
+
+    # Mutation
+    def add(self, confession: dict):
+        """Index (or re-index) a confession document"""
+        confession_id = confession["id"]
+        if confession_id in self.id_to_doc:
+            self.remove(confession_id)
+
+        doc = len(self.doc_ids)
+        tags = confession.get("tags") or []
+        tokens = tokenize(confession.get("content", ""))
+        tag_tokens = [t for tag in tags for t in tokenize(tag)]
+
+        term_freqs = Counter(tokens)
+        for token in tag_tokens:
+            term_freqs[token] += TAG_WEIGHT
+        length = len(tokens) + TAG_WEIGHT * len(tag_tokens)
+
+        for term, tf in term_freqs.items():
+            buf = self.postings.get(term)
+            if buf is None:
+                buf = self.postings[term] = bytearray()
+                bisect.insort(self.vocabulary, term)
+                last = 0
+            else:
+                last = self.last_doc[term]
+            _append_varint(buf, doc - last)
+            _append_varint(buf, tf)
+            self.last_doc[term] = doc
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+
+        timestamp = to_epoch(confession.get("timestamp"))
+        self.doc_ids.append(confession_id)
+        self.doc_timestamps.append(timestamp)
+        self.doc_lengths.append(length)
+        self.doc_terms.append(tuple(term_freqs))
+        self.id_to_doc[confession_id] = doc
+        self.live_count += 1
+        self.total_length += length
+
+        bit = 1 << doc
+        self.live |= bit
+        mood = confession.get("mood")
+        if mood:
+            self.mood_bits[mood] = self.mood_bits.get(mood, 0) | bit
+        author = confession.get("author")
+        if author:
+            self.author_bits[author] = self.author_bits.get(author, 0) | bit
+        for tag in set(tags):
+            self.tag_bits[tag] = self.tag_bits.get(tag, 0) | bit
+        day = day_bucket(timestamp)
+        self.day_bits[day] = self.day_bits.get(day, 0) | bit
+
+        object_id = confession.get("_id")
+        if object_id is not None:
+            object_id = str(object_id)
+            if self.last_object_id is None or object_id > self.last_object_id:
+                self.last_object_id = object_id
+
+        self._touch()
+
+    def remove(self, confession_id: str) -> bool:
+        """Tombstone a confession; postings are reclaimed by ``compact``"""
+        doc = self.id_to_doc.pop(confession_id, None)
+        if doc is None:
+            return False
+        self.live &= ~(1 << doc)
+        self.doc_ids[doc] = None
+        self.live_count -= 1
+        self.dead_count += 1
+        self.total_length -= self.doc_lengths[doc]
+        # Document frequencies stay exact for BM25; the postings themselves wait for compaction
+        for term in self.doc_terms[doc]:
+            self.doc_freq[term] -= 1
+        self.doc_terms[doc] = ()
+        self._touch()
+
+        if self.dead_count >= max(COMPACT_MIN_DEAD, COMPACT_DEAD_RATIO * len(self.doc_ids)):
+            self.compact()
+        return True
+
+    def compact(self):
+        """Drop tombstoned documents and renumber the live ones densely, keeping their order"""
+        remap = {}
+        doc_ids, doc_timestamps, doc_lengths, doc_terms = [], [], [], []
+        for doc, confession_id in enumerate(self.doc_ids):
+            if confession_id is None:
+                continue
+            remap[doc] = len(doc_ids)
+            doc_ids.append(confession_id)
+            doc_timestamps.append(self.doc_timestamps[doc])
+            doc_lengths.append(self.doc_lengths[doc])
+            doc_terms.append(self.doc_terms[doc])
+
+        postings = {}
+        last_doc = {}
+        doc_freq = {}
+        for term, buf in self.postings.items():
+            new_buf = bytearray()
+            last = 0
+            df = 0
+            for doc, tf in iter_postings(buf):
+                new_doc = remap.get(doc)
+                if new_doc is None:
+                    continue
+                _append_varint(new_buf, new_doc - last)
+                _append_varint(new_buf, tf)
+                last = new_doc
+                df += 1
+            if df:
+                postings[term] = new_buf
+                last_doc[term] = last
+                doc_freq[term] = df
+
+        self.doc_ids = doc_ids
+        self.doc_timestamps = doc_timestamps
+        self.doc_lengths = doc_lengths
+        self.doc_terms = doc_terms
+        self.id_to_doc = {confession_id: doc for doc, confession_id in enumerate(doc_ids)}
+        self.postings = postings
+        self.last_doc = last_doc
+        self.doc_freq = doc_freq
+        self.vocabulary = sorted(postings)
+        self.live = (1 << len(doc_ids)) - 1
+        for bitsets in (self.mood_bits, self.author_bits, self.tag_bits, self.day_bits):
+            for key in list(bitsets):
+                bits = bits_from(remap[doc] for doc in iter_bits(bitsets[key]) if doc in remap)
+                if bits:
+                    bitsets[key] = bits
+                else:
+                    del bitsets[key]
+        self.dead_count = 0
+        self._touch()
+
+    # Querying
+    def _date_mask(self, date_from, date_to) -> int:
+        start = to_epoch(date_from) if date_from else None
+        end = to_epoch(date_to) if date_to else None
+        first_day = day_bucket(start) if start is not None else None
+        last_day = day_bucket(end) if end is not None else None
+
+        mask = 0
+        for day, bits in self.day_bits.items():
+            if first_day is not None and day < first_day:
+                continue
+            if last_day is not None and day > last_day:
+                continue
+            if day == first_day or day == last_day:
+                # Boundary buckets need an exact timestamp check
+                bits = bits_from(
+                    d for d in iter_bits(bits)
+                    if (start is None or self.doc_timestamps[d] >= start)
+                    and (end is None or self.doc_timestamps[d] <= end)
+                )
+            mask |= bits
+        return mask
+
+    def filter_mask(self, mood=None, tags=None, author=None, date_from=None, date_to=None) -> int:
+        mask = self.live
+        if mood:
+            mask &= self.mood_bits.get(mood, 0)
+        if author:
+            mask &= self.author_bits.get(author, 0)
+        if tags:
+            tag_mask = 0
+            for tag in tags:
+                tag_mask |= self.tag_bits.get(tag, 0)
+            mask &= tag_mask
+        if date_from or date_to:
+            mask &= self._date_mask(date_from, date_to)
+        return mask
+
+    def _query_terms(self, query: str) -> List[Tuple[str, float]]:
+        """Query terms with weights; the trailing token is expanded as a prefix"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        terms = {t: 1.0 for t in tokens}
+        if not query[-1].isspace():
+            prefix = tokens[-1]
+            start = bisect.bisect_left(self.vocabulary, prefix)
+            for term in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(prefix):
+                    break
+                terms.setdefault(term, PREFIX_WEIGHT)
+        return list(terms.items())
+
+    def score(self, query: str, mask: int) -> Dict[int, float]:
+        """BM25 scores for documents in ``mask`` matching any query term"""
+        scores: Dict[int, float] = {}
+        if not self.live_count:
+            return scores
+        n_docs = self.live_count
+        avg_length = self.total_length / n_docs or 1.0
+        doc_lengths = self.doc_lengths
+        # Byte view of the mask: shifting a large int per posting would be quadratic
+        mask_bytes = mask.to_bytes((mask.bit_length() + 7) // 8, "little") if mask > 0 else b""
+        mask_len = len(mask_bytes)
+
+        for term, weight in self._query_terms(query):
+            buf = self.postings.get(term)
+            if buf is None:
+                continue
+            df = self.doc_freq[term]
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * weight
+            for doc, tf in iter_postings(buf):
+                byte_index = doc >> 3
+                if byte_index >= mask_len or not (mask_bytes[byte_index] >> (doc & 7)) & 1:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def match(self, query: Optional[str] = None, mood=None, tags=None, author=None,
+              date_from=None, date_to=None) -> Tuple[Optional[Dict[int, float]], int]:
+        """Resolve a query to (BM25 scores or None, bitset of matching documents)"""
+        mask = self.filter_mask(mood, tags, author, date_from, date_to)
+        if query and tokenize(query):
+            scores = self.score(query, mask)
+            return scores, bits_from(scores)
+        return None, mask
+
+    def search(self, query: Optional[str] = None, mood=None, tags=None, author=None,
+               date_from=None, date_to=None, sort_by: str = "relevance", order: str = "desc",
+               limit: int = 50, cursor: Optional[str] = None) -> SearchHits:
+        """Ranked, cursor-paginated search; ``sort_by`` must be in INDEX_SORT_FIELDS"""
+        scores, mask = self.match(query, mood, tags, author, date_from, date_to)
+        timestamps = self.doc_timestamps
+
+        if sort_by == "relevance" and scores is not None:
+            keyed = [(score, doc) for doc, score in scores.items()]
+        else:
+            docs = scores.keys() if scores is not None else iter_bits(mask)
+            keyed = [(timestamps[doc], doc) for doc in docs]
+        total = len(keyed)
+
+        descending = order == "desc"
+        if cursor:
+            after = decode_cursor(cursor).get("k")
+            if not isinstance(after, list) or len(after) != 2:
+                raise ValueError("Invalid cursor")
+            after = (float(after[0]), int(after[1]))
+            keyed = [k for k in keyed if (k < after if descending else k > after)]
+
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        page = pick(limit + 1, keyed)
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor({"k": list(page[-1])})
+
+        ids = [self.doc_ids[doc] for _, doc in page]
+        return SearchHits(ids, total, next_cursor, mask)
+
+    def facet_counts(self, mask: int, now: Optional[datetime] = None) -> dict:
+        """Mood, tag and date bucket counts for the documents in ``mask``"""
+        mask &= self.live
+        moods = [
+            {"value": mood, "count": (bits & mask).bit_count()}
+            for mood, bits in self.mood_bits.items()
+        ]
+        tags = [
+            {"value": tag, "count": (bits & mask).bit_count()}
+            for tag, bits in self.tag_bits.items()
+        ]
+
+        today = day_bucket(to_epoch(now or datetime.utcnow()))
+        dates = []
+        remaining = mask
+        for name, first, last in DATE_FACET_BUCKETS:
+            bucket = 0
+            for day in range(today - last, today - first + 1):
+                bucket |= self.day_bits.get(day, 0)
+            bucket &= mask
+            remaining &= ~bucket
+            dates.append({"value": name, "count": bucket.bit_count()})
+        dates.append({"value": "older", "count": remaining.bit_count()})
+
+        def ranked(entries):
+            return sorted((e for e in entries if e["count"]), key=lambda e: (-e["count"], e["value"]))
+
+        return {
+            "mood": ranked(moods),
+            "tags": ranked(tags)[:MAX_TAG_FACETS],
+            "date": dates
+        }
+
+    def ids(self, docs) -> List[str]:
+        return [self.doc_ids[doc] for doc in docs]
+
+    # Snapshots
+    def to_state(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "doc_ids": list(self.doc_ids),
+            "doc_timestamps": list(self.doc_timestamps),
+            "doc_lengths": list(self.doc_lengths),
+            "doc_terms": list(self.doc_terms),
+            "postings": {term: bytes(buf) for term, buf in self.postings.items()},
+            "last_doc": dict(self.last_doc),
+            "doc_freq": dict(self.doc_freq),
+            "live": self.live,
+            "dead_count": self.dead_count,
+            "mood_bits": dict(self.mood_bits),
+            "author_bits": dict(self.author_bits),
+            "tag_bits": dict(self.tag_bits),
+            "day_bits": dict(self.day_bits),
+            "last_object_id": self.last_object_id,
+        }
+
+    def load_state(self, state: dict) -> bool:
+        if not state or state.get("version") != SNAPSHOT_VERSION:
+            return False
+        self._reset()
+        self.doc_ids = state["doc_ids"]
+        self.doc_timestamps = state["doc_timestamps"]
+        self.doc_lengths = state["doc_lengths"]
+        self.doc_terms = state["doc_terms"]
+        self.postings = {term: bytearray(buf) for term, buf in state["postings"].items()}
+        self.last_doc = state["last_doc"]
+        self.doc_freq = state["doc_freq"]
+        self.vocabulary = sorted(self.postings)
+        self.live = state["live"]
+        self.dead_count = state["dead_count"]
+        self.mood_bits = state["mood_bits"]
+        self.author_bits = state["author_bits"]
+        self.tag_bits = state["tag_bits"]
+        self.day_bits = state["day_bits"]
+        self.last_object_id = state["last_object_id"]
+
+        self.id_to_doc = {cid: doc for doc, cid in enumerate(self.doc_ids) if cid is not None}
+        self.live_count = len(self.id_to_doc)
+        self.total_length = sum(self.doc_lengths[doc] for doc in self.id_to_doc.values())
+        self.version += 1
+        self.dirty = False
+        return True
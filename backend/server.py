@@ -1,5 +1,6 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -21,15 +22,54 @@ import re
 from enum import Enum
 from collections import defaultdict
 import time
+import threading
+from bson import ObjectId
+from search_index import SearchIndex, INDEX_SORT_FIELDS, MAX_TAG_FACETS, iter_bits, tokenize, to_epoch, encode_cursor, decode_cursor
+from trending import TrendingEngine, TIMEFRAMES, EVENT_WEIGHTS
+from tag_counters import RollingTagCounter, WINDOWS as TAG_WINDOWS
+from stats_rollup import StatsRollup, hour_start, mood_distribution
+from timeseries import TimeSeriesStore
+from mongo_config import PoolMetrics, pool_options, routed_database, routing_summary
+from indexes import APPROVED, LISTED, ensure_indexes, verify_query_plans
+from query_profiler import QueryProfiler
+from responses import FastJSONResponse
+from export import EXPORT_BATCH_SIZE, EXPORT_SORT, COMPRESSIONS as EXPORT_COMPRESSIONS, export_query, joined_pipeline, ndjson_lines, resume_after
+from cache import TTLCache
+from idempotency import IdempotencyStore, IdempotentResult
+from rate_limit import ConcurrencyLimiter, MongoBuckets, RateLimiter, client_key
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from local_analysis import local_analysis
+from upload_queue import UploadQueue
+from archive import Archiver, archive_name, find_with_archive
+from analyses import AnalysisStore
+from metrics import REGISTRY, MetricsMiddleware, MongoCommandMetrics, claude_latency, event_loop_lag, irys_latency, websocket_fanout, websocket_messages
+from loop_monitor import LoopMonitor
+from profiler import ProfilerBusyError, SamplingProfiler
+from tracing import OTLPFileExporter, RingBufferExporter, Tracer, TracingMiddleware, current_trace_id
+from snapshots import acquire_process_lock, claim_file, process_alive, read_snapshot, write_snapshot
+from autocomplete import PrefixIndex
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+pool_metrics = PoolMetrics()
+command_metrics = MongoCommandMetrics()
+# Per-shape query latency; operations slower than SLOW_QUERY_MS are explained and logged
+query_profiler = QueryProfiler(slow_ms=float(os.environ.get('SLOW_QUERY_MS', '100')))
+client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_metrics, command_metrics, query_profiler], **pool_options())
 db = client[os.environ['DB_NAME']]
 
+# Hot read paths may be served by secondaries; votes and posts stay on the primary
+feed_db = routed_database(client, os.environ['DB_NAME'], read_class="feed")
+search_db = routed_database(client, os.environ['DB_NAME'], read_class="search")
+trending_db = routed_database(client, os.environ['DB_NAME'], read_class="trending")
+analytics_db = routed_database(client, os.environ['DB_NAME'], read_class="analytics", write_class="telemetry")
+posts_db = routed_database(client, os.environ['DB_NAME'], write_class="posts")
+votes_db = routed_database(client, os.environ['DB_NAME'], write_class="votes")
+telemetry_db = routed_database(client, os.environ['DB_NAME'], write_class="telemetry")
+
 # Security setup
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -40,8 +80,60 @@ JWT_ALGORITHM = "HS256"
 CLAUDE_API_KEY = os.environ.get('CLAUDE_API_KEY')
 CLAUDE_MODEL = os.environ.get('CLAUDE_MODEL', 'claude-3-5-sonnet-20241022')
 
+# Local state for in-process subsystems (search index snapshots, ...)
+DATA_DIR = Path(os.environ.get('DATA_DIR', ROOT_DIR / 'data'))
+# The search index, trending engine and tag counters only see writes made by their own process, so they
+# need a single worker (enforced with a lock file). Set IN_PROCESS_INDEXES=false to run several workers;
+# search, trending and tag routes then query MongoDB
+IN_PROCESS_INDEXES = os.environ.get('IN_PROCESS_INDEXES', 'true').lower() == 'true'
+IN_PROCESS_LOCK_PATH = DATA_DIR / 'in_process_indexes.lock'
+SEARCH_SNAPSHOT_PATH = DATA_DIR / 'search_index.snapshot'
+SEARCH_SNAPSHOT_INTERVAL = int(os.environ.get('SEARCH_SNAPSHOT_INTERVAL', '300'))
+SEARCH_MAX_SORT_CANDIDATES = 5000
+FACET_CACHE_TTL = float(os.environ.get('FACET_CACHE_TTL', '30'))
+TRENDING_SNAPSHOT_PATH = DATA_DIR / 'trending.snapshot'
+TRENDING_SNAPSHOT_INTERVAL = int(os.environ.get('TRENDING_SNAPSHOT_INTERVAL', '60'))
+INDEX_PLAN_CHECK = os.environ.get('INDEX_PLAN_CHECK', 'true').lower() == 'true'
+STATS_RECONCILE_INTERVAL = int(os.environ.get('STATS_RECONCILE_INTERVAL', '3600'))
+# One snapshot per worker process, so workers don't overwrite each other's counts; a starting worker
+# takes over the snapshots of exited ones, so they don't pile up
+TIMESERIES_SNAPSHOT_PATH = DATA_DIR / f'timeseries.{os.getpid()}.snapshot'
+TIMESERIES_SNAPSHOT_INTERVAL = int(os.environ.get('TIMESERIES_SNAPSHOT_INTERVAL', '60'))
+
+# Rate limiting ('mongo' shares buckets across workers, 'memory' keeps them per process)
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'mongo')
+# Concurrent Claude analyses / Irys subprocesses, and how many requests may queue for a slot
+ANALYSIS_MAX_CONCURRENCY = int(os.environ.get('ANALYSIS_MAX_CONCURRENCY', '8'))
+ANALYSIS_MAX_QUEUE = int(os.environ.get('ANALYSIS_MAX_QUEUE', '16'))
+IRYS_MAX_CONCURRENCY = int(os.environ.get('IRYS_MAX_CONCURRENCY', '4'))
+IRYS_MAX_QUEUE = int(os.environ.get('IRYS_MAX_QUEUE', '8'))
+LOAD_SHED_MAX_WAIT = float(os.environ.get('LOAD_SHED_MAX_WAIT', '5'))
+
+# What to do while Claude / Irys are failing: 'local' keyword moderation or 'none';
+# 'queue' the upload and store the post unverified, or 'none' to reject the post
+CLAUDE_FALLBACK = os.environ.get('CLAUDE_FALLBACK', 'local')
+IRYS_FALLBACK = os.environ.get('IRYS_FALLBACK', 'queue')
+UPLOAD_QUEUE_INTERVAL = int(os.environ.get('UPLOAD_QUEUE_INTERVAL', '30'))
+
+# Confessions older than this many days move to the archive collections (0 disables archiving)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', '21600'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '500'))
+
+# Event-loop lag monitoring; stalls longer than the threshold record stack samples
+LOOP_MONITOR = os.environ.get('LOOP_MONITOR', 'true').lower() == 'true'
+LOOP_LAG_THRESHOLD_MS = float(os.environ.get('LOOP_LAG_THRESHOLD_MS', '100'))
+
+# Upper bound on one on-demand CPU profile
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '60'))
+
+# Request tracing: comma-separated exporters ('memory', 'otlp_file') and head sampling rate
+TRACE_EXPORTERS = [name.strip() for name in os.environ.get('TRACE_EXPORTERS', 'memory').split(',') if name.strip()]
+TRACE_OTLP_PATH = Path(os.environ.get('TRACE_OTLP_PATH', DATA_DIR / 'traces.otlp.jsonl'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1.0'))
+
 # Create the main app without a prefix
-app = FastAPI(title="Irys Confession Board API")
+app = FastAPI(title="Irys Confession Board API", default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -69,14 +161,84 @@ class ConnectionManager:
             await self.user_connections[user_id].send_text(message)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+        with tracer.span("websocket.broadcast", connections=len(self.active_connections)), websocket_fanout.time():
+            for connection in self.active_connections:
+                try:
+                    await connection.send_text(message)
+                    websocket_messages.inc("broadcast", "sent")
+                except:
+                    websocket_messages.inc("broadcast", "failed")
 
 manager = ConnectionManager()
 
+# In-process search index over public confessions
+search_index = SearchIndex()
+
+# Trending scores with a top-K per timeframe, updated on votes, replies and views
+trending = TrendingEngine()
+
+# Hourly tag counters for /api/tags/trending
+tag_counters = RollingTagCounter()
+
+# Running totals and hourly buckets for /api/analytics/stats
+stats_rollup = StatsRollup(analytics_db.stats)
+
+# Minute/hour/day event counters for /api/analytics/timeseries
+timeseries = TimeSeriesStore()
+# Labels that get their own series; mood and crisis level come from the model or the client, so any
+# other value is counted under "other" to keep the number of series bounded
+TIMESERIES_MOODS = {"happy", "sad", "anxious", "angry", "excited", "frustrated", "hopeful", "neutral"}
+TIMESERIES_CRISIS_LEVELS = {"none", "low", "medium", "high", "critical"}
+
+# Facet counts per normalized search, shared across sort orders and pages
+facet_cache = TTLCache(maxsize=1024, ttl=FACET_CACHE_TTL)
+
+# Stored responses for Idempotency-Key retries of confession and reply posts
+idempotency = IdempotencyStore(posts_db.idempotency_keys)
+
+# Per-client token buckets for write endpoints, and caps on paid / subprocess-backed calls
+rate_limiter = RateLimiter(MongoBuckets(db.rate_limits) if RATE_LIMIT_STORE == 'mongo' else None)
+analysis_slots = ConcurrencyLimiter("AI analysis", ANALYSIS_MAX_CONCURRENCY, ANALYSIS_MAX_QUEUE, LOAD_SHED_MAX_WAIT)
+irys_slots = ConcurrencyLimiter("Irys upload service", IRYS_MAX_CONCURRENCY, IRYS_MAX_QUEUE, LOAD_SHED_MAX_WAIT)
+
+# Circuit breakers around upstream calls, and uploads deferred while Irys is down
+claude_breaker = CircuitBreaker("claude", timeout=20.0)
+irys_breaker = CircuitBreaker("irys", timeout=30.0)
+upload_queue = UploadQueue(posts_db.pending_uploads)
+
+# Cold tier for old confessions, their replies and votes
+archiver = Archiver(posts_db, timedelta(days=ARCHIVE_AFTER_DAYS), ARCHIVE_BATCH_SIZE)
+
+# Full AI analysis results, kept out of the confession and reply documents
+analyses = AnalysisStore(posts_db.analyses)
+
+# Scheduling lag and stacks of whatever blocks the event loop
+loop_monitor = LoopMonitor(threshold=LOOP_LAG_THRESHOLD_MS / 1000, on_lag=event_loop_lag.observe)
+
+# On-demand sampling profiles of the live process
+sampling_profiler = SamplingProfiler(max_duration=PROFILE_MAX_SECONDS)
+
+# Per-request spans; recent traces stay in memory for /api/debug/traces
+trace_buffer = RingBufferExporter()
+trace_exporters = []
+if 'memory' in TRACE_EXPORTERS:
+    trace_exporters.append(trace_buffer)
+if 'otlp_file' in TRACE_EXPORTERS:
+    trace_exporters.append(OTLPFileExporter(TRACE_OTLP_PATH))
+tracer = Tracer("irys-confession-api", trace_exporters, sample_rate=TRACE_SAMPLE_RATE)
+
+# Autocomplete prefix indexes, weighted by number of listed confessions
+tag_suggestions = PrefixIndex()
+user_suggestions = PrefixIndex()
+
+def is_listed(confession: dict) -> bool:
+    return bool(confession.get("is_public")) and (confession.get("moderation") or {}).get("approved") is not False
+
+def series_label(value: Optional[str], allowed: set) -> str:
+    if not value:
+        return "unknown"
+    return value if value in allowed else "other"
+
 # Enums
 class UserRole(str, Enum):
     USER = "user"
@@ -149,7 +311,7 @@ class ConfessionCreate(BaseModel):
 
 class Confession(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    tx_id: str
+    tx_id: Optional[str] = None
     content: str
     is_public: bool
     author: str
@@ -159,7 +321,7 @@ class Confession(BaseModel):
     downvotes: int = 0
     reply_count: int = 0
     view_count: int = 0
-    gateway_url: str
+    gateway_url: Optional[str] = None
     verified: bool = True
     tags: List[str] = []
     mood: Optional[str] = None
@@ -206,8 +368,11 @@ class SearchRequest(BaseModel):
     author: Optional[str] = None
     date_from: Optional[datetime] = None
     date_to: Optional[datetime] = None
-    sort_by: str = "timestamp"  # timestamp, upvotes, replies
+    sort_by: str = "timestamp"  # relevance, timestamp, upvotes, reply_count, view_count
     order: str = "desc"  # asc, desc
+    limit: int = 50
+    cursor: Optional[str] = None
+    facets: bool = False
 
 # Utility functions
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -220,6 +385,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
+def parse_analysis_response(response: str) -> Dict[str, Any]:
+    """Parse Claude's JSON reply, keeping the raw text when it isn't valid JSON"""
+    try:
+        return json.loads(response.strip())
+    except json.JSONDecodeError:
+        # Fallback if JSON parsing fails
+        return {
+            "error": "Failed to parse AI response",
+            "raw_response": response
+        }
+
+def build_reply_tree(replies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Thread replies (oldest first) under their parents; returns the root replies"""
+    reply_map = {}
+    root_replies = []
+    
+    for reply in replies:
+        reply_map[reply["id"]] = reply
+        reply["children"] = []
+        
+        if reply["parent_reply_id"]:
+            parent = reply_map.get(reply["parent_reply_id"])
+            if parent:
+                parent["children"].append(reply)
+        else:
+            root_replies.append(reply)
+    
+    return root_replies
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -228,11 +422,13 @@ def get_password_hash(password):
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        with tracer.span("auth.jwt"):
+            payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        user = await db.users.find_one({"username": username})
+        with tracer.span("auth.user_lookup"):
+            user = await db.users.find_one({"username": username})
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -244,20 +440,63 @@ async def get_current_user_optional(authorization: Optional[str] = Header(None))
         return None
     try:
         token = authorization.replace("Bearer ", "")
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        with tracer.span("auth.jwt"):
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             return None
-        user = await db.users.find_one({"username": username})
+        with tracer.span("auth.user_lookup"):
+            user = await db.users.find_one({"username": username})
         return user
     except:
         return None
 
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    if current_user.get("role") != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+def rate_limit(route_class: str):
+    """Dependency charging one token from the caller's bucket for ``route_class``"""
+    async def check(request: Request):
+        await rate_limiter.check(route_class, client_key(request, JWT_SECRET, JWT_ALGORITHM))
+    return check
+
 # AI Analysis Functions
+def claude_error(result: dict) -> Optional[str]:
+    # Unparseable JSON still means Claude answered; only upstream errors count against the breaker
+    return result.get("error") if "raw_response" not in result else None
+
 async def analyze_content_with_claude(content: str, analysis_type: str = "moderation"):
+    """Analyze content using Claude API; sheds load with 503 when all analysis slots are busy"""
+    with tracer.span(f"claude.{analysis_type}") as span:
+        async with analysis_slots:
+            start = time.perf_counter()
+            try:
+                result = await claude_breaker.call(lambda: run_claude_analysis(content, analysis_type), failed=claude_error)
+                if not claude_error(result):
+                    claude_latency.observe(time.perf_counter() - start, analysis_type, "ok")
+                    return result
+                outcome, error = "error", result["error"]
+            except CircuitOpenError as e:
+                outcome, error = "rejected", str(e)
+            except asyncio.TimeoutError:
+                outcome, error = "timeout", f"Claude analysis timed out after {claude_breaker.timeout:g}s"
+            claude_latency.observe(time.perf_counter() - start, analysis_type, outcome)
+        
+        span.status = "error"
+        span.set("outcome", outcome)
+        if CLAUDE_FALLBACK == "local":
+            logging.warning(f"Using local {analysis_type} analysis: {error}")
+            span.set("fallback", "local")
+            return local_analysis(content, analysis_type)
+        return {"error": error, "analysis_type": analysis_type}
+
+async def run_claude_analysis(content: str, analysis_type: str = "moderation"):
     """Analyze content using Claude API"""
     try:
-        session_id = f"analysis_{int(time.time())}"
+        trace_id = current_trace_id()
+        session_id = f"analysis_{trace_id}_{analysis_type}" if trace_id else f"analysis_{int(time.time())}"
         
         if analysis_type == "moderation":
             system_message = """You are a content moderation AI. Analyze the given confession for:
@@ -306,15 +545,7 @@ Respond with JSON format:
         user_message = UserMessage(text=f"Analyze this confession: {content}")
         response = await chat.send_message(user_message)
         
-        # Parse JSON response
-        try:
-            return json.loads(response.strip())
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "error": "Failed to parse AI response",
-                "raw_response": response
-            }
+        return parse_analysis_response(response)
         
     except Exception as e:
         logging.error(f"Claude analysis failed: {str(e)}")
@@ -325,6 +556,31 @@ Respond with JSON format:
 
 # Irys Service Helper
 async def call_irys_service(request_data):
+    """Call Node.js Irys service helper; sheds load with 503 when all subprocess slots are busy"""
+    action = request_data.get("action", "unknown")
+    with tracer.span(f"irys.{action}") as span:
+        # The worker logs the trace id and echoes it back
+        request_data = dict(request_data, traceparent=span.traceparent)
+        async with irys_slots:
+            start = time.perf_counter()
+            try:
+                result = await irys_breaker.call(
+                    lambda: run_irys_service(request_data),
+                    failed=lambda result: None if result.get("success") else result.get("error", "Irys service failed")
+                )
+                outcome = "ok" if result.get("success") else "error"
+            except CircuitOpenError as e:
+                outcome, result = "rejected", {"success": False, "error": str(e)}
+            except asyncio.TimeoutError:
+                outcome, result = "timeout", {"success": False, "error": f"Irys service timed out after {irys_breaker.timeout:g}s"}
+            irys_latency.observe(time.perf_counter() - start, action, outcome)
+        
+        span.set("outcome", outcome)
+        if outcome != "ok":
+            span.status = "error"
+        return result
+
+async def run_irys_service(request_data):
     """Call Node.js Irys service helper"""
     try:
         current_dir = os.path.dirname(__file__)
@@ -338,9 +594,14 @@ async def call_irys_service(request_data):
             cwd=current_dir
         )
         
-        stdout, stderr = await process.communicate(
-            input=json.dumps(request_data).encode()
-        )
+        try:
+            stdout, stderr = await process.communicate(
+                input=json.dumps(request_data).encode()
+            )
+        except asyncio.CancelledError:
+            # Timed out by the circuit breaker; don't leave the node process behind
+            process.kill()
+            raise
         
         if process.returncode != 0:
             print(f"Node.js process error: {stderr.decode()}")
@@ -359,6 +620,208 @@ async def call_irys_service(request_data):
         print(f"Error calling Irys service: {str(e)}")
         return {"success": False, "error": str(e)}
 
+# Background jobs
+_periodic_tasks: List[asyncio.Task] = []
+# Lock file descriptor, held for the life of the process while the in-process indexes are on
+_index_lock: Optional[int] = None
+
+def run_periodically(interval: float, job, name: str):
+    """Run ``job`` every ``interval`` seconds until shutdown"""
+    async def loop():
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await job()
+            except Exception as e:
+                logging.error(f"Periodic job {name} failed: {str(e)}")
+
+    _periodic_tasks.append(asyncio.create_task(loop()))
+
+# Index management
+async def apply_index_manifest():
+    """Create missing indexes, then check that hot queries use them"""
+    try:
+        await ensure_indexes(db)
+        logger.info("Database indexes verified")
+        if INDEX_PLAN_CHECK:
+            await verify_query_plans(db)
+    except Exception as e:
+        logger.error(f"Failed to apply index manifest: {str(e)}")
+
+# Search index maintenance
+async def warm_search_index():
+    """Load the search index snapshot, then catch up on confessions inserted since"""
+    try:
+        state = await asyncio.to_thread(read_snapshot, SEARCH_SNAPSHOT_PATH)
+        if state and search_index.load_state(state):
+            logging.info(f"Loaded search index snapshot with {len(search_index)} confessions")
+
+        query = dict(LISTED)
+        if search_index.last_object_id:
+            query["_id"] = {"$gt": ObjectId(search_index.last_object_id)}
+
+        projection = {"id": 1, "content": 1, "tags": 1, "mood": 1, "author": 1, "timestamp": 1}
+        caught_up = 0
+        async for confession in search_db.confessions.find(query, projection).sort("_id", 1):
+            search_index.add(confession)
+            caught_up += 1
+
+        search_index.ready = True
+        logging.info(f"Search index ready: {len(search_index)} confessions ({caught_up} indexed since snapshot)")
+    except Exception as e:
+        logging.error(f"Failed to build search index, falling back to MongoDB search: {str(e)}")
+
+async def snapshot_search_index():
+    """Persist the search index if it changed since the last snapshot"""
+    if not search_index.ready or not search_index.dirty:
+        return
+    state = search_index.to_state()
+    search_index.dirty = False
+    await asyncio.to_thread(write_snapshot, SEARCH_SNAPSHOT_PATH, state)
+
+# Autocomplete maintenance
+async def warm_autocomplete():
+    """Seed the tag and username prefix indexes from MongoDB"""
+    try:
+        pipeline = [
+            {"$match": LISTED},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}}
+        ]
+        async for row in search_db.confessions.aggregate(pipeline):
+            tag_suggestions.set(row["_id"], row["count"])
+        
+        async for user in search_db.users.find({}, {"_id": 0, "username": 1, "stats.confession_count": 1}):
+            user_suggestions.set(user["username"], user.get("stats", {}).get("confession_count", 0))
+        
+        logging.info(f"Autocomplete ready: {len(tag_suggestions)} tags, {len(user_suggestions)} users")
+    except Exception as e:
+        logging.error(f"Failed to build autocomplete index: {str(e)}")
+
+# Trending maintenance
+def track_trending(confession: dict):
+    """Start tracking a confession, replaying its current counters as events at creation time"""
+    created_at = to_epoch(confession["timestamp"])
+    trending.add_confession(confession["id"], created_at, confession.get("_id"))
+    for event, field in (("upvote", "upvotes"), ("reply", "reply_count"), ("view", "view_count")):
+        count = confession.get(field) or 0
+        if count:
+            trending.record(confession["id"], event, EVENT_WEIGHTS[event] * count, now=created_at)
+
+async def warm_trending():
+    """Load the trending snapshot, then catch up on confessions inserted since"""
+    try:
+        state = await asyncio.to_thread(read_snapshot, TRENDING_SNAPSHOT_PATH)
+        if state and trending.load_state(state):
+            logging.info(f"Loaded trending snapshot with {len(trending)} confessions")
+        
+        query = dict(LISTED)
+        query["timestamp"] = {"$gte": datetime.utcnow() - timedelta(seconds=max(TIMEFRAMES.values()))}
+        if trending.last_object_id:
+            query["_id"] = {"$gt": ObjectId(trending.last_object_id)}
+        
+        projection = {"id": 1, "timestamp": 1, "upvotes": 1, "reply_count": 1, "view_count": 1}
+        async for confession in trending_db.confessions.find(query, projection).sort("_id", 1):
+            track_trending(confession)
+        
+        trending.ready = True
+        logging.info(f"Trending engine ready: {len(trending)} confessions")
+    except Exception as e:
+        logging.error(f"Failed to build trending engine, falling back to aggregation: {str(e)}")
+
+async def snapshot_trending():
+    """Expire old confessions and persist trending scores if they changed"""
+    if not trending.ready:
+        return
+    trending.prune()
+    state = trending.to_state()
+    trending.dirty = False
+    await asyncio.to_thread(write_snapshot, TRENDING_SNAPSHOT_PATH, state)
+
+# Tag counter maintenance
+async def warm_tag_counters():
+    """Fill the hourly tag buckets from confessions inside the largest window"""
+    try:
+        window = timedelta(hours=max(TAG_WINDOWS.values()))
+        query = dict(LISTED)
+        query["timestamp"] = {"$gte": datetime.utcnow() - window}
+        async for confession in trending_db.confessions.find(query, {"_id": 0, "tags": 1, "timestamp": 1}):
+            tag_counters.add(confession.get("tags") or [], to_epoch(confession["timestamp"]))
+        
+        tag_counters.ready = True
+        logging.info("Tag counters ready")
+    except Exception as e:
+        logging.error(f"Failed to build tag counters, falling back to aggregation: {str(e)}")
+
+# Stats rollup maintenance
+async def init_stats_rollup():
+    """Backfill the stats rollup from all history if it has never been built"""
+    try:
+        if await stats_rollup.totals() is None:
+            await stats_rollup.reconcile(analytics_db, hours=None)
+            logging.info("Stats rollup backfilled")
+    except Exception as e:
+        logging.error(f"Failed to backfill stats rollup: {str(e)}")
+
+async def reconcile_stats():
+    await stats_rollup.reconcile(analytics_db)
+
+# Time-series maintenance
+def snapshot_pid(path: Path) -> Optional[int]:
+    """Process id in 'timeseries.<pid>.snapshot' (or 'timeseries.<pid>-<claim>.snapshot')"""
+    try:
+        return int(path.name.split('.')[1].split('-')[0])
+    except (IndexError, ValueError):
+        return None
+
+async def load_timeseries():
+    """Take over this process id's snapshot and those of exited workers; merge live workers' in for queries"""
+    loaded = 0
+    adopted = []
+    for path in sorted(DATA_DIR.glob('timeseries.*.snapshot')):
+        pid = snapshot_pid(path)
+        own = path == TIMESERIES_SNAPSHOT_PATH
+        if not own and (pid is None or pid == os.getpid() or not process_alive(pid)):
+            # Renaming first means only one of several starting workers adopts an exited worker's counts
+            claimed = DATA_DIR / f'timeseries.{os.getpid()}-{uuid.uuid4().hex[:8]}.snapshot'
+            if not await asyncio.to_thread(claim_file, path, claimed):
+                continue
+            adopted.append(claimed)
+            path, own = claimed, True
+        state = await asyncio.to_thread(read_snapshot, path)
+        if state and timeseries.load_state(state, own=own):
+            loaded += 1
+    if adopted:
+        # The adopted counts are in this worker's snapshot before the files they came from go away
+        await asyncio.to_thread(write_snapshot, TIMESERIES_SNAPSHOT_PATH, timeseries.to_state())
+        for path in adopted:
+            path.unlink(missing_ok=True)
+    if loaded:
+        logging.info(f"Loaded {loaded} time-series snapshots ({len(adopted)} from exited workers)")
+
+async def snapshot_timeseries():
+    """Drop expired buckets and persist the time-series store if it changed"""
+    if not timeseries.dirty:
+        return
+    timeseries.prune()
+    state = timeseries.to_state()
+    timeseries.dirty = False
+    await asyncio.to_thread(write_snapshot, TIMESERIES_SNAPSHOT_PATH, state)
+
+async def drain_upload_queue():
+    """Retry Irys uploads queued while the service was unavailable"""
+    if irys_breaker.is_open:
+        return
+    await upload_queue.drain(posts_db, call_irys_service)
+
+async def archive_old_confessions():
+    """Move old confessions and their threads to the archive; they leave the in-memory indexes too"""
+    def forget(confessions):
+        for confession in confessions:
+            search_index.remove(confession["id"])
+            trending.forget(confession["id"])
+    await archiver.run(on_archived=forget)
+
 # WebSocket endpoint
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
@@ -379,6 +842,103 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@api_router.get("/health/db")
+async def db_health():
+    """MongoDB connection pool metrics and read/write routing"""
+    return {
+        "pool": pool_metrics.snapshot(),
+        "pool_options": pool_options(),
+        "routing": routing_summary()
+    }
+
+@api_router.get("/health/dependencies")
+async def dependency_health():
+    """Circuit breaker state, load shedding and fallbacks for Claude and Irys"""
+    try:
+        queued_uploads = await upload_queue.depth()
+    except Exception as e:
+        logging.error(f"Failed to count queued uploads: {str(e)}")
+        queued_uploads = None
+    
+    return {
+        "claude": {
+            "breaker": claude_breaker.snapshot(),
+            "concurrency": analysis_slots.snapshot(),
+            "fallback": CLAUDE_FALLBACK
+        },
+        "irys": {
+            "breaker": irys_breaker.snapshot(),
+            "concurrency": irys_slots.snapshot(),
+            "fallback": IRYS_FALLBACK,
+            "queued_uploads": queued_uploads
+        },
+        "rate_limited": rate_limiter.rejected
+    }
+
+# Debug Routes
+@api_router.get("/debug/event-loop", dependencies=[Depends(require_admin)])
+async def event_loop_debug(limit: int = 20):
+    """Event loop lag percentiles and recent stalls with the stacks that caused them"""
+    return loop_monitor.snapshot(limit)
+
+@api_router.get("/debug/traces", dependencies=[Depends(require_admin)])
+async def recent_traces(limit: int = 20, min_duration_ms: float = 0, name: Optional[str] = None):
+    """Recent request traces, newest first, with a per-stage latency breakdown"""
+    traces = trace_buffer.traces(max(1, min(limit, 200)), min_duration_ms, name)
+    return {"traces": traces, "count": len(traces)}
+
+# Admin Routes
+@api_router.get("/admin/query-shapes", dependencies=[Depends(require_admin)])
+async def query_shapes(limit: int = 20, sort: str = "total"):
+    """MongoDB query shapes by total time (or count, max, avg), with plans of slow ones"""
+    shapes = query_profiler.top(max(1, min(limit, 200)), sort)
+    return {"shapes": shapes, "count": len(shapes), "slow_threshold_ms": query_profiler.slow_seconds * 1000}
+
+@api_router.delete("/admin/query-shapes", dependencies=[Depends(require_admin)])
+async def reset_query_shapes():
+    """Start a fresh profiling window"""
+    query_profiler.reset()
+    return {"status": "reset"}
+
+@api_router.get("/admin/archive", dependencies=[Depends(require_admin)])
+async def archive_status():
+    """Archive settings, documents in each archive collection and the last archiver run"""
+    return {
+        "enabled": ARCHIVE_AFTER_DAYS > 0,
+        "archive_after_days": ARCHIVE_AFTER_DAYS,
+        "counts": await archiver.counts(),
+        "last_run": archiver.last_run,
+    }
+
+@api_router.get("/admin/profile", dependencies=[Depends(require_admin), Depends(rate_limit("profiles"))])
+async def cpu_profile(seconds: float = 10, interval_ms: float = 10, format: str = "collapsed",
+                      threads: str = "all", include_idle: bool = False):
+    """Sample the live process's stacks for ``seconds``; collapsed stacks or a speedscope profile"""
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'speedscope'")
+    if threads not in ("all", "loop"):
+        raise HTTPException(status_code=400, detail="threads must be 'all' or 'loop'")
+    if seconds <= 0 or seconds > PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS:g}")
+    
+    # The sampler runs on a worker thread; the event loop keeps serving (and is itself sampled)
+    thread_ids = {threading.get_ident()} if threads == "loop" else None
+    try:
+        profile = await asyncio.to_thread(sampling_profiler.run, seconds, interval_ms / 1000, thread_ids, include_idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    logging.info(f"CPU profile taken: {profile.summary()}")
+    if format == "speedscope":
+        return FastJSONResponse(
+            profile.speedscope(name=f"irys-confession-api {datetime.utcnow().isoformat()}"),
+            headers={"Content-Disposition": "attachment; filename=profile.speedscope.json"}
+        )
+    return PlainTextResponse(profile.collapsed(), headers={
+        "X-Profile-Samples": str(profile.samples),
+        "X-Profile-Duration": f"{profile.duration:.3f}",
+    })
+
 # User Authentication Routes
 @api_router.post("/auth/register")
 async def register_user(user: UserCreate):
@@ -433,6 +993,8 @@ async def register_user(user: UserCreate):
         
         # Insert user into database
         await db.users.insert_one(user_doc)
+        user_suggestions.add(user.username, 0)
+        await stats_rollup.record_user(user_doc)
         
         # Create access token
         access_token = create_access_token(
@@ -528,13 +1090,8 @@ async def update_user_preferences(
         raise HTTPException(status_code=500, detail=str(e))
 
 # Confession Routes
-@api_router.post("/confessions")
-async def create_confession(
-    confession: ConfessionCreate,
-    background_tasks: BackgroundTasks,
-    current_user: dict = Depends(get_current_user_optional)
-):
-    """Create a new confession with AI analysis"""
+async def post_confession(confession: ConfessionCreate, current_user: Optional[dict]) -> dict:
+    """Analyze, upload and store a confession"""
     try:
         # Determine author
         author = current_user["username"] if current_user else "anonymous"
@@ -592,14 +1149,21 @@ async def create_confession(
             {"name": "Timestamp", "value": str(int(datetime.utcnow().timestamp()))}
         ]
         
-        irys_result = await call_irys_service({
+        irys_request = {
             "action": "upload",
             "data": confession_data,
             "tags": irys_tags
-        })
+        }
+        irys_result = await call_irys_service(irys_request)
         
+        queued = False
         if not irys_result.get("success"):
-            raise HTTPException(status_code=500, detail=f"Failed to upload to Irys: {irys_result.get('error')}")
+            if IRYS_FALLBACK != "queue":
+                raise HTTPException(status_code=500, detail=f"Failed to upload to Irys: {irys_result.get('error')}")
+            # Store the confession now and upload it once Irys recovers
+            logging.warning(f"Irys upload failed, queueing: {irys_result.get('error')}")
+            queued = True
+            irys_result = {"tx_id": None, "gateway_url": None}
         
         # Store confession in database
         confession_doc = {
@@ -610,7 +1174,7 @@ async def create_confession(
             "author": author,
             "author_id": author_id,
             "timestamp": datetime.utcnow(),
-            "verified": True,
+            "verified": not queued,
             "gateway_url": irys_result["gateway_url"],
             "upvotes": 0,
             "downvotes": 0,
@@ -618,7 +1182,6 @@ async def create_confession(
             "view_count": 0,
             "tags": confession_data["tags"],
             "mood": confession_data["mood"],
-            "ai_analysis": confession_data["ai_analysis"],
             "crisis_level": crisis_level,
             "moderation": {
                 "flagged": moderation_analysis.get("recommended_action") == "flag",
@@ -627,14 +1190,35 @@ async def create_confession(
             }
         }
         
-        await db.confessions.insert_one(confession_doc)
+        with tracer.span("mongo.insert_confession"):
+            await posts_db.confessions.insert_one(confession_doc)
+            await analyses.save(confession_doc["id"], "confession", confession_data["ai_analysis"])
+            if queued:
+                await upload_queue.enqueue(irys_request, "confessions", confession_doc["id"])
+        with tracer.span("stats.record"):
+            await stats_rollup.record_confession(confession_doc)
+            timeseries.record("confessions")
+            timeseries.record(f"crisis.{series_label(crisis_level, TIMESERIES_CRISIS_LEVELS)}")
+            timeseries.record(f"mood.{series_label(confession_doc['mood'], TIMESERIES_MOODS)}")
+        
+        if is_listed(confession_doc):
+            with tracer.span("index.update"):
+                for tag in confession_doc["tags"]:
+                    tag_suggestions.add(tag)
+                if current_user:
+                    user_suggestions.add(author)
+                if IN_PROCESS_INDEXES:
+                    search_index.add(confession_doc)
+                    trending.add_confession(confession_doc["id"], to_epoch(confession_doc["timestamp"]), confession_doc.get("_id"))
+                    tag_counters.add(confession_doc["tags"], to_epoch(confession_doc["timestamp"]))
         
         # Update user stats
         if current_user:
-            await db.users.update_one(
-                {"id": current_user["id"]},
-                {"$inc": {"stats.confession_count": 1}}
-            )
+            with tracer.span("mongo.user_stats"):
+                await posts_db.users.update_one(
+                    {"id": current_user["id"]},
+                    {"$inc": {"stats.confession_count": 1}}
+                )
         
         # Broadcast new confession to connected users
         if confession.is_public:
@@ -656,30 +1240,53 @@ async def create_confession(
             "id": confession_doc["id"],
             "tx_id": irys_result["tx_id"],
             "gateway_url": irys_result["gateway_url"],
-            "share_url": f"/#/c/{irys_result['tx_id']}" + ("" if confession.is_public else f"#{author}"),
-            "verified": True,
+            "share_url": f"/#/c/{irys_result['tx_id'] or confession_doc['id']}" + ("" if confession.is_public else f"#{author}"),
+            "verified": not queued,
             "ai_analysis": confession_data["ai_analysis"],
             "crisis_support": crisis_level in ["high", "critical"],
-            "message": "Confession posted successfully!"
+            "message": "Confession posted; blockchain upload is queued" if queued else "Confession posted successfully!"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Reply Routes
-@api_router.post("/confessions/{confession_id}/replies")
-async def create_reply(
-    confession_id: str,
-    reply: ReplyCreate,
+def idempotent_response(result: IdempotentResult):
+    headers = {"Idempotent-Replayed": "true"} if result.replayed else None
+    return FastJSONResponse(result.body, status_code=result.status_code, headers=headers)
+
+@api_router.post("/confessions", dependencies=[Depends(rate_limit("confessions"))])
+async def create_confession(
+    confession: ConfessionCreate,
     background_tasks: BackgroundTasks,
-    current_user: dict = Depends(get_current_user_optional)
+    request: Request,
+    current_user: dict = Depends(get_current_user_optional),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Create a reply to a confession"""
+    """Create a new confession with AI analysis"""
+    if not idempotency_key:
+        return await post_confession(confession, current_user)
+    result = await idempotency.run(
+        "confessions",
+        idempotency_key,
+        # Anonymous callers are told apart by address, so they cannot replay each other's responses
+        client_key(request, JWT_SECRET, JWT_ALGORITHM),
+        confession.dict(),
+        lambda: post_confession(confession, current_user)
+    )
+    return idempotent_response(result)
+
+# Reply Routes
+async def post_reply(confession_id: str, reply: ReplyCreate, current_user: Optional[dict]) -> dict:
+    """Analyze, store and (for signed-in users) upload a reply"""
     try:
         # Check if confession exists
-        confession = await db.confessions.find_one({"$or": [{"id": confession_id}, {"tx_id": confession_id}]})
+        confession, archived = await find_with_archive(db, "confessions", {"$or": [{"id": confession_id}, {"tx_id": confession_id}]})
         if not confession:
             raise HTTPException(status_code=404, detail="Confession not found")
+        if archived:
+            raise HTTPException(status_code=410, detail="Confession is archived and read-only")
         
         # Determine author
         author = current_user["username"] if current_user else "anonymous"
@@ -723,7 +1330,6 @@ async def create_reply(
             "upvotes": 0,
             "downvotes": 0,
             "verified": False,
-            "ai_analysis": {"moderation": moderation_analysis},
             "crisis_level": crisis_level,
             "moderation": {
                 "flagged": moderation_analysis.get("recommended_action") == "flag",
@@ -750,23 +1356,30 @@ async def create_reply(
                 {"name": "Timestamp", "value": str(int(datetime.utcnow().timestamp()))}
             ]
             
-            irys_result = await call_irys_service({
+            irys_request = {
                 "action": "upload",
                 "data": reply_data,
                 "tags": irys_tags
-            })
+            }
+            irys_result = await call_irys_service(irys_request)
             
             if irys_result.get("success"):
                 reply_doc["tx_id"] = irys_result["tx_id"]
                 reply_doc["verified"] = True
         
-        await db.replies.insert_one(reply_doc)
+        await posts_db.replies.insert_one(reply_doc)
+        await analyses.save(reply_doc["id"], "reply", {"moderation": moderation_analysis})
+        if current_user and not reply_doc["verified"] and IRYS_FALLBACK == "queue":
+            await upload_queue.enqueue(irys_request, "replies", reply_doc["id"])
+        await stats_rollup.record_reply(reply_doc)
+        timeseries.record("replies")
         
         # Update reply count on confession
-        await db.confessions.update_one(
+        await posts_db.confessions.update_one(
             {"id": confession["id"]},
             {"$inc": {"reply_count": 1}}
         )
+        trending.record(confession["id"], "reply")
         
         # Broadcast new reply to connected users
         await manager.broadcast(json.dumps({
@@ -788,48 +1401,59 @@ async def create_reply(
             "message": "Reply posted successfully!"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/confessions/{confession_id}/replies", dependencies=[Depends(rate_limit("replies"))])
+async def create_reply(
+    confession_id: str,
+    reply: ReplyCreate,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    current_user: dict = Depends(get_current_user_optional),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Create a reply to a confession"""
+    if not idempotency_key:
+        return await post_reply(confession_id, reply, current_user)
+    result = await idempotency.run(
+        f"replies:{confession_id}",
+        idempotency_key,
+        client_key(request, JWT_SECRET, JWT_ALGORITHM),
+        reply.dict(),
+        lambda: post_reply(confession_id, reply, current_user)
+    )
+    return idempotent_response(result)
+
 @api_router.get("/confessions/{confession_id}/replies")
 async def get_replies(confession_id: str, limit: int = 50, offset: int = 0):
     """Get replies for a confession"""
     try:
-        # Find confession
-        confession = await db.confessions.find_one({"$or": [{"id": confession_id}, {"tx_id": confession_id}]})
+        # Find confession; an archived thread is read from the archive
+        confession, archived = await find_with_archive(db, "confessions", {"$or": [{"id": confession_id}, {"tx_id": confession_id}]})
         if not confession:
             raise HTTPException(status_code=404, detail="Confession not found")
         
         # Get replies
-        cursor = db.replies.find(
+        replies_collection = db[archive_name("replies")] if archived else db.replies
+        cursor = replies_collection.find(
             {"confession_id": confession["id"]},
             {"_id": 0}
         ).sort("timestamp", 1).skip(offset).limit(limit)
         
         replies = await cursor.to_list(length=limit)
         
-        # Build threaded structure
-        reply_map = {}
-        root_replies = []
-        
-        for reply in replies:
-            reply_map[reply["id"]] = reply
-            reply["children"] = []
-            
-            if reply["parent_reply_id"]:
-                parent = reply_map.get(reply["parent_reply_id"])
-                if parent:
-                    parent["children"].append(reply)
-            else:
-                root_replies.append(reply)
-        
-        return {
-            "replies": root_replies,
+        return FastJSONResponse({
+            "replies": build_reply_tree(replies),
             "count": len(replies),
             "offset": offset,
             "limit": limit
-        }
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -848,48 +1472,58 @@ async def get_public_confessions(
         sort_param = [(sort_by, sort_order)]
         
         # Query database for public confessions
-        cursor = db.confessions.find(
-            {"is_public": True, "moderation.approved": {"$ne": False}},
+        cursor = feed_db.confessions.find(
+            LISTED,
             {"_id": 0}
         ).sort(sort_param).skip(offset).limit(limit)
         
         confessions = await cursor.to_list(length=limit)
         
-        return {
+        return FastJSONResponse({
             "confessions": confessions,
             "count": len(confessions),
             "offset": offset,
             "limit": limit
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/confessions/{tx_id}")
-async def get_confession(tx_id: str):
-    """Get specific confession by transaction ID"""
+async def get_confession(tx_id: str, include_analysis: bool = False):
+    """Get specific confession by transaction ID; ``include_analysis`` adds the full AI analysis"""
     try:
-        # Find confession
-        confession = await db.confessions.find_one(
+        # Find confession, falling through to the archive
+        confession, archived = await find_with_archive(
+            db, "confessions",
             {"$or": [{"tx_id": tx_id}, {"id": tx_id}]},
             {"_id": 0}
         )
         
         if not confession:
             raise HTTPException(status_code=404, detail="Confession not found")
+        if include_analysis:
+            confession["ai_analysis"] = await analyses.get(confession["id"])
+        if archived:
+            # Archived confessions are read-only: no view counting or trending
+            confession["archived"] = True
+            return FastJSONResponse(confession)
         
         # Increment view count
-        await db.confessions.update_one(
+        await telemetry_db.confessions.update_one(
             {"id": confession["id"]},
             {"$inc": {"view_count": 1}}
         )
+        trending.record(confession["id"], "view")
         
-        return confession
+        return FastJSONResponse(confession)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/confessions/{confession_id}/vote")
+@api_router.post("/confessions/{confession_id}/vote", dependencies=[Depends(rate_limit("votes"))])
 async def vote_confession(
     confession_id: str,
     vote_request: VoteRequest,
@@ -901,9 +1535,11 @@ async def vote_confession(
             raise HTTPException(status_code=400, detail="Invalid vote type")
         
         # Check if confession exists
-        confession = await db.confessions.find_one({"$or": [{"id": confession_id}, {"tx_id": confession_id}]})
+        confession, archived = await find_with_archive(db, "confessions", {"$or": [{"id": confession_id}, {"tx_id": confession_id}]})
         if not confession:
             raise HTTPException(status_code=404, detail="Confession not found")
+        if archived:
+            raise HTTPException(status_code=410, detail="Confession is archived and read-only")
         
         # Determine user identifier
         user_identifier = current_user["id"] if current_user else vote_request.user_address
@@ -921,22 +1557,26 @@ async def vote_confession(
             else:
                 # Change vote
                 old_vote = existing_vote["vote_type"]
-                await db.votes.update_one(
+                await votes_db.votes.update_one(
                     {"id": existing_vote["id"]},
                     {"$set": {"vote_type": vote_request.vote_type, "timestamp": datetime.utcnow()}}
                 )
                 
                 # Update confession counts
                 if old_vote == "upvote":
-                    await db.confessions.update_one(
+                    await votes_db.confessions.update_one(
                         {"id": confession["id"]},
                         {"$inc": {"upvotes": -1, "downvotes": 1}}
                     )
+                    # Retract at the time the upvote was recorded so the decayed amounts cancel
+                    trending.record(confession["id"], "upvote", -EVENT_WEIGHTS["upvote"],
+                                    now=to_epoch(existing_vote["timestamp"]))
                 else:
-                    await db.confessions.update_one(
+                    await votes_db.confessions.update_one(
                         {"id": confession["id"]},
                         {"$inc": {"upvotes": 1, "downvotes": -1}}
                     )
+                    trending.record(confession["id"], "upvote")
         else:
             # Record new vote
             vote_doc = {
@@ -947,14 +1587,18 @@ async def vote_confession(
                 "timestamp": datetime.utcnow()
             }
             
-            await db.votes.insert_one(vote_doc)
+            await votes_db.votes.insert_one(vote_doc)
             
             # Update confession vote count
             update_field = "upvotes" if vote_request.vote_type == "upvote" else "downvotes"
-            await db.confessions.update_one(
+            await votes_db.confessions.update_one(
                 {"id": confession["id"]},
                 {"$inc": {update_field: 1}}
             )
+            if vote_request.vote_type == "upvote":
+                trending.record(confession["id"], "upvote")
+        
+        timeseries.record("votes")
         
         # Broadcast vote update
         await manager.broadcast(json.dumps({
@@ -965,10 +1609,12 @@ async def vote_confession(
         
         return {"status": "success", "message": f"{vote_request.vote_type} recorded"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/replies/{reply_id}/vote")
+@api_router.post("/replies/{reply_id}/vote", dependencies=[Depends(rate_limit("votes"))])
 async def vote_reply(
     reply_id: str,
     vote_request: VoteRequest,
@@ -980,9 +1626,11 @@ async def vote_reply(
             raise HTTPException(status_code=400, detail="Invalid vote type")
         
         # Check if reply exists
-        reply = await db.replies.find_one({"id": reply_id})
+        reply, archived = await find_with_archive(db, "replies", {"id": reply_id})
         if not reply:
             raise HTTPException(status_code=404, detail="Reply not found")
+        if archived:
+            raise HTTPException(status_code=410, detail="Reply is archived and read-only")
         
         # Determine user identifier
         user_identifier = current_user["id"] if current_user else vote_request.user_address
@@ -999,19 +1647,19 @@ async def vote_reply(
             else:
                 # Change vote
                 old_vote = existing_vote["vote_type"]
-                await db.reply_votes.update_one(
+                await votes_db.reply_votes.update_one(
                     {"id": existing_vote["id"]},
                     {"$set": {"vote_type": vote_request.vote_type, "timestamp": datetime.utcnow()}}
                 )
                 
                 # Update reply counts
                 if old_vote == "upvote":
-                    await db.replies.update_one(
+                    await votes_db.replies.update_one(
                         {"id": reply_id},
                         {"$inc": {"upvotes": -1, "downvotes": 1}}
                     )
                 else:
-                    await db.replies.update_one(
+                    await votes_db.replies.update_one(
                         {"id": reply_id},
                         {"$inc": {"upvotes": 1, "downvotes": -1}}
                     )
@@ -1025,67 +1673,205 @@ async def vote_reply(
                 "timestamp": datetime.utcnow()
             }
             
-            await db.reply_votes.insert_one(vote_doc)
+            await votes_db.reply_votes.insert_one(vote_doc)
             
             # Update reply vote count
             update_field = "upvotes" if vote_request.vote_type == "upvote" else "downvotes"
-            await db.replies.update_one(
+            await votes_db.replies.update_one(
                 {"id": reply_id},
                 {"$inc": {update_field: 1}}
             )
         
+        timeseries.record("votes")
+        
         return {"status": "success", "message": f"{vote_request.vote_type} recorded"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Advanced Search Routes
+def build_search_query(search_request: SearchRequest) -> dict:
+    """MongoDB filter for a search request (used when the search index is unavailable)"""
+    query = dict(LISTED)
+    
+    # Text search
+    if search_request.query:
+        query["$text"] = {"$search": search_request.query}
+    
+    # Mood filter
+    if search_request.mood:
+        query["mood"] = search_request.mood
+    
+    # Tags filter
+    if search_request.tags:
+        query["tags"] = {"$in": search_request.tags}
+    
+    # Author filter
+    if search_request.author:
+        query["author"] = search_request.author
+    
+    # Date range filter
+    if search_request.date_from or search_request.date_to:
+        date_query = {}
+        if search_request.date_from:
+            date_query["$gte"] = search_request.date_from
+        if search_request.date_to:
+            date_query["$lte"] = search_request.date_to
+        query["timestamp"] = date_query
+    
+    return query
+
+async def find_page(query: dict, sort_param, cursor: Optional[str], limit: int):
+    """Offset-cursor page of confessions from MongoDB"""
+    offset = int(decode_cursor(cursor).get("o", 0)) if cursor else 0
+    found = search_db.confessions.find(query, {"_id": 0}).sort(sort_param).skip(offset).limit(limit + 1)
+    confessions = await found.to_list(length=limit + 1)
+    next_cursor = None
+    if len(confessions) > limit:
+        confessions = confessions[:limit]
+        next_cursor = encode_cursor({"o": offset + limit})
+    return confessions, next_cursor
+
+async def search_with_index(search_request: SearchRequest, limit: int):
+    """Resolve a search with the in-process index, hydrating results from MongoDB"""
+    filters = {
+        "mood": search_request.mood,
+        "tags": search_request.tags,
+        "author": search_request.author,
+        "date_from": search_request.date_from,
+        "date_to": search_request.date_to,
+    }
+    
+    if search_request.sort_by in INDEX_SORT_FIELDS:
+        hits = search_index.search(
+            search_request.query,
+            sort_by=search_request.sort_by,
+            order=search_request.order,
+            limit=limit,
+            cursor=search_request.cursor,
+            **filters
+        )
+        docs = await search_db.confessions.find({"id": {"$in": hits.ids}}, {"_id": 0}).to_list(length=len(hits.ids))
+        by_id = {doc["id"]: doc for doc in docs}
+        confessions = [by_id[cid] for cid in hits.ids if cid in by_id]
+        return confessions, hits.total, hits.next_cursor, hits.mask
+    
+    # Counters such as upvotes change on every vote, so MongoDB does the ordering
+    sort_param = [(search_request.sort_by, -1 if search_request.order == "desc" else 1)]
+    if not search_request.query:
+        confessions, next_cursor = await find_page(build_search_query(search_request), sort_param, search_request.cursor, limit)
+        return confessions, None, next_cursor, search_index.filter_mask(**filters)
+    
+    scores, mask = search_index.match(search_request.query, **filters)
+    docs = list(iter_bits(mask)) if scores is None else list(scores)
+    if len(docs) > SEARCH_MAX_SORT_CANDIDATES:
+        # Too many matches to pass as an $in list; MongoDB's text search filters and sorts the full set
+        query = build_search_query(search_request)
+    else:
+        query = {"id": {"$in": search_index.ids(docs)}}
+    confessions, next_cursor = await find_page(query, sort_param, search_request.cursor, limit)
+    return confessions, len(docs), next_cursor, mask
+
+def facet_cache_key(search_request: SearchRequest) -> str:
+    """Normalized search filters; sort order and pagination do not affect facets"""
+    query = search_request.query or ""
+    terms = " ".join(tokenize(query))
+    if terms and not query[-1].isspace():
+        terms += "*"
+    return json.dumps({
+        "q": terms,
+        "mood": search_request.mood,
+        "tags": sorted(search_request.tags),
+        "author": search_request.author,
+        "from": search_request.date_from,
+        "to": search_request.date_to
+    }, sort_keys=True, default=str)
+
+async def mongo_facets(search_request: SearchRequest) -> dict:
+    """Facet counts for a search in one MongoDB round trip"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    date_branches = [
+        {"case": {"$gte": ["$timestamp", today]}, "then": "today"},
+        {"case": {"$gte": ["$timestamp", today - timedelta(days=6)]}, "then": "last_7d"},
+        {"case": {"$gte": ["$timestamp", today - timedelta(days=29)]}, "then": "last_30d"}
+    ]
+    pipeline = [
+        {"$match": build_search_query(search_request)},
+        {"$facet": {
+            "mood": [
+                {"$match": {"mood": {"$ne": None}}},
+                {"$group": {"_id": "$mood", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}}
+            ],
+            "tags": [
+                {"$unwind": "$tags"},
+                {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": MAX_TAG_FACETS}
+            ],
+            "date": [
+                {"$group": {"_id": {"$switch": {"branches": date_branches, "default": "older"}}, "count": {"$sum": 1}}}
+            ]
+        }}
+    ]
+    result = await search_db.confessions.aggregate(pipeline).to_list(length=1)
+    facets = result[0] if result else {"mood": [], "tags": [], "date": []}
+    
+    date_counts = {row["_id"]: row["count"] for row in facets["date"]}
+    return {
+        "mood": [{"value": row["_id"], "count": row["count"]} for row in facets["mood"]],
+        "tags": [{"value": row["_id"], "count": row["count"]} for row in facets["tags"]],
+        "date": [
+            {"value": name, "count": date_counts.get(name, 0)}
+            for name in ("today", "last_7d", "last_30d", "older")
+        ]
+    }
+
+async def search_facets(search_request: SearchRequest, mask: Optional[int]) -> dict:
+    """Facet counts from the index result bitset when available, otherwise via $facet"""
+    key = facet_cache_key(search_request)
+    facets = facet_cache.get(key)
+    if facets is None:
+        if mask is not None:
+            facets = search_index.facet_counts(mask)
+        else:
+            facets = await mongo_facets(search_request)
+        facet_cache.set(key, facets)
+    return facets
+
 @api_router.post("/search")
 async def search_confessions(search_request: SearchRequest):
     """Advanced search for confessions"""
     try:
-        # Build search query
-        query = {"is_public": True, "moderation.approved": {"$ne": False}}
-        
-        # Text search
-        if search_request.query:
-            query["$text"] = {"$search": search_request.query}
-        
-        # Mood filter
-        if search_request.mood:
-            query["mood"] = search_request.mood
-        
-        # Tags filter
-        if search_request.tags:
-            query["tags"] = {"$in": search_request.tags}
-        
-        # Author filter
-        if search_request.author:
-            query["author"] = search_request.author
-        
-        # Date range filter
-        if search_request.date_from or search_request.date_to:
-            date_query = {}
-            if search_request.date_from:
-                date_query["$gte"] = search_request.date_from
-            if search_request.date_to:
-                date_query["$lte"] = search_request.date_to
-            query["timestamp"] = date_query
-        
-        # Sort parameters
-        sort_order = -1 if search_request.order == "desc" else 1
-        sort_param = [(search_request.sort_by, sort_order)]
-        
-        # Execute search
-        cursor = db.confessions.find(query, {"_id": 0}).sort(sort_param).limit(50)
-        confessions = await cursor.to_list(length=50)
+        limit = max(1, min(search_request.limit, 100))
         
-        return {
+        if search_index.ready:
+            confessions, total, next_cursor, mask = await search_with_index(search_request, limit)
+        else:
+            sort_order = -1 if search_request.order == "desc" else 1
+            sort_key = "timestamp" if search_request.sort_by == "relevance" else search_request.sort_by
+            confessions, next_cursor = await find_page(
+                build_search_query(search_request), [(sort_key, sort_order)], search_request.cursor, limit
+            )
+            total = None
+            mask = None
+        
+        response = {
             "confessions": confessions,
             "count": len(confessions),
+            "total": total,
+            "next_cursor": next_cursor,
             "query": search_request.dict()
         }
+        if search_request.facets:
+            response["facets"] = await search_facets(search_request, mask)
+        
+        return FastJSONResponse(response)
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1093,6 +1879,18 @@ async def search_confessions(search_request: SearchRequest):
 async def get_trending_confessions(limit: int = 20, timeframe: str = "24h"):
     """Get trending confessions"""
     try:
+        if trending.ready and timeframe in TIMEFRAMES and limit <= trending.top_k:
+            ids = trending.top(timeframe, limit)
+            docs = await trending_db.confessions.find({"id": {"$in": ids}}, {"_id": 0}).to_list(length=len(ids))
+            by_id = {doc["id"]: doc for doc in docs}
+            confessions = [by_id[cid] for cid in ids if cid in by_id]
+            
+            return FastJSONResponse({
+                "confessions": confessions,
+                "count": len(confessions),
+                "timeframe": timeframe
+            })
+        
         # Calculate time threshold
         if timeframe == "1h":
             time_threshold = datetime.utcnow() - timedelta(hours=1)
@@ -1109,9 +1907,8 @@ async def get_trending_confessions(limit: int = 20, timeframe: str = "24h"):
         pipeline = [
             {
                 "$match": {
-                    "is_public": True,
-                    "timestamp": {"$gte": time_threshold},
-                    "moderation.approved": {"$ne": False}
+                    **LISTED,
+                    "timestamp": {"$gte": time_threshold}
                 }
             },
             {
@@ -1146,29 +1943,38 @@ async def get_trending_confessions(limit: int = 20, timeframe: str = "24h"):
             {"$project": {"_id": 0, "engagement_score": 0, "time_decay": 0, "trending_score": 0}}
         ]
         
-        cursor = db.confessions.aggregate(pipeline)
+        cursor = trending_db.confessions.aggregate(pipeline)
         confessions = await cursor.to_list(length=limit)
         
-        return {
+        return FastJSONResponse({
             "confessions": confessions,
             "count": len(confessions),
             "timeframe": timeframe
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/tags/trending")
-async def get_trending_tags(limit: int = 20):
+async def get_trending_tags(limit: int = 20, timeframe: str = "7d"):
     """Get trending tags"""
     try:
+        if timeframe not in TAG_WINDOWS:
+            timeframe = "7d"
+        
+        if tag_counters.ready:
+            tags = tag_counters.top(timeframe, limit)
+            return FastJSONResponse({
+                "tags": tags,
+                "count": len(tags)
+            })
+        
         # Aggregation pipeline for trending tags
         pipeline = [
             {
                 "$match": {
-                    "is_public": True,
-                    "timestamp": {"$gte": datetime.utcnow() - timedelta(days=7)},
-                    "moderation.approved": {"$ne": False}
+                    **LISTED,
+                    "timestamp": {"$gte": datetime.utcnow() - timedelta(hours=TAG_WINDOWS[timeframe])}
                 }
             },
             {"$unwind": "$tags"},
@@ -1178,56 +1984,179 @@ async def get_trending_tags(limit: int = 20):
             {"$project": {"tag": "$_id", "count": 1, "_id": 0}}
         ]
         
-        cursor = db.confessions.aggregate(pipeline)
+        cursor = trending_db.confessions.aggregate(pipeline)
         tags = await cursor.to_list(length=limit)
         
-        return {
+        return FastJSONResponse({
             "tags": tags,
             "count": len(tags)
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/autocomplete")
+async def autocomplete(prefix: str = "", limit: int = 10, type: str = "all"):
+    """Tag and username suggestions for a prefix ('#' limits to tags, '@' to users)"""
+    limit = max(1, min(limit, tag_suggestions.top_k))
+    if prefix.startswith("#"):
+        prefix, type = prefix[1:], "tag"
+    elif prefix.startswith("@"):
+        prefix, type = prefix[1:], "user"
+    
+    return {
+        "prefix": prefix,
+        "tags": tag_suggestions.suggest(prefix, limit) if prefix and type in ("all", "tag") else [],
+        "users": user_suggestions.suggest(prefix, limit) if prefix and type in ("all", "user") else []
+    }
+
 # Analytics Routes
 @api_router.get("/analytics/stats")
-async def get_platform_stats():
+async def get_platform_stats(start: Optional[datetime] = None, end: Optional[datetime] = None):
     """Get platform statistics"""
     try:
-        # Get various stats
-        total_confessions = await db.confessions.count_documents({})
-        public_confessions = await db.confessions.count_documents({"is_public": True})
-        total_users = await db.users.count_documents({})
-        total_replies = await db.replies.count_documents({})
-        
-        # Get stats for last 24 hours
-        last_24h = datetime.utcnow() - timedelta(hours=24)
-        confessions_24h = await db.confessions.count_documents({"timestamp": {"$gte": last_24h}})
-        users_24h = await db.users.count_documents({"created_at": {"$gte": last_24h}})
-        
-        # Get mood distribution
-        mood_pipeline = [
-            {"$group": {"_id": "$mood", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        mood_cursor = db.confessions.aggregate(mood_pipeline)
-        mood_stats = await mood_cursor.to_list(length=10)
-        
-        return {
-            "total_confessions": total_confessions,
-            "public_confessions": public_confessions,
-            "total_users": total_users,
-            "total_replies": total_replies,
+        totals = await stats_rollup.totals()
+        if totals is None:
+            await stats_rollup.reconcile(analytics_db, hours=None)
+            totals = await stats_rollup.totals() or {}
+        
+        # Stats for the last 24 hourly buckets
+        last_24h = await stats_rollup.range(hour_start(datetime.utcnow()) - timedelta(hours=23))
+        
+        stats = {
+            "total_confessions": totals.get("confessions", 0),
+            "public_confessions": totals.get("public_confessions", 0),
+            "total_users": totals.get("users", 0),
+            "total_replies": totals.get("replies", 0),
             "last_24h": {
-                "confessions": confessions_24h,
-                "new_users": users_24h
+                "confessions": last_24h["confessions"],
+                "new_users": last_24h["users"]
             },
-            "mood_distribution": mood_stats
+            "mood_distribution": mood_distribution(totals.get("mood"))
         }
         
+        # Historical range, summed from hourly buckets
+        if start or end:
+            window = await stats_rollup.range(start, end)
+            stats["range"] = {
+                "start": start,
+                "end": end,
+                "confessions": window["confessions"],
+                "public_confessions": window["public_confessions"],
+                "new_users": window["users"],
+                "replies": window["replies"],
+                "mood_distribution": mood_distribution(window["mood"])
+            }
+        
+        return FastJSONResponse(stats)
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/analytics/timeseries")
+async def get_timeseries(
+    metrics: str = "confessions,votes,replies,crisis.*,mood.*",
+    resolution: str = "minute",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Bucketed event counts as columnar arrays (minute buckets cover the last day)"""
+    try:
+        names = [name.strip() for name in metrics.split(",") if name.strip()]
+        return FastJSONResponse(timeseries.query(
+            names,
+            resolution=resolution,
+            start=to_epoch(start) if start else None,
+            end=to_epoch(end) if end else None
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Export Routes
+async def stream_export(
+    collection,
+    visible: dict,
+    visibility: str,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    cursor: Optional[str],
+    compress: Optional[str],
+    current_user: Optional[dict],
+    filename: str,
+    join: Optional[dict] = None
+):
+    """NDJSON stream of a collection in (timestamp, id) order.
+
+    With ``join``, ``visible`` is matched once the parent document is attached (see joined_pipeline).
+    """
+    if visibility != "public" and (not current_user or current_user.get("role") not in (UserRole.MODERATOR, UserRole.ADMIN)):
+        raise HTTPException(status_code=403, detail="Only moderators can export non-public records")
+    try:
+        if join:
+            query = export_query(None, "all", date_from, date_to)
+            visibility_query = export_query(visible, visibility, None, None)
+        else:
+            query = export_query(visible, visibility, date_from, date_to)
+        if compress is not None and compress not in EXPORT_COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compress}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if cursor:
+        last = await collection.find_one({"id": cursor}, {"_id": 0, "id": 1, "timestamp": 1})
+        if not last:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = resume_after(query, last)
+
+    if join:
+        docs = collection.aggregate(joined_pipeline(query, visibility_query, join), batchSize=EXPORT_BATCH_SIZE)
+    else:
+        docs = collection.find(query, {"_id": 0}).sort(EXPORT_SORT).batch_size(EXPORT_BATCH_SIZE)
+    if compress:
+        # A .gz download rather than Content-Encoding, which HTTP clients would silently decode
+        return StreamingResponse(ndjson_lines(docs, compress), media_type="application/gzip", headers={
+            "Content-Disposition": f'attachment; filename="{filename}.ndjson.gz"'
+        })
+    return StreamingResponse(ndjson_lines(docs), media_type="application/x-ndjson", headers={
+        "Content-Disposition": f'attachment; filename="{filename}.ndjson"'
+    })
+
+@api_router.get("/export/confessions")
+async def export_confessions(
+    visibility: str = "public",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    compress: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_optional)
+):
+    """Stream confessions as NDJSON; pass the last received id as cursor to resume"""
+    return await stream_export(
+        analytics_db.confessions, LISTED, visibility, date_from, date_to,
+        cursor, compress, current_user, "confessions"
+    )
+
+@api_router.get("/export/replies")
+async def export_replies(
+    visibility: str = "public",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    compress: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_optional)
+):
+    """Stream replies as NDJSON; pass the last received id as cursor to resume"""
+    # A reply is public only if it is approved and its confession is listed
+    visible = {
+        "moderation.approved": APPROVED,
+        **{f"confession.{field}": condition for field, condition in LISTED.items()}
+    }
+    return await stream_export(
+        analytics_db.replies, visible, visibility, date_from, date_to,
+        cursor, compress, current_user, "replies",
+        join={"from": "confessions", "localField": "confession_id", "foreignField": "id", "as": "confession"}
+    )
+
 # Irys Routes
 @api_router.get("/irys/network-info")
 async def get_irys_network_info():
@@ -1262,20 +2191,22 @@ async def get_irys_address():
 async def verify_transaction(tx_id: str):
     """Verify transaction on Irys"""
     try:
-        # Check if transaction exists in our database
-        confession = await db.confessions.find_one({"tx_id": tx_id})
+        # Check if transaction exists in our database (hot collections, then the archive)
+        confession, archived = await find_with_archive(db, "confessions", {"tx_id": tx_id})
         if confession:
             return {
                 "verified": True,
                 "type": "confession",
+                "archived": archived,
                 "data": confession
             }
         
-        reply = await db.replies.find_one({"tx_id": tx_id})
+        reply, archived = await find_with_archive(db, "replies", {"tx_id": tx_id})
         if reply:
             return {
                 "verified": True,
                 "type": "reply",
+                "archived": archived,
                 "data": reply
             }
         
@@ -1290,6 +2221,36 @@ async def verify_transaction(tx_id: str):
 # Include the router in the main app
 app.include_router(api_router)
 
+# Request count and latency per route template, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Root span per request; continues the caller's trace when a traceparent header is sent
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, dependency and WebSocket metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+REGISTRY.gauge("websocket_connections", "Open WebSocket connections", lambda: len(manager.active_connections))
+REGISTRY.gauge("mongo_pool_connections_in_use", "Pooled MongoDB connections checked out", lambda: pool_metrics.snapshot()["in_use"])
+REGISTRY.gauge("mongo_pool_connections_open", "Open MongoDB connections", lambda: pool_metrics.snapshot()["connections_open"])
+REGISTRY.gauge(
+    "circuit_breaker_open", "1 while a dependency's circuit breaker is open",
+    lambda: {name: int(breaker.is_open) for name, breaker in (("claude", claude_breaker), ("irys", irys_breaker))},
+    ("dependency",)
+)
+REGISTRY.gauge(
+    "dependency_calls_in_flight", "Concurrent calls holding a dependency slot",
+    lambda: {"claude": analysis_slots.active, "irys": irys_slots.active},
+    ("dependency",)
+)
+REGISTRY.gauge(
+    "event_loop_lag_quantile_seconds", "Event loop lag percentiles over the recent window",
+    lambda: {str(q): loop_monitor.percentiles()[k] for q, k in ((0.5, "p50"), (0.9, "p90"), (0.99, "p99"))},
+    ("quantile",)
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1307,38 +2268,45 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
-    """Create indexes on startup"""
-    try:
-        # Create text index for search
-        await db.confessions.create_index([("content", "text"), ("tags", "text")])
-        
-        # Create other useful indexes
-        await db.confessions.create_index([("timestamp", -1)])
-        await db.confessions.create_index([("upvotes", -1)])
-        await db.confessions.create_index([("is_public", 1)])
-        await db.confessions.create_index([("author", 1)])
-        await db.confessions.create_index([("mood", 1)])
-        await db.confessions.create_index([("tx_id", 1)])
-        
-        # User indexes
-        await db.users.create_index([("username", 1)], unique=True)
-        await db.users.create_index([("email", 1)], unique=True, sparse=True)
-        
-        # Reply indexes
-        await db.replies.create_index([("confession_id", 1)])
-        await db.replies.create_index([("timestamp", 1)])
-        
-        # Vote indexes
-        await db.votes.create_index([("confession_id", 1), ("user_identifier", 1)], unique=True)
-        await db.reply_votes.create_index([("reply_id", 1), ("user_identifier", 1)], unique=True)
-        
-        logger.info("Database indexes created successfully")
-        
-    except Exception as e:
-        logger.error(f"Failed to create indexes: {str(e)}")
+    """Apply the index manifest and warm in-process subsystems in the background"""
+    query_profiler.start(client)
+    asyncio.create_task(apply_index_manifest())
+    
+    # Each subsystem falls back to MongoDB queries until it is ready
+    if IN_PROCESS_INDEXES:
+        global _index_lock
+        _index_lock = acquire_process_lock(IN_PROCESS_LOCK_PATH)
+        if _index_lock is None:
+            raise RuntimeError(f"Another process holds {IN_PROCESS_LOCK_PATH}: in-process indexes need a single "
+                               "worker, set IN_PROCESS_INDEXES=false to run several")
+        asyncio.create_task(warm_search_index())
+        asyncio.create_task(warm_trending())
+        asyncio.create_task(warm_tag_counters())
+        run_periodically(SEARCH_SNAPSHOT_INTERVAL, snapshot_search_index, "search_index_snapshot")
+        run_periodically(TRENDING_SNAPSHOT_INTERVAL, snapshot_trending, "trending_snapshot")
+    asyncio.create_task(warm_autocomplete())
+    asyncio.create_task(init_stats_rollup())
+    asyncio.create_task(load_timeseries())
+    
+    run_periodically(TIMESERIES_SNAPSHOT_INTERVAL, snapshot_timeseries, "timeseries_snapshot")
+    run_periodically(STATS_RECONCILE_INTERVAL, reconcile_stats, "stats_reconcile")
+    run_periodically(UPLOAD_QUEUE_INTERVAL, drain_upload_queue, "upload_queue_drain")
+    if ARCHIVE_AFTER_DAYS > 0:
+        run_periodically(ARCHIVE_INTERVAL, archive_old_confessions, "archive")
+    
+    if LOOP_MONITOR:
+        loop_monitor.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in _periodic_tasks:
+        task.cancel()
+    loop_monitor.stop()
+    for snapshot in (snapshot_search_index, snapshot_trending, snapshot_timeseries):
+        try:
+            await snapshot()
+        except Exception as e:
+            logger.error(f"Failed to write snapshot: {str(e)}")
     client.close()
 
 if __name__ == "__main__":
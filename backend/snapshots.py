@@ -0,0 +1,82 @@
+"""On-disk snapshots for in-memory subsystems (search index, trending, ...)"""
+import fcntl
+import logging
+import os
+import pickle
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+SNAPSHOT_MAGIC = b"IRYSSNAP1"
+
+
+def write_snapshot(path, state: Any):
+    """Atomically write a compressed snapshot of ``state`` to ``path``"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+    # Write to a temp file in the same directory, then rename over the old snapshot
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot(path) -> Optional[Any]:
+    """Read a snapshot written by ``write_snapshot``; returns None if missing or unreadable"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(SNAPSHOT_MAGIC):
+            logging.warning(f"Ignoring snapshot with unknown format: {path}")
+            return None
+        return pickle.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC):]))
+    except Exception as e:
+        logging.error(f"Failed to read snapshot {path}: {str(e)}")
+        return None
+
+
+def acquire_process_lock(path) -> Optional[int]:
+    """Take an exclusive lock on ``path`` for the life of the process; None if another process holds it"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this id is running (on this host)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def claim_file(path, claimed_path) -> bool:
+    """Atomically rename ``path`` to ``claimed_path``; False if another process claimed it first"""
+    try:
+        os.rename(path, claimed_path)
+    except FileNotFoundError:
+        return False
+    return True
@@ -0,0 +1,195 @@
+"""Pre-aggregated platform statistics.
+
+Write paths ``$inc`` a running totals document and a per-hour bucket document
+in the ``stats`` collection, so reads never count the underlying collections.
+A periodic reconciler recounts from source (hot and archive collections) on
+the primary and corrects any drift with ``$inc`` of the difference, so
+increments that land while it counts are kept rather than overwritten.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from pymongo import ReadPreference
+
+from archive import ARCHIVED_COLLECTIONS, archive_name
+
+TOTALS_ID = "totals"
+COUNTERS = ("confessions", "public_confessions", "users", "replies")
+RECONCILE_HOURS = 48
+
+
+def hour_start(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def hour_id(hour: datetime) -> str:
+    return f"hour:{hour.strftime('%Y-%m-%dT%H')}"
+
+
+def sources(name: str) -> Tuple[str, ...]:
+    """Collections holding ``name``'s documents: the hot one and, if archived, its archive"""
+    return (name, archive_name(name)) if name in ARCHIVED_COLLECTIONS else (name,)
+
+
+async def count_all(db, name: str, query: dict) -> int:
+    total = 0
+    for collection in sources(name):
+        total += await db[collection].count_documents(query)
+    return total
+
+
+def mood_key(mood: Optional[str]) -> str:
+    # Field names cannot contain '.' or start with '$'
+    return (mood or "unknown").replace(".", "_").replace("$", "_")
+
+
+def mood_distribution(moods: Dict[str, int], limit: int = 10) -> list:
+    """Top mood counts in the shape of the old ``$group`` on mood"""
+    rows = [
+        {"_id": None if mood == "unknown" else mood, "count": count}
+        for mood, count in (moods or {}).items() if count
+    ]
+    return sorted(rows, key=lambda row: -row["count"])[:limit]
+
+
+def drift(counted: dict, current: dict) -> Dict[str, int]:
+    """``$inc`` document that turns the ``current`` counters into the ``counted`` ones"""
+    changes = {name: counted.get(name, 0) - current.get(name, 0) for name in COUNTERS}
+    counted_moods, current_moods = counted.get("mood") or {}, current.get("mood") or {}
+    for mood in set(counted_moods) | set(current_moods):
+        changes[f"mood.{mood}"] = counted_moods.get(mood, 0) - current_moods.get(mood, 0)
+    return {field: change for field, change in changes.items() if change}
+
+
+class StatsRollup:
+    def __init__(self, collection):
+        self.collection = collection
+        # Reconciliation compares against the live counters, not a lagging secondary's copy
+        self.primary = collection.with_options(read_preference=ReadPreference.PRIMARY)
+
+    async def _inc(self, at: datetime, counters: Dict[str, int]):
+        """Increment the running totals and the hour bucket containing ``at``"""
+        hour = hour_start(at)
+        try:
+            await self.collection.update_one({"_id": TOTALS_ID}, {"$inc": counters}, upsert=True)
+            await self.collection.update_one(
+                {"_id": hour_id(hour)},
+                {"$inc": counters, "$setOnInsert": {"kind": "hour", "hour": hour}},
+                upsert=True
+            )
+        except Exception as e:
+            # Drift is corrected by the reconciler; never fail the write path over stats
+            logging.error(f"Failed to update stats rollup: {str(e)}")
+
+    async def record_confession(self, confession: dict):
+        counters = {"confessions": 1, f"mood.{mood_key(confession.get('mood'))}": 1}
+        if confession.get("is_public"):
+            counters["public_confessions"] = 1
+        await self._inc(confession["timestamp"], counters)
+
+    async def record_user(self, user: dict):
+        await self._inc(user["created_at"], {"users": 1})
+
+    async def record_reply(self, reply: dict):
+        await self._inc(reply["timestamp"], {"replies": 1})
+
+    # Reads
+    async def totals(self) -> Optional[dict]:
+        return await self.collection.find_one({"_id": TOTALS_ID})
+
+    async def range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+        """Summed counters over hour buckets in [start, end)"""
+        query = {"kind": "hour"}
+        if start or end:
+            query["hour"] = {}
+        if start:
+            query["hour"]["$gte"] = hour_start(start)
+        if end:
+            query["hour"]["$lt"] = end
+        summed = {name: 0 for name in COUNTERS}
+        moods: Dict[str, int] = {}
+        async for bucket in self.collection.find(query):
+            for name in COUNTERS:
+                summed[name] += bucket.get(name, 0)
+            for mood, count in (bucket.get("mood") or {}).items():
+                moods[mood] = moods.get(mood, 0) + count
+        summed["mood"] = moods
+        return summed
+
+    # Reconciliation
+    async def reconcile(self, db, hours: Optional[int] = RECONCILE_HOURS):
+        """Recount totals (and the last ``hours`` buckets, or all history if None) from source.
+
+        Counts always run on the primary: a lagging secondary would undo recent increments.
+        """
+        db = db.with_options(read_preference=ReadPreference.PRIMARY)
+        confessions = await count_all(db, "confessions", {})
+        public_confessions = await count_all(db, "confessions", {"is_public": True})
+        users = await count_all(db, "users", {})
+        replies = await count_all(db, "replies", {})
+        moods = {}
+        for collection in sources("confessions"):
+            async for row in db[collection].aggregate([{"$group": {"_id": "$mood", "count": {"$sum": 1}}}]):
+                key = mood_key(row["_id"])
+                moods[key] = moods.get(key, 0) + row["count"]
+
+        totals = {
+            "confessions": confessions,
+            "public_confessions": public_confessions,
+            "users": users,
+            "replies": replies,
+            "mood": moods
+        }
+        current = await self.primary.find_one({"_id": TOTALS_ID}) or {}
+        changes = drift(totals, current)
+        if changes:
+            if current:
+                logging.warning(f"Stats rollup drift corrected: {changes}")
+            await self.collection.update_one({"_id": TOTALS_ID}, {"$inc": changes}, upsert=True)
+
+        await self._reconcile_hours(db, hours)
+
+    async def _reconcile_hours(self, db, hours: Optional[int]):
+        since = hour_start(datetime.utcnow()) - timedelta(hours=hours) if hours else None
+        buckets: Dict[str, dict] = {}
+
+        def bucket(hour_key: str) -> dict:
+            if hour_key not in buckets:
+                hour = datetime.strptime(hour_key, "%Y-%m-%dT%H")
+                buckets[hour_key] = {"kind": "hour", "hour": hour, "mood": {}, **{name: 0 for name in COUNTERS}}
+            return buckets[hour_key]
+
+        counted = (
+            ("confessions", "timestamp", {"mood": "$mood", "public": "$is_public"}),
+            ("users", "created_at", {}),
+            ("replies", "timestamp", {}),
+        )
+        for name, field, extra in counted:
+            match = {field: {"$gte": since}} if since else {field: {"$type": "date"}}
+            group_id = {"hour": {"$dateToString": {"format": "%Y-%m-%dT%H", "date": f"${field}"}}, **extra}
+            pipeline = [{"$match": match}, {"$group": {"_id": group_id, "count": {"$sum": 1}}}]
+            rows = []
+            for collection in sources(name):
+                rows.extend(await db[collection].aggregate(pipeline).to_list(length=None))
+            for row in rows:
+                target = bucket(row["_id"]["hour"])
+                target[name] += row["count"]
+                if name == "confessions":
+                    if row["_id"].get("public"):
+                        target["public_confessions"] += row["count"]
+                    key = mood_key(row["_id"].get("mood"))
+                    target["mood"][key] = target["mood"].get(key, 0) + row["count"]
+
+        query = {"kind": "hour", "hour": {"$gte": since}} if since else {"kind": "hour"}
+        current = {doc["_id"]: doc async for doc in self.primary.find(query)}
+        for hour_key, doc in buckets.items():
+            current.setdefault(f"hour:{hour_key}", {"hour": doc["hour"]})
+        for bucket_id, existing in current.items():
+            changes = drift(buckets.get(bucket_id[len("hour:"):], {}), existing)
+            if changes:
+                await self.collection.update_one(
+                    {"_id": bucket_id},
+                    {"$inc": changes, "$setOnInsert": {"kind": "hour", "hour": existing["hour"]}},
+                    upsert=True
+                )
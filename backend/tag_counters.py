@@ -0,0 +1,139 @@
+"""Rolling, time-bucketed tag popularity counters.
+
+Tag counts live in a ring of hourly buckets. Each window (1h, 24h, 7d) keeps a
+running total that is incremented on write and decremented as buckets slide
+out of it, so reads never rescan confessions. Every bucket is a Space-Saving
+summary capped at ``capacity`` distinct tags: when a new tag arrives in a full
+bucket it replaces the least frequent one and inherits its count, which bounds
+memory for long-tail tags while keeping heavy hitters exact or overestimated.
+"""
+import heapq
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+BUCKET_SECONDS = 3600
+
+# Window name -> number of hourly buckets
+WINDOWS = {
+    "1h": 1,
+    "24h": 24,
+    "7d": 7 * 24,
+}
+
+DEFAULT_BUCKET_CAPACITY = 2000
+
+
+class RollingTagCounter:
+    def __init__(self, windows: Dict[str, int] = WINDOWS, capacity: int = DEFAULT_BUCKET_CAPACITY):
+        self.windows = dict(windows)
+        self.capacity = capacity
+        self.ring_size = max(self.windows.values())
+        self.ready = False
+        self._reset(None)
+
+    def _reset(self, hour: Optional[int]):
+        self.buckets: List[Dict[str, int]] = [{} for _ in range(self.ring_size)]
+        self.bucket_hours: List[Optional[int]] = [None] * self.ring_size
+        self.totals: Dict[str, Counter] = {name: Counter() for name in self.windows}
+        self.current_hour = hour
+        self._top_cache: Dict[tuple, List[dict]] = {}
+
+    def _held(self, hour: int) -> Optional[Dict[str, int]]:
+        """The bucket for ``hour`` if the ring still holds it"""
+        slot = hour % self.ring_size
+        if self.bucket_hours[slot] != hour:
+            return None
+        return self.buckets[slot]
+
+    def _bucket(self, hour: int) -> Optional[Dict[str, int]]:
+        """The bucket for ``hour``, created on demand while it is inside the ring"""
+        if hour > self.current_hour or hour <= self.current_hour - self.ring_size:
+            return None
+        slot = hour % self.ring_size
+        if self.bucket_hours[slot] != hour:
+            # Whatever the slot held has already slid out of every window
+            self.buckets[slot] = {}
+            self.bucket_hours[slot] = hour
+        return self.buckets[slot]
+
+    def _advance(self, now: float):
+        """Slide every window forward to the current hour"""
+        hour = int(now // BUCKET_SECONDS)
+        if self.current_hour is None or hour - self.current_hour >= self.ring_size:
+            self._reset(hour)
+        while self.current_hour < hour:
+            self.current_hour += 1
+            for name, length in self.windows.items():
+                expired = self._held(self.current_hour - length)
+                if expired:
+                    self._subtract(name, expired)
+            self._top_cache.clear()
+
+    def _subtract(self, name: str, counts: Dict[str, int]):
+        totals = self.totals[name]
+        for tag, count in counts.items():
+            remaining = totals[tag] - count
+            if remaining > 0:
+                totals[tag] = remaining
+            else:
+                del totals[tag]
+
+    def _adjust_totals(self, hour: int, tag: str, delta: int):
+        for name, length in self.windows.items():
+            if hour > self.current_hour - length:
+                totals = self.totals[name]
+                value = totals[tag] + delta
+                if value > 0:
+                    totals[tag] = value
+                else:
+                    del totals[tag]
+
+    def add(self, tags: Iterable[str], timestamp: float, delta: int = 1, now: Optional[float] = None):
+        """Count ``tags`` for a confession created at ``timestamp`` (negative delta removes)"""
+        self._advance(now or time.time())
+        hour = min(int(timestamp // BUCKET_SECONDS), self.current_hour)
+        bucket = self._bucket(hour)
+        if bucket is None:
+            return  # older than the largest window
+
+        for tag in set(tags):
+            if not tag:
+                continue
+            if delta < 0:
+                count = bucket.get(tag, 0)
+                if not count:
+                    continue
+                change = max(delta, -count)
+                if count + change:
+                    bucket[tag] = count + change
+                else:
+                    del bucket[tag]
+                self._adjust_totals(hour, tag, change)
+                continue
+
+            if tag not in bucket and len(bucket) >= self.capacity:
+                # Space-Saving: replace the least frequent tag, inheriting its count
+                victim = min(bucket, key=bucket.get)
+                inherited = bucket.pop(victim)
+                self._adjust_totals(hour, victim, -inherited)
+                bucket[tag] = inherited + delta
+                self._adjust_totals(hour, tag, inherited + delta)
+            else:
+                bucket[tag] = bucket.get(tag, 0) + delta
+                self._adjust_totals(hour, tag, delta)
+        self._top_cache.clear()
+
+    def remove(self, tags: Iterable[str], timestamp: float, now: Optional[float] = None):
+        self.add(tags, timestamp, delta=-1, now=now)
+
+    def top(self, window: str, limit: int = 20, now: Optional[float] = None) -> List[dict]:
+        """Most used tags in ``window``, in the same shape as the old aggregation"""
+        self._advance(now or time.time())
+        key = (window, limit)
+        cached = self._top_cache.get(key)
+        if cached is None:
+            totals = self.totals[window]
+            ranked = heapq.nsmallest(limit, totals.items(), key=lambda item: (-item[1], item[0]))
+            cached = self._top_cache[key] = [{"count": count, "tag": tag} for tag, count in ranked]
+        return cached
@@ -0,0 +1,130 @@
+"""Compact bucketed time-series store for operational analytics.
+
+Every recorded event is counted into minute, hour and day buckets at once, so
+each resolution is a ready-made rollup of the one below it. Old buckets are
+dropped per resolution (minutes after a day, hours after 30 days, days after a
+year). Queries return dense columnar arrays that can be charted directly.
+
+Each worker process persists only the counts it recorded itself (plus the
+snapshot it took over from a previous process with the same id) and merges the
+other workers' snapshots in for queries, so history is counted once however
+many workers load it.
+"""
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Resolution -> bucket width in seconds
+RESOLUTIONS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# Resolution -> number of buckets retained
+RETENTION = {
+    "minute": 24 * 60,
+    "hour": 30 * 24,
+    "day": 365,
+}
+
+MAX_POINTS = 2000
+SNAPSHOT_VERSION = 1
+
+
+class TimeSeriesStore:
+    def __init__(self):
+        self.dirty = False
+        self._reset()
+
+    def _reset(self):
+        # resolution -> bucket number -> metric -> value; ``buckets`` is what queries see, ``own`` what
+        # this process recorded and snapshots
+        self.buckets: Dict[str, Dict[int, Dict[str, float]]] = {res: {} for res in RESOLUTIONS}
+        self.own: Dict[str, Dict[int, Dict[str, float]]] = {res: {} for res in RESOLUTIONS}
+        self.metrics: set = set()
+
+    @staticmethod
+    def _add(target: Dict[int, Dict[str, float]], key: int, values: Dict[str, float]):
+        bucket = target.setdefault(key, {})
+        for metric, value in values.items():
+            bucket[metric] = bucket.get(metric, 0) + value
+
+    def record(self, metric: str, value: float = 1, at: Optional[float] = None):
+        """Add ``value`` to ``metric`` in the buckets containing ``at`` (default: now)"""
+        at = at or time.time()
+        for res, width in RESOLUTIONS.items():
+            for target in (self.buckets, self.own):
+                self._add(target[res], int(at // width), {metric: value})
+        self.metrics.add(metric)
+        self.dirty = True
+
+    def prune(self, now: Optional[float] = None):
+        """Drop buckets past their resolution's retention"""
+        now = now or time.time()
+        for res, width in RESOLUTIONS.items():
+            oldest = int(now // width) - RETENTION[res] + 1
+            for buckets in (self.buckets[res], self.own[res]):
+                for key in [k for k in buckets if k < oldest]:
+                    del buckets[key]
+        self.dirty = True
+
+    def expand(self, names: Iterable[str]) -> List[str]:
+        """Resolve metric names, where 'prefix.*' selects every metric under the prefix"""
+        resolved = []
+        for name in names:
+            if name.endswith(".*"):
+                prefix = name[:-1]
+                resolved.extend(sorted(m for m in self.metrics if m.startswith(prefix)))
+            elif name not in resolved:
+                resolved.append(name)
+        return resolved
+
+    def query(self, metrics: Iterable[str], resolution: str = "minute",
+              start: Optional[float] = None, end: Optional[float] = None) -> dict:
+        """Columnar series for ``metrics`` between ``start`` and ``end`` (epoch seconds)"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        width = RESOLUTIONS[resolution]
+        now = time.time()
+        last = int((end or now) // width)
+        first = int(start // width) if start else last - min(RETENTION[resolution], 60) + 1
+        first = max(first, int(now // width) - RETENTION[resolution] + 1)
+        if last - first + 1 > MAX_POINTS:
+            raise ValueError(f"Range too large: at most {MAX_POINTS} points per query")
+
+        names = self.expand(metrics)
+        buckets = self.buckets[resolution]
+        keys = range(first, last + 1)
+        empty: Dict[str, float] = {}
+        return {
+            "resolution": resolution,
+            "step": width,
+            "timestamps": [key * width for key in keys],
+            "series": {
+                name: [buckets.get(key, empty).get(name, 0) for key in keys]
+                for name in names
+            }
+        }
+
+    # Snapshots
+    def to_state(self) -> dict:
+        """This process's own counts; other workers' snapshots merged in for queries are left out"""
+        return {
+            "version": SNAPSHOT_VERSION,
+            "buckets": {res: {k: dict(v) for k, v in b.items()} for res, b in self.own.items()},
+        }
+
+    def load_state(self, state: dict, own: bool = True) -> bool:
+        """Add a snapshot's counts to the store; ``own=False`` merges them for queries without persisting them again"""
+        if not state or state.get("version") != SNAPSHOT_VERSION:
+            return False
+        dirty = self.dirty
+        for res in RESOLUTIONS:
+            for key, values in state["buckets"].get(res, {}).items():
+                self._add(self.buckets[res], key, values)
+                if own:
+                    self._add(self.own[res], key, values)
+                self.metrics.update(values)
+        self.prune()
+        self.dirty = dirty
+        return True
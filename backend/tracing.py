@@ -0,0 +1,290 @@
+"""Lightweight span-based request tracing.
+
+Spans nest through a context variable, so any code running inside a request
+(route, dependencies, helpers) attaches its spans to that request's trace
+without passing anything around. Trace context follows the W3C
+``traceparent`` format in and out of the process; helpers forward it to the
+Irys worker and tag LLM sessions with it.
+
+Finished spans go to pluggable exporters:
+
+- ``RingBufferExporter`` keeps the most recent traces in memory for
+  ``/api/debug/traces``
+- ``OTLPFileExporter`` appends OTLP/JSON ``ExportTraceServiceRequest`` lines
+  to a file from a background thread, for collectors or offline analysis
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns",
+                 "attributes", "status", "sampled", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "ok"
+        self.sampled = sampled
+        self._token = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    def __init__(self, service_name: str, exporters: List = (), sample_rate: float = 1.0):
+        self.service_name = service_name
+        self.exporters = list(exporters)
+        self.sample_rate = sample_rate
+        # trace_id -> finished spans, exported together when the local root ends
+        self._pending: Dict[str, List[Span]] = {}
+
+    def span(self, name: str, parent: Optional[str] = None, **attributes) -> "_SpanContext":
+        """Context manager for a child of the current span, or a new trace.
+
+        ``parent`` is an incoming ``traceparent`` header, used only for root spans.
+        """
+        return _SpanContext(self, name, parent, attributes)
+
+    def _start(self, name: str, parent: Optional[str], attributes: dict) -> Span:
+        current = _current_span.get()
+        if current is not None:
+            span = Span(name, current.trace_id, current.span_id, current.sampled, attributes)
+        else:
+            match = TRACEPARENT.match(parent or "")
+            if match:
+                trace_id, parent_id, flags = match.groups()
+                sampled = flags == "01"
+            else:
+                trace_id, parent_id = os.urandom(16).hex(), None
+                sampled = random.random() < self.sample_rate
+            span = Span(name, trace_id, parent_id, sampled, attributes)
+            self._pending[span.trace_id] = []
+        span._token = _current_span.set(span)
+        return span
+
+    def _end(self, span: Span, error: Optional[BaseException]):
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.status = "error"
+            span.attributes.setdefault("error", f"{type(error).__name__}: {error}")
+        _current_span.reset(span._token)
+
+        spans = self._pending.get(span.trace_id)
+        if spans is None:
+            return
+        spans.append(span)
+        if _current_span.get() is None:
+            # Local root finished: the trace is complete in this process
+            del self._pending[span.trace_id]
+            if span.sampled:
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(self.service_name, spans)
+                    except Exception as e:
+                        logging.error(f"Trace export failed: {str(e)}")
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "name", "parent", "attributes", "span")
+
+    def __init__(self, tracer: Tracer, name: str, parent: Optional[str], attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer._start(self.name, self.parent, self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._end(self.span, exc)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_traceparent() -> Optional[str]:
+    span = _current_span.get()
+    return span.traceparent if span else None
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def stage_breakdown(spans: List[dict]) -> Dict[str, float]:
+    """Milliseconds per span name, for a quick look at where a trace spent its time"""
+    stages: Dict[str, float] = {}
+    for span in spans:
+        if span["parent_id"] is not None and any(s["span_id"] == span["parent_id"] for s in spans):
+            stages[span["name"]] = round(stages.get(span["name"], 0) + span["duration_ms"], 3)
+    return stages
+
+
+class RingBufferExporter:
+    """Most recent ``max_traces`` traces in memory"""
+
+    def __init__(self, max_traces: int = 500):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[dict]]" = OrderedDict()
+
+    def export(self, service_name: str, spans: List[Span]):
+        trace_id = spans[0].trace_id
+        self._traces[trace_id] = [span.to_dict() for span in spans]
+        self._traces.move_to_end(trace_id)
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last=False)
+
+    def traces(self, limit: int = 50, min_duration_ms: float = 0, name: Optional[str] = None) -> List[dict]:
+        results = []
+        for trace_id in reversed(self._traces):
+            spans = self._traces[trace_id]
+            root = spans[-1]  # the local root ends last
+            if root["duration_ms"] < min_duration_ms or (name and name not in root["name"]):
+                continue
+            results.append({
+                "trace_id": trace_id,
+                "name": root["name"],
+                "duration_ms": root["duration_ms"],
+                "status": root["status"],
+                "stages": stage_breakdown(spans),
+                "spans": sorted(spans, key=lambda span: span["start_ns"]),
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPFileExporter:
+    """Appends one OTLP/JSON ExportTraceServiceRequest per trace; writes happen off the event loop"""
+
+    def __init__(self, path):
+        self.path = path
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name="otlp-file-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, service_name: str, spans: List[Span]):
+        self._queue.put(self.encode(service_name, spans))
+
+    @staticmethod
+    def encode(service_name: str, spans: List[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "irys-confessions.tracing"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,  # SPAN_KIND_INTERNAL
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                    "status": {"code": 2 if span.status == "error" else 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def _write_loop(self):
+        while True:
+            payload = self._queue.get()
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(payload) + "\n")
+                    # Drain whatever else is queued while the file is open
+                    while True:
+                        try:
+                            f.write(json.dumps(self._queue.get_nowait()) + "\n")
+                        except queue.Empty:
+                            break
+            except Exception as e:
+                logging.error(f"Failed to write traces to {self.path}: {str(e)}")
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per HTTP request, honouring incoming traceparent"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        with self.tracer.span(f"{scope['method']} {scope['path']}", parent, **{"http.method": scope["method"]}) as span:
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    span.set("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "error"
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"traceparent", span.traceparent.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.name = f"{scope['method']} {route}"
+                    span.set("http.route", route)
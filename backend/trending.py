@@ -0,0 +1,216 @@
+"""Incrementally maintained trending scores.
+
+Each engagement event adds ``weight * exp(rate * (t - T0))`` to a confession's
+score, so older events are worth exponentially less relative to newer ones
+without ever rescaling existing scores. Scores are kept as logarithms to stay
+in floating point range. Ranking by the log score at any moment is the same as
+ranking by the decayed score, so a top-K list per timeframe can be maintained
+on write and read back as a slice.
+"""
+import bisect
+import heapq
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Timeframe -> window length in seconds
+TIMEFRAMES = {
+    "1h": 3600,
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+    "30d": 30 * 24 * 3600,
+}
+
+# Engagement weights, matching the previous aggregation pipeline
+EVENT_WEIGHTS = {
+    "upvote": 1.0,
+    "reply": 2.0,
+    "view": 0.1,
+}
+# Creation counts for a token weight, so quiet confessions still trend (newest first) behind any engagement
+BASE_WEIGHT = 0.001
+
+# Scores halve every quarter of the timeframe window
+HALF_LIFE_FRACTION = 0.25
+T0 = 1704067200.0  # 2024-01-01T00:00:00Z, keeps exponents small
+DEFAULT_TOP_K = 100
+SNAPSHOT_VERSION = 2
+NEG_INF = float("-inf")
+
+
+def log_add(a: float, b: float) -> float:
+    """log(exp(a) + exp(b))"""
+    if a == NEG_INF:
+        return b
+    if b == NEG_INF:
+        return a
+    m = max(a, b)
+    return m + math.log(math.exp(a - m) + math.exp(b - m))
+
+
+def log_sub(a: float, b: float) -> float:
+    """log(exp(a) - exp(b)), or -inf once the result would be <= 0"""
+    if b == NEG_INF:
+        return a
+    if b >= a:
+        return NEG_INF
+    return a + math.log1p(-math.exp(b - a))
+
+
+class TrendingEngine:
+    def __init__(self, top_k: int = DEFAULT_TOP_K):
+        self.top_k = top_k
+        self.ready = False
+        self.dirty = False
+        self.rates = {
+            tf: math.log(2) / (window * HALF_LIFE_FRACTION) for tf, window in TIMEFRAMES.items()
+        }
+        self._reset()
+
+    def _reset(self):
+        self.created: Dict[str, float] = {}
+        self.scores: Dict[str, Dict[str, float]] = {tf: {} for tf in TIMEFRAMES}
+        # Per timeframe: up to top_k (-score, id) pairs in ascending order
+        self.tops: Dict[str, List[Tuple[float, str]]] = {tf: [] for tf in TIMEFRAMES}
+        self.stale = {tf: False for tf in TIMEFRAMES}
+        self.last_object_id: Optional[str] = None
+
+    def __len__(self):
+        return len(self.created)
+
+    # Events
+    def add_confession(self, confession_id: str, created_at: float, object_id=None):
+        """Start tracking a confession, scored at BASE_WEIGHT until it gets engagement"""
+        if object_id is not None:
+            object_id = str(object_id)
+            if self.last_object_id is None or object_id > self.last_object_id:
+                self.last_object_id = object_id
+        if confession_id in self.created:
+            return
+        self.created[confession_id] = created_at
+        self._apply_all(confession_id, BASE_WEIGHT, created_at)
+
+    def record(self, confession_id: str, event: str, weight: Optional[float] = None,
+               now: Optional[float] = None):
+        """Record an engagement event at ``now``; a negative weight retracts an earlier event and must be
+        given the time that event was recorded at, or it cancels a differently decayed amount"""
+        if confession_id not in self.created:
+            return
+        if weight is None:
+            weight = EVENT_WEIGHTS[event]
+        if weight:
+            self._apply_all(confession_id, weight, now or time.time())
+
+    def forget(self, confession_id: str):
+        """Stop tracking a confession"""
+        if self.created.pop(confession_id, None) is None:
+            return
+        for tf in TIMEFRAMES:
+            if self.scores[tf].pop(confession_id, None) is not None:
+                self.stale[tf] = True
+        self.dirty = True
+
+    def _apply_all(self, confession_id: str, weight: float, at: float):
+        created_at = self.created[confession_id]
+        now = time.time()
+        for tf, window in TIMEFRAMES.items():
+            if created_at >= now - window:
+                self._apply(tf, confession_id, weight, at)
+        self.dirty = True
+
+    def _apply(self, tf: str, confession_id: str, weight: float, at: float):
+        scores = self.scores[tf]
+        term = math.log(abs(weight)) + self.rates[tf] * (at - T0)
+        old = scores.get(confession_id, NEG_INF)
+        if weight > 0:
+            new = log_add(old, term)
+        else:
+            # Never below the creation weight: a retraction larger than what was added (e.g. an event
+            # replayed at creation time during warm-up) must not drop the confession from trending
+            floor = math.log(BASE_WEIGHT) + self.rates[tf] * (self.created[confession_id] - T0)
+            new = max(log_sub(old, term), floor)
+        if new == NEG_INF:
+            scores.pop(confession_id, None)
+        else:
+            scores[confession_id] = new
+        self._update_top(tf, confession_id, old, new)
+
+    def _update_top(self, tf: str, confession_id: str, old: float, new: float):
+        top = self.tops[tf]
+        was_top = False
+        if old != NEG_INF:
+            i = bisect.bisect_left(top, (-old, confession_id))
+            if i < len(top) and top[i] == (-old, confession_id):
+                del top[i]
+                was_top = True
+
+        if new == NEG_INF:
+            # Another confession may now belong in the top-K
+            self.stale[tf] = self.stale[tf] or was_top
+            return
+
+        entry = (-new, confession_id)
+        if len(top) < self.top_k or entry < top[-1]:
+            bisect.insort(top, entry)
+            if len(top) > self.top_k:
+                top.pop()
+        if was_top and new < old and len(self.scores[tf]) > len(top):
+            self.stale[tf] = True
+
+    # Reads
+    def _rebuild(self, tf: str, cutoff: float):
+        """Drop confessions that left the window and recompute the top-K"""
+        created = self.created
+        scores = self.scores[tf]
+        for confession_id in [cid for cid in scores if created.get(cid, 0) < cutoff]:
+            del scores[confession_id]
+        self.tops[tf] = heapq.nsmallest(
+            self.top_k, ((-score, cid) for cid, score in scores.items())
+        )
+        self.stale[tf] = False
+
+    def top(self, timeframe: str, limit: int, now: Optional[float] = None) -> List[str]:
+        """Ids of the ``limit`` highest scoring confessions created within ``timeframe``"""
+        cutoff = (now or time.time()) - TIMEFRAMES[timeframe]
+        if self.stale[timeframe]:
+            self._rebuild(timeframe, cutoff)
+
+        created = self.created
+        top = self.tops[timeframe]
+        ids = [cid for _, cid in top if created.get(cid, 0) >= cutoff]
+        if len(ids) < len(top):
+            # Some entries aged out of the window; refill from the full score table
+            self._rebuild(timeframe, cutoff)
+            ids = [cid for _, cid in self.tops[timeframe]]
+        return ids[:limit]
+
+    def prune(self, now: Optional[float] = None):
+        """Forget confessions older than the longest timeframe"""
+        now = now or time.time()
+        cutoff = now - max(TIMEFRAMES.values())
+        for confession_id in [cid for cid, ts in self.created.items() if ts < cutoff]:
+            del self.created[confession_id]
+        for tf, window in TIMEFRAMES.items():
+            self._rebuild(tf, now - window)
+        self.dirty = True
+
+    # Snapshots
+    def to_state(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "created": dict(self.created),
+            "scores": {tf: dict(scores) for tf, scores in self.scores.items()},
+            "last_object_id": self.last_object_id,
+        }
+
+    def load_state(self, state: dict) -> bool:
+        if not state or state.get("version") != SNAPSHOT_VERSION:
+            return False
+        self._reset()
+        self.created = state["created"]
+        for tf in TIMEFRAMES:
+            self.scores[tf] = state["scores"].get(tf, {})
+        self.last_object_id = state["last_object_id"]
+        self.prune()
+        self.dirty = False
+        return True
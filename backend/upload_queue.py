@@ -0,0 +1,95 @@
+"""Deferred Irys uploads.
+
+While the Irys circuit is open, confessions and replies are stored unverified
+and their upload requests are queued here. A periodic drainer retries them
+with exponential backoff and, once an upload succeeds, fills in the
+document's ``tx_id`` / ``gateway_url`` and marks it verified.
+
+Every worker drains the same queue, so items are claimed one at a time with a
+lease (``next_attempt`` pushed past the upload timeout plus a unique
+``lease`` token). Only the holder of the current lease may record the result;
+a worker whose lease expired mid-upload leaves the item to its new owner.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+
+DRAIN_BATCH = 20
+MAX_BACKOFF = timedelta(hours=1)
+# Longer than the Irys breaker timeout, so a live upload never loses its lease
+UPLOAD_LEASE = timedelta(minutes=5)
+
+
+class UploadQueue:
+    def __init__(self, collection, lease: timedelta = UPLOAD_LEASE):
+        self.collection = collection
+        self.lease = lease
+
+    async def enqueue(self, request: dict, target_collection: str, target_id: str):
+        now = datetime.utcnow()
+        await self.collection.insert_one({
+            "_id": str(uuid.uuid4()),
+            "request": request,
+            "target": {"collection": target_collection, "id": target_id},
+            "created_at": now,
+            "next_attempt": now,
+            "attempts": 0,
+            "last_error": None,
+            "lease": None
+        })
+
+    async def depth(self) -> int:
+        return await self.collection.count_documents({})
+
+    async def claim(self) -> Optional[dict]:
+        """Lease the oldest due item to this worker, or None if nothing is due"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"next_attempt": {"$lte": now}},
+            {"$set": {"next_attempt": now + self.lease, "lease": uuid.uuid4().hex}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def drain(self, db, upload: Callable[[dict], Awaitable[dict]], limit: int = DRAIN_BATCH) -> int:
+        """Retry due uploads; returns how many succeeded. Stops at the first failure."""
+        uploaded = 0
+        for _ in range(limit):
+            item = await self.claim()
+            if item is None:
+                break
+            owned = {"_id": item["_id"], "lease": item["lease"]}
+
+            result = await upload(item["request"])
+            if not result.get("success"):
+                attempts = item["attempts"] + 1
+                backoff = min(timedelta(seconds=30 * 2 ** min(attempts, 10)), MAX_BACKOFF)
+                await self.collection.update_one(
+                    owned,
+                    {"$set": {
+                        "attempts": attempts,
+                        "next_attempt": datetime.utcnow() + backoff,
+                        "last_error": result.get("error"),
+                        "lease": None
+                    }}
+                )
+                # The upstream is still unhealthy; leave the rest for the next run
+                break
+
+            # Deleting under our lease is what makes this worker's upload the one recorded
+            if (await self.collection.delete_one(owned)).deleted_count == 0:
+                logging.warning(f"Lease on queued upload {item['_id']} expired during upload; "
+                                f"discarding tx {result.get('tx_id')}")
+                continue
+            target = item["target"]
+            await db[target["collection"]].update_one(
+                {"id": target["id"], "tx_id": None},
+                {"$set": {"tx_id": result["tx_id"], "gateway_url": result["gateway_url"], "verified": True}}
+            )
+            uploaded += 1
+        if uploaded:
+            logging.info(f"Uploaded {uploaded} queued items to Irys")
+        return uploaded
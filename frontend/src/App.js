@@ -31,7 +31,7 @@ const ConfessionCard = ({ confession, onVote }) => {
       setLikeCount(prev => newLiked ? prev + 1 : prev - 1);
       
       if (onVote) {
-        await onVote(confession.tx_id, newLiked ? 'upvote' : 'downvote');
+        await onVote(confession.tx_id || confession.id, newLiked ? 'upvote' : 'downvote');
       }
     } catch (error) {
       console.error('Error voting:', error);
@@ -43,7 +43,7 @@ const ConfessionCard = ({ confession, onVote }) => {
 
   const handleShare = async () => {
     try {
-      const shareUrl = `${window.location.origin}/#/c/${confession.tx_id}`;
+      const shareUrl = `${window.location.origin}/#/c/${confession.tx_id || confession.id}`;
       await navigator.clipboard.writeText(shareUrl);
       alert('Link copied to clipboard!');
     } catch (error) {
@@ -396,7 +396,7 @@ function App() {
           ) : (
             confessions.map((confession) => (
               <ConfessionCard
-                key={confession.tx_id}
+                key={confession.tx_id || confession.id}
                 confession={confession}
                 onVote={handleVote}
               />
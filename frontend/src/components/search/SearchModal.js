@@ -32,6 +32,7 @@ const SearchModal = ({ isOpen, onClose }) => {
   const [trendingTags, setTrendingTags] = useState([]);
   const [recentSearches, setRecentSearches] = useState([]);
   const [showAdvancedFilters, setShowAdvancedFilters] = useState(false);
+  const [suggestions, setSuggestions] = useState({ tags: [], users: [] });
 
   const moods = [
     { value: 'happy', label: 'Happy', emoji: '😊' },
@@ -105,10 +106,31 @@ const SearchModal = ({ isOpen, onClose }) => {
     }
   }, 300);
 
+  const debouncedSuggest = debounce(async (query) => {
+    const prefix = query.split(/\s+/).pop();
+    if (!prefix) {
+      setSuggestions({ tags: [], users: [] });
+      return;
+    }
+
+    try {
+      const data = await confessionAPI.autocomplete(prefix);
+      setSuggestions({ tags: data.tags || [], users: data.users || [] });
+    } catch (error) {
+      setSuggestions({ tags: [], users: [] });
+    }
+  }, 100);
+
   const handleSearchChange = (e) => {
     const query = e.target.value;
     setSearchQuery(query);
     debouncedSearch(query, searchFilters);
+    debouncedSuggest(query);
+  };
+
+  const handleUserSuggestion = (username) => {
+    setSuggestions({ tags: [], users: [] });
+    handleFilterChange('author', username);
   };
 
   const handleFilterChange = (key, value) => {
@@ -121,6 +143,7 @@ const SearchModal = ({ isOpen, onClose }) => {
   };
 
   const handleTagSearch = (tag) => {
+    setSuggestions({ tags: [], users: [] });
     setSearchQuery(`#${tag}`);
     debouncedSearch(`#${tag}`, searchFilters);
   };
@@ -133,6 +156,7 @@ const SearchModal = ({ isOpen, onClose }) => {
   const clearSearch = () => {
     setSearchQuery('');
     setSearchResults([]);
+    setSuggestions({ tags: [], users: [] });
     setSearchFilters({
       mood: '',
       tags: [],
@@ -176,6 +200,32 @@ const SearchModal = ({ isOpen, onClose }) => {
           )}
         </div>
 
+        {/* Autocomplete Suggestions */}
+        {searchQuery && (suggestions.tags.length > 0 || suggestions.users.length > 0) && (
+          <div className="flex flex-wrap gap-2">
+            {suggestions.tags.map(tag => (
+              <button
+                key={`tag-${tag.value}`}
+                onClick={() => handleTagSearch(tag.value)}
+                className="px-3 py-1 bg-gray-700 hover:bg-gray-600 rounded-lg text-sm flex items-center gap-1"
+              >
+                <HashtagIcon className="w-3 h-3" />
+                {tag.value}
+              </button>
+            ))}
+            {suggestions.users.map(user => (
+              <button
+                key={`user-${user.value}`}
+                onClick={() => handleUserSuggestion(user.value)}
+                className="px-3 py-1 bg-gray-700 hover:bg-gray-600 rounded-lg text-sm flex items-center gap-1"
+              >
+                <UserIcon className="w-3 h-3" />
+                {user.value}
+              </button>
+            ))}
+          </div>
+        )}
+
         {/* Quick Filters */}
         <div className="flex flex-wrap gap-2">
           <button
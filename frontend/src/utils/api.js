@@ -91,6 +91,14 @@ export const confessionAPI = {
     return response.data;
   },
 
+  autocomplete: async (prefix, params = {}) => {
+    const { limit = 8, type = 'all' } = params;
+    const response = await api.get('/autocomplete', {
+      params: { prefix, limit, type }
+    });
+    return response.data;
+  },
+
   getTrending: async (params = {}) => {
     const { limit = 20, timeframe = '24h' } = params;
     const response = await api.get('/trending', {
@@ -149,8 +149,8 @@ export const getCrisisResources = () => {
 export const generateShareUrl = (confession) => {
   const baseUrl = window.location.origin;
   const path = confession.is_public ? 
-    `/confession/${confession.tx_id}` : 
-    `/confession/${confession.tx_id}?author=${confession.author}`;
+    `/confession/${confession.tx_id || confession.id}` : 
+    `/confession/${confession.tx_id || confession.id}?author=${confession.author}`;
   return `${baseUrl}${path}`;
 };
 
@@ -0,0 +1,152 @@
+import asyncio
+import copy
+
+import pytest
+
+from analyses import AnalysisStore, compact_fields
+
+MODERATION = {"recommended_action": "approve", "crisis_level": "low", "reasoning": "fine"}
+ENHANCEMENT = {"mood": "happy", "tags": ["life"]}
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict) and "$exists" in condition:
+            if (field in doc) != condition["$exists"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class Collection:
+    def __init__(self, docs=(), fail_writes=0):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+        self.fail_writes = fail_writes
+
+    def find(self, query, projection=None):
+        return Cursor([copy.deepcopy(doc) for doc in self.docs.values() if matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        return copy.deepcopy(self.docs.get(query["_id"]))
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = copy.deepcopy(doc)
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise RuntimeError("connection lost")
+        for request in requests:
+            _id = request._filter["_id"]
+            update = request._doc
+            doc = self.docs.get(_id)
+            if doc is None:
+                if not request._upsert:
+                    continue
+                doc = self.docs[_id] = {"_id": _id}
+                doc.update(copy.deepcopy(update.get("$setOnInsert", {})))
+            doc.update(copy.deepcopy(update.get("$set", {})))
+            for field in update.get("$unset", {}):
+                doc.pop(field, None)
+
+
+def embedded(n, **fields):
+    return {"_id": f"oid{n}", "id": f"c{n}", "content": "text",
+            "ai_analysis": {"moderation": MODERATION, "enhancement": ENHANCEMENT}, **fields}
+
+
+def test_compact_fields():
+    analysis = {"moderation": MODERATION, "enhancement": ENHANCEMENT}
+
+    assert compact_fields(analysis, "confession") == {
+        "crisis_level": "low",
+        "moderation": {"flagged": False, "reviewed": False, "approved": True},
+        "mood": "happy",
+    }
+    assert "mood" not in compact_fields(analysis, "reply")
+    assert compact_fields({}, "confession")["crisis_level"] == "none"
+
+
+def test_save_and_get_round_trip():
+    store = AnalysisStore(Collection())
+
+    async def run():
+        await store.save("c1", "confession", {"moderation": MODERATION})
+        return await store.get("c1"), await store.get("missing")
+
+    assert asyncio.run(run()) == ({"moderation": MODERATION}, None)
+
+
+def test_save_many_keeps_existing_without_overwrite():
+    store = AnalysisStore(Collection())
+
+    async def run():
+        await store.save_many([("c1", "confession", {"v": 1})])
+        await store.save_many([("c1", "confession", {"v": 2}), ("c2", "confession", {"v": 2})], overwrite=False)
+        kept = await store.get("c1"), await store.get("c2")
+        await store.save_many([("c1", "confession", {"v": 3})])
+        return kept, await store.get("c1")
+
+    kept, overwritten = asyncio.run(run())
+
+    assert kept == ({"v": 1}, {"v": 2})
+    assert overwritten == {"v": 3}
+
+
+def test_migrate_moves_analyses_and_fills_missing_fields():
+    confessions = Collection([embedded(1), embedded(2, mood="sad"), {"_id": "oid3", "id": "c3", "content": "text"}])
+    store = AnalysisStore(Collection())
+
+    moved = asyncio.run(store.migrate({"confessions": confessions}, "confessions", batch_size=1))
+
+    assert moved == 2
+    assert all("ai_analysis" not in doc for doc in confessions.docs.values())
+    assert set(store.collection.docs) == {"c1", "c2"}
+    assert store.collection.docs["c1"]["kind"] == "confession"
+    assert confessions.docs["oid1"]["mood"] == "happy"
+    # Fields the document already has are left alone
+    assert confessions.docs["oid2"]["mood"] == "sad"
+    assert confessions.docs["oid1"]["crisis_level"] == "low"
+
+
+def test_migrate_never_drops_an_analysis_it_failed_to_store():
+    confessions = Collection([embedded(1)])
+    store = AnalysisStore(Collection(fail_writes=1))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.migrate({"confessions": confessions}, "confessions"))
+
+    assert "ai_analysis" in confessions.docs["oid1"]
+    assert store.collection.docs == {}
+
+
+def test_migrate_rerun_after_interruption_does_not_duplicate():
+    confessions = Collection([embedded(1), embedded(2)], fail_writes=1)
+    store = AnalysisStore(Collection())
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await store.migrate({"confessions": confessions}, "confessions")
+        # Analyses were copied but the inline fields are still there
+        assert all("ai_analysis" in doc for doc in confessions.docs.values())
+        store.collection.docs["c1"]["analysis"]["kept"] = True
+        return await store.migrate({"confessions": confessions}, "confessions")
+
+    assert asyncio.run(run()) == 2
+    assert sorted(store.collection.docs) == ["c1", "c2"]
+    # The copy made before the interruption is kept, not overwritten
+    assert store.collection.docs["c1"]["analysis"]["kept"] is True
+    assert all("ai_analysis" not in doc for doc in confessions.docs.values())
@@ -0,0 +1,153 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from archive import Archiver, find_with_archive
+
+NOW = datetime(2024, 6, 1)
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            for op, arg in condition.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return [dict(doc) for doc in self.docs[:length]]
+
+
+class FakeCollection:
+    """The Motor calls the archiver makes, over a dict keyed by _id"""
+
+    def __init__(self, db):
+        self.db = db
+        self.docs = {}
+
+    def find(self, query):
+        return Cursor([doc for doc in self.docs.values() if matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(doc) for doc in self.docs.values() if matches(doc, query)), None)
+
+    async def find_one_and_delete(self, query):
+        doc = await self.find_one(query)
+        if doc is not None:
+            del self.docs[doc["_id"]]
+            await self.db.after_delete(self, doc)
+        return doc
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.docs[request._filter["_id"]] = dict(request._doc)
+
+
+class FakeDB:
+    def __init__(self):
+        self.collections = {}
+        self.hooks = []
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection(self))
+
+    def __getattr__(self, name):
+        return self[name]
+
+    async def after_delete(self, collection, doc):
+        for hook in list(self.hooks):
+            await hook(collection, doc)
+
+
+def seed(db, cid, age_days, tx_id="tx"):
+    db.confessions.docs[f"_{cid}"] = {"_id": f"_{cid}", "id": cid, "tx_id": tx_id,
+                                      "timestamp": NOW - timedelta(days=age_days)}
+
+
+def ids(collection):
+    return sorted(doc["id"] for doc in collection.docs.values())
+
+
+def run(archiver):
+    return asyncio.run(archiver.run(now=NOW))
+
+
+def test_moves_old_threads_with_their_replies_and_votes():
+    db = FakeDB()
+    seed(db, "old", 120)
+    seed(db, "new", 1)
+    seed(db, "pending", 120, tx_id=None)
+    db.replies.docs["_r1"] = {"_id": "_r1", "id": "r1", "confession_id": "old"}
+    db.replies.docs["_r2"] = {"_id": "_r2", "id": "r2", "confession_id": "new"}
+    db.votes.docs["_v1"] = {"_id": "_v1", "id": "v1", "confession_id": "old"}
+    db.reply_votes.docs["_rv1"] = {"_id": "_rv1", "id": "rv1", "reply_id": "r1"}
+
+    moved = run(Archiver(db, max_age=timedelta(days=90)))
+
+    assert moved == {"confessions": 1, "replies": 1, "votes": 1, "reply_votes": 1}
+    assert ids(db.confessions) == ["new", "pending"]
+    assert ids(db.confessions_archive) == ["old"]
+    assert ids(db.replies) == ["r2"]
+    assert ids(db.replies_archive) == ["r1"]
+    assert ids(db.votes_archive) == ["v1"]
+    assert ids(db.reply_votes_archive) == ["rv1"]
+
+
+def test_replies_written_while_archiving_are_swept_too():
+    db = FakeDB()
+    seed(db, "old", 120)
+
+    async def late_reply(collection, doc):
+        # A reply that passed the route's existence check lands just as the confession moves
+        if collection is db.confessions:
+            db.replies.docs["_late"] = {"_id": "_late", "id": "late", "confession_id": "old"}
+            db.hooks.remove(late_reply)
+
+    db.hooks.append(late_reply)
+    moved = run(Archiver(db, max_age=timedelta(days=90)))
+
+    assert moved["replies"] == 1
+    assert ids(db.replies) == []
+    assert ids(db.replies_archive) == ["late"]
+
+
+def test_updates_after_the_copy_are_kept():
+    db = FakeDB()
+    seed(db, "old", 120)
+    db.confessions.docs["_old"]["upvotes"] = 1
+    archiver = Archiver(db, max_age=timedelta(days=90))
+    copy = archiver._copy
+
+    async def copy_then_vote(name, docs):
+        await copy(name, docs)
+        if name == "confessions" and "_old" in db.confessions.docs:
+            db.confessions.docs["_old"]["upvotes"] = 2
+
+    archiver._copy = copy_then_vote
+    run(archiver)
+    assert db.confessions_archive.docs["_old"]["upvotes"] == 2
+
+
+def test_find_with_archive_falls_through():
+    db = FakeDB()
+    seed(db, "old", 120)
+    run(Archiver(db, max_age=timedelta(days=90)))
+    doc, archived = asyncio.run(find_with_archive(db, "confessions", {"id": "old"}))
+    assert doc["id"] == "old" and archived
+    assert asyncio.run(find_with_archive(db, "confessions", {"id": "missing"})) == (None, False)
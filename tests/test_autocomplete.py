@@ -0,0 +1,39 @@
+from autocomplete import PrefixIndex
+
+
+def test_suggest_orders_by_weight_then_alphabetically():
+    index = PrefixIndex()
+    index.set("career", 5)
+    index.set("cat", 5)
+    index.set("cars", 9)
+    index.set("dog", 20)
+    assert [s["value"] for s in index.suggest("ca")] == ["cars", "career", "cat"]
+    assert index.suggest("ca", limit=1) == [{"value": "cars", "weight": 9}]
+
+
+def test_prefix_is_case_insensitive_and_keeps_original_spelling():
+    index = PrefixIndex()
+    index.add("NYC")
+    index.add("nyc", 2)
+    assert index.suggest("ny") == [{"value": "NYC", "weight": 3}]
+    assert len(index) == 1
+
+
+def test_cached_top_k_follows_weight_changes():
+    index = PrefixIndex(top_k=2)
+    for term, weight in (("aa", 3), ("ab", 2), ("ac", 1)):
+        index.set(term, weight)
+    assert [s["value"] for s in index.suggest("a")] == ["aa", "ab"]
+
+    index.add("ac", 5)
+    assert [s["value"] for s in index.suggest("a")] == ["ac", "aa"]
+    index.add("ac", -10)
+    assert index.weights["ac"] == 0
+    assert [s["value"] for s in index.suggest("a")] == ["aa", "ab"]
+
+
+def test_unknown_prefix_and_empty_terms():
+    index = PrefixIndex()
+    index.add("")
+    assert len(index) == 0
+    assert index.suggest("zzz") == []
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import os
+from argparse import Namespace
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+# The importer validates records with the server's models
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bulk_import_test")
+bulk_import = pytest.importorskip("bulk_import")
+server = pytest.importorskip("server")
+
+
+class Result:
+    def __init__(self, inserted_count):
+        self.inserted_count = inserted_count
+
+
+class Collection:
+    def __init__(self, fail_after=None):
+        self.docs = {}
+        self.batches = 0
+        self.fail_after = fail_after
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail_after is not None and self.batches >= self.fail_after:
+            raise RuntimeError("connection lost")
+        self.batches += 1
+        errors = []
+        for index, request in enumerate(requests):
+            doc = request._doc
+            if doc["id"] in self.docs:
+                errors.append({"index": index, "code": bulk_import.DUPLICATE_KEY})
+            else:
+                self.docs[doc["id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(requests) - len(errors)})
+        return Result(len(requests))
+
+
+class Analyses:
+    async def save_many(self, items, overwrite=True):
+        pass
+
+
+class Stats:
+    def __init__(self):
+        self.reconciled = 0
+
+    async def reconcile(self, db, hours=None):
+        self.reconciled += 1
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = {"confessions": Collection(), "replies": Collection()}
+    monkeypatch.setattr(server, "posts_db", database)
+    monkeypatch.setattr(server, "analyses", Analyses())
+    monkeypatch.setattr(server, "stats_rollup", Stats())
+    return database
+
+
+def confession(n):
+    return json.dumps({"id": f"c{n}", "content": f"confession {n}", "is_public": True, "author": "anon",
+                       "moderation": {"approved": True}, "crisis_level": "none"})
+
+
+def make_args(path, checkpoint=None, batch_size=2):
+    return Namespace(input=path, kind=None, batch_size=batch_size, checkpoint=checkpoint,
+                     no_analysis=True, analysis_concurrency=1, dry_run=False)
+
+
+def test_malformed_lines_are_skipped_and_reported(tmp_path, database, caplog):
+    path = tmp_path / "dump.ndjson"
+    path.write_text("\n".join([confession(1), "{not json", "", '{"content": "no author"}', confession(2)]) + "\n")
+
+    with caplog.at_level(logging.WARNING):
+        stats = asyncio.run(bulk_import.run(make_args(path)))
+
+    assert stats.as_dict() == {"read": 4, "inserted": 2, "duplicates": 0, "invalid": 2, "analyzed": 0}
+    assert set(database["confessions"].docs) == {"c1", "c2"}
+    assert [record.getMessage().split(":")[0] for record in caplog.records] == ["Line 2", "Line 4"]
+
+
+def test_resume_continues_after_the_last_written_batch(tmp_path, database, caplog):
+    path = tmp_path / "dump.ndjson"
+    checkpoint = tmp_path / "import.ckpt"
+    path.write_text("\n".join([confession(1), confession(2), confession(3), confession(4), "{not json"]) + "\n")
+    database["confessions"].fail_after = 1
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(bulk_import.run(make_args(path, checkpoint)))
+    assert set(database["confessions"].docs) == {"c1", "c2"}
+
+    database["confessions"].fail_after = None
+    with caplog.at_level(logging.WARNING):
+        stats = asyncio.run(bulk_import.run(make_args(path, checkpoint)))
+
+    assert set(database["confessions"].docs) == {"c1", "c2", "c3", "c4"}
+    assert stats.as_dict() == {"read": 5, "inserted": 4, "duplicates": 0, "invalid": 1, "analyzed": 0}
+    # Line numbers carry on from the checkpoint rather than restarting at the resume offset
+    assert [record.getMessage().split(":")[0] for record in caplog.records] == ["Line 5"]
+
+
+def test_replaying_a_file_counts_duplicates(tmp_path, database):
+    path = tmp_path / "dump.ndjson"
+    path.write_text("\n".join([confession(1), confession(2), confession(3)]) + "\n")
+
+    asyncio.run(bulk_import.run(make_args(path)))
+    stats = asyncio.run(bulk_import.run(make_args(path)))
+
+    assert (stats.inserted, stats.duplicates) == (0, 3)
+    assert len(database["confessions"].docs) == 3
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=clock, time=time.time))
+    return clock
+
+
+async def ok():
+    return {"success": True}
+
+
+async def boom():
+    raise RuntimeError("upstream down")
+
+
+def call(breaker, fn, **kwargs):
+    return asyncio.run(breaker.call(fn, **kwargs))
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=30)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            call(breaker, boom)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+
+    with pytest.raises(CircuitOpenError) as raised:
+        call(breaker, ok)
+    assert raised.value.retry_after == pytest.approx(30)
+    assert breaker.rejected == 1
+
+
+def test_success_resets_the_failure_streak(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    with pytest.raises(RuntimeError):
+        call(breaker, boom)
+    call(breaker, ok)
+    with pytest.raises(RuntimeError):
+        call(breaker, boom)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    with pytest.raises(RuntimeError):
+        call(breaker, boom)
+    clock.now += 31
+    assert breaker.snapshot()["state"] == HALF_OPEN
+
+    with pytest.raises(RuntimeError):
+        call(breaker, boom)
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+    clock.now += 31
+    call(breaker, ok)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_admits_limited_probes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30, half_open_max_calls=1)
+    with pytest.raises(RuntimeError):
+        call(breaker, boom)
+    clock.now += 31
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return {"success": True}
+
+        probe = asyncio.create_task(breaker.call(slow))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        release.set()
+        await probe
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+def test_timeouts_and_reported_failures_count(clock):
+    breaker = CircuitBreaker("test", timeout=0.01, failure_threshold=5)
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        call(breaker, hang)
+    call(breaker, ok, failed=lambda result: None if result.get("tx_id") else "no tx_id")
+    assert breaker.timeouts == 1
+    assert breaker.consecutive_failures == 2
+    assert breaker.last_error == "no tx_id"
+
+
+def test_thresholds_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("BREAKER_IRYS_FAILURES", "7")
+    assert CircuitBreaker("irys", failure_threshold=3).failure_threshold == 7
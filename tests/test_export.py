@@ -0,0 +1,162 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import export
+from export import EXPORT_SORT, export_query, joined_pipeline, ndjson_lines, resume_after
+from indexes import LISTED
+
+T0 = datetime(2024, 6, 1)
+
+
+def field(doc, path):
+    for part in path.split("."):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = field(doc, key)
+            for op, arg in condition.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$gt" and not (value is not None and value > arg):
+                    return False
+                if op == "$gte" and not (value is not None and value >= arg):
+                    return False
+                if op == "$lte" and not (value is not None and value <= arg):
+                    return False
+        elif field(doc, key) != condition:
+            return False
+    return True
+
+
+def sorted_export(docs, query):
+    return sorted((doc for doc in docs if matches(doc, query)), key=lambda doc: (doc["timestamp"], doc["id"]))
+
+
+class Cursor:
+    def __init__(self, docs, fail_after=None):
+        self.docs = docs
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for n, doc in enumerate(self.docs):
+            if n == self.fail_after:
+                raise RuntimeError("cursor killed")
+            yield doc
+
+    async def close(self):
+        self.closed = True
+
+
+def collect(cursor, compress=None):
+    async def run():
+        return [chunk async for chunk in ndjson_lines(cursor, compress)]
+    return asyncio.run(run())
+
+
+def confession(n, minutes, public=True, approved=True):
+    return {"id": f"c{n:02d}", "timestamp": T0 + timedelta(minutes=minutes), "is_public": public,
+            "moderation": {"approved": approved}}
+
+
+def test_public_export_excludes_private_and_rejected():
+    docs = [confession(1, 0), confession(2, 1, public=False), confession(3, 2, approved=False),
+            dict(confession(4, 3), moderation={"approved": None})]
+
+    public = sorted_export(docs, export_query(LISTED, "public", None, None))
+    private = sorted_export(docs, export_query(LISTED, "private", None, None))
+
+    assert [doc["id"] for doc in public] == ["c01", "c04"]
+    assert [doc["id"] for doc in private] == ["c02", "c03"]
+    assert export_query(LISTED, "all", None, None) == {}
+    with pytest.raises(ValueError):
+        export_query(LISTED, "everything", None, None)
+
+
+def test_date_range_combines_with_visibility():
+    docs = [confession(n, n * 60, public=n % 2 == 0) for n in range(6)]
+
+    query = export_query(LISTED, "public", T0 + timedelta(hours=1), T0 + timedelta(hours=4))
+
+    assert [doc["id"] for doc in sorted_export(docs, query)] == ["c02", "c04"]
+
+
+def test_cursor_continues_after_the_last_record_across_batches():
+    # Records sharing a timestamp are ordered by id, so pages split inside a tie lose nothing
+    docs = [confession(n, n // 3) for n in range(10)]
+    query = export_query(LISTED, "public", None, None)
+
+    received = []
+    page = sorted_export(docs, query)[:4]
+    while page:
+        received.extend(page)
+        last = {"timestamp": page[-1]["timestamp"], "id": page[-1]["id"]}
+        page = sorted_export(docs, resume_after(query, last))[:4]
+
+    assert [doc["id"] for doc in received] == [f"c{n:02d}" for n in range(10)]
+    assert resume_after({}, {"timestamp": T0, "id": "c01"})["$or"][1] == {"timestamp": T0, "id": {"$gt": "c01"}}
+
+
+def test_joined_pipeline_filters_on_the_parent_and_drops_it():
+    join = {"from": "confessions", "localField": "confession_id", "foreignField": "id", "as": "confession"}
+    visibility = {"confession.is_public": True}
+
+    pipeline = joined_pipeline({"timestamp": {"$gte": T0}}, visibility, join)
+
+    assert pipeline[0] == {"$match": {"timestamp": {"$gte": T0}}}
+    assert pipeline[1] == {"$sort": dict(EXPORT_SORT)}
+    assert pipeline[2] == {"$lookup": join}
+    assert pipeline[4] == {"$match": visibility}
+    assert pipeline[-1] == {"$project": {"_id": 0, "confession": 0}}
+
+
+def test_ndjson_lines_chunks_every_document(monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_SIZE", 100)
+    docs = [{"id": f"c{n:02d}", "timestamp": T0, "content": "x" * 30} for n in range(20)]
+    cursor = Cursor(docs)
+
+    chunks = collect(cursor)
+
+    assert len(chunks) > 1
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [doc["id"] for doc in docs]
+    assert json.loads(lines[0])["timestamp"].startswith("2024-06-01T00:00:00")
+    assert cursor.closed
+
+
+def test_ndjson_lines_gzip_round_trips(monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_SIZE", 100)
+    docs = [{"id": f"c{n:02d}", "content": "x" * 30} for n in range(20)]
+
+    body = gzip.decompress(b"".join(collect(Cursor(docs), "gzip")))
+
+    assert [json.loads(line)["id"] for line in body.decode().splitlines()] == [doc["id"] for doc in docs]
+
+
+def test_ndjson_lines_aborts_instead_of_finishing_a_truncated_export():
+    cursor = Cursor([{"id": f"c{n}"} for n in range(5)], fail_after=3)
+
+    with pytest.raises(RuntimeError):
+        collect(cursor, "gzip")
+
+    assert cursor.closed
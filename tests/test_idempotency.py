@@ -0,0 +1,144 @@
+import asyncio
+import copy
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+import idempotency
+from idempotency import IdempotencyStore
+
+
+class Collection:
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["_id"]] = copy.deepcopy(doc)
+
+    async def find_one(self, query):
+        return copy.deepcopy(self.docs.get(query["_id"]))
+
+    async def update_one(self, query, update):
+        if query["_id"] in self.docs:
+            self.docs[query["_id"]].update(update["$set"])
+
+    async def delete_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and all(doc.get(field) == value for field, value in query.items()):
+            del self.docs[query["_id"]]
+
+
+class Handler:
+    def __init__(self, body=None, error=None):
+        self.body = body or {"id": "c1"}
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        # Yield so duplicates arrive while the first call is still running
+        await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return self.body
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL", 0.001)
+
+
+def test_concurrent_duplicates_run_the_handler_once():
+    store = IdempotencyStore(Collection())
+    handler = Handler()
+
+    async def run():
+        return await asyncio.gather(*(store.run("confess", "key", "client", {"a": 1}, handler) for _ in range(3)))
+
+    first, *duplicates = asyncio.run(run())
+
+    assert handler.calls == 1
+    assert not first.replayed
+    for result in duplicates:
+        assert result.replayed
+        assert (result.status_code, result.body) == (first.status_code, first.body)
+
+
+def test_concurrent_duplicates_across_workers_wait_for_the_stored_result():
+    collection = Collection()
+    workers = [IdempotencyStore(collection), IdempotencyStore(collection)]
+    handler = Handler()
+
+    async def run():
+        return await asyncio.gather(*(store.run("confess", "key", "client", {"a": 1}, handler) for store in workers))
+
+    first, second = asyncio.run(run())
+
+    assert handler.calls == 1
+    assert second.replayed
+    assert (second.status_code, second.body) == (200, first.body)
+    assert collection.docs["confess:client:key"]["state"] == "done"
+
+
+def test_client_errors_are_stored_and_replayed():
+    store = IdempotencyStore(Collection())
+    handler = Handler(error=HTTPException(status_code=400, detail="Content rejected"))
+
+    async def run():
+        first = await store.run("confess", "key", "client", {"a": 1}, handler)
+        return first, await store.run("confess", "key", "client", {"a": 1}, handler)
+
+    first, retry = asyncio.run(run())
+
+    assert handler.calls == 1
+    assert (first.status_code, first.body) == (400, {"detail": "Content rejected"})
+    assert retry.replayed
+    assert (retry.status_code, retry.body) == (400, {"detail": "Content rejected"})
+
+
+def test_server_errors_release_the_key():
+    collection = Collection()
+    store = IdempotencyStore(collection)
+    failing = Handler(error=HTTPException(status_code=503, detail="Unavailable"))
+    handler = Handler()
+
+    async def run():
+        with pytest.raises(HTTPException):
+            await store.run("confess", "key", "client", {"a": 1}, failing)
+        assert collection.docs == {}
+        return await store.run("confess", "key", "client", {"a": 1}, handler)
+
+    result = asyncio.run(run())
+
+    assert handler.calls == 1
+    assert not result.replayed
+
+
+def test_reusing_a_key_with_a_different_request_is_rejected():
+    store = IdempotencyStore(Collection())
+    handler = Handler()
+
+    async def run():
+        await store.run("confess", "key", "client", {"a": 1}, handler)
+        await store.run("confess", "key", "client", {"a": 2}, handler)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+
+    assert error.value.status_code == 422
+    assert handler.calls == 1
+
+
+def test_keys_are_scoped_per_client():
+    store = IdempotencyStore(Collection())
+    handler = Handler()
+
+    async def run():
+        await store.run("confess", "key", "alice", {"a": 1}, handler)
+        return await store.run("confess", "key", "bob", {"a": 1}, handler)
+
+    assert not asyncio.run(run()).replayed
+    assert handler.calls == 2
@@ -0,0 +1,89 @@
+import threading
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import metrics
+from metrics import MetricsMiddleware, Registry
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        if item_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+
+def test_requests_are_labelled_by_route_template():
+    before = metrics.http_requests.values()
+    client = make_client()
+
+    for path in ("/items/1", "/items/2", "/items/missing", "/nowhere"):
+        client.get(path)
+
+    after = metrics.http_requests.values()
+    delta = {labels: value - before.get(labels, 0) for labels, value in after.items() if value != before.get(labels, 0)}
+    assert delta == {
+        ("GET", "/items/{item_id}", "200"): 2,
+        ("GET", "/items/{item_id}", "404"): 1,
+        ("GET", "unmatched", "404"): 1,
+    }
+    assert ("GET", "/items/{item_id}") in metrics.http_latency.merged()
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+    latency.observe(0.05, "read")
+    latency.observe(0.5, "read")
+    latency.observe(0.1, "read")
+    latency.observe(3, "read")
+
+    assert registry.render().splitlines() == [
+        "# HELP op_seconds Op latency",
+        "# TYPE op_seconds histogram",
+        'op_seconds_bucket{op="read",le="0.1"} 2',
+        'op_seconds_bucket{op="read",le="1"} 3',
+        'op_seconds_bucket{op="read",le="+Inf"} 4',
+        'op_seconds_sum{op="read"} 3.65',
+        'op_seconds_count{op="read"} 4',
+    ]
+
+
+def test_shards_from_every_thread_are_summed():
+    registry = Registry()
+    counter = registry.counter("events_total", "Events", ("kind",))
+    latency = registry.histogram("wait_seconds", "Wait", buckets=(1.0,))
+
+    def work():
+        for _ in range(100):
+            counter.inc("a")
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = registry.render().splitlines()
+    assert 'events_total{kind="a"} 400' in lines
+    assert "wait_seconds_count 400" in lines
+    assert "wait_seconds_sum 200" in lines
+
+
+def test_gauge_and_label_escaping():
+    registry = Registry()
+    registry.gauge("queue_depth", "Depth", lambda: {"a\"b": 3}, ("queue",))
+    registry.gauge("up", "Up", lambda: 1)
+
+    lines = registry.render().splitlines()
+
+    assert 'queue_depth{queue="a\\"b"} 3' in lines
+    assert "up 1" in lines
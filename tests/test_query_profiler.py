@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from query_profiler import QueryProfiler, command_shape, normalize
+
+
+def test_normalize_replaces_literals_and_keeps_structure():
+    query = {"id": "abc", "timestamp": {"$gte": 123}, "tags": {"$in": ["a", "b", "c"]}}
+    assert normalize(query) == {"id": "?", "timestamp": {"$gte": "?"}, "tags": {"$in": ["?"]}}
+    assert normalize({"id": "abc"}) == normalize({"id": "xyz"})
+
+
+def test_normalize_keeps_field_paths_and_stage_literals():
+    pipeline = [{"$match": {"mood": "sad"}}, {"$group": {"_id": "$mood", "n": {"$sum": 1}}},
+                {"$sort": {"n": -1}}, {"$project": {"_id": 0}}]
+    assert normalize(pipeline) == [{"$match": {"mood": "?"}}, {"$group": {"_id": "$mood", "n": {"$sum": "?"}}},
+                                   {"$sort": {"n": -1}}, {"$project": {"_id": 0}}]
+
+
+def test_command_shape_ignores_session_fields_and_limits():
+    a = {"find": "confessions", "filter": {"id": "a"}, "sort": {"timestamp": -1}, "limit": 5, "lsid": {"id": 1}}
+    b = {"find": "confessions", "filter": {"id": "b"}, "sort": {"timestamp": -1}, "limit": 50, "lsid": {"id": 2}}
+    assert command_shape("find", a) == command_shape("find", b) == {"filter": {"id": "?"}, "sort": {"timestamp": -1}}
+
+
+def test_command_shape_for_writes():
+    update = {"update": "confessions", "updates": [{"q": {"id": "a"}, "u": {"$inc": {"upvotes": 1}}}]}
+    assert command_shape("update", update) == {"q": [{"id": "?"}], "multi": [False]}
+    assert command_shape("insert", {"insert": "votes", "documents": [{}]}) == {}
+
+
+def event(command_name, command, request_id, micros=1000):
+    return SimpleNamespace(command_name=command_name, command=command, connection_id=("h", 1),
+                           request_id=request_id, database_name="db", duration_micros=micros)
+
+
+def test_profiler_aggregates_per_shape():
+    profiler = QueryProfiler(slow_ms=1000)
+    for request_id, cid in enumerate(("a", "b", "c")):
+        command = {"find": "confessions", "filter": {"id": cid}}
+        profiler.started(event("find", command, request_id))
+        profiler.succeeded(event("find", command, request_id, micros=2000 * (request_id + 1)))
+    [row] = profiler.top()
+    assert (row["op"], row["collection"], row["count"]) == ("find", "confessions", 3)
+    assert row["max_ms"] == 6.0
+    assert row["avg_ms"] == 4.0
+
+
+def test_shape_table_overflows_into_other():
+    profiler = QueryProfiler(slow_ms=1000, max_shapes=1)
+    for request_id, field in enumerate(("a", "b", "c")):
+        command = {"find": "confessions", "filter": {field: 1}}
+        profiler.started(event("find", command, request_id))
+        profiler.succeeded(event("find", command, request_id))
+    assert sorted(row["count"] for row in profiler.top()) == [1, 2]
+    assert "other" in profiler.shapes
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import rate_limit
+from rate_limit import ConcurrencyLimiter, MemoryBuckets, RateLimiter, client_ip, client_key, parse_budget
+
+SECRET = "test-secret-long-enough-for-hs256-keys"
+
+
+def make_request(headers=None, peer="10.0.0.1"):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw, "client": (peer, 1234)})
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_budget():
+    assert parse_budget("5/60") == (5.0, 5 / 60)
+    with pytest.raises(ValueError):
+        parse_budget("0/60")
+
+
+def test_token_bucket_bursts_then_refills(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock, time=time.time))
+    buckets = MemoryBuckets()
+
+    async def take():
+        allowed, _ = await buckets.take("k", capacity=2, rate=1.0)
+        return allowed
+
+    async def scenario():
+        assert await take() and await take()
+        assert not await take()
+        clock.now += 0.5
+        assert not await take()
+        clock.now += 0.5
+        assert await take()
+        clock.now += 60
+        # Refill is capped at capacity
+        assert await take() and await take()
+        assert not await take()
+
+    asyncio.run(scenario())
+
+
+def test_rate_limiter_raises_429_with_retry_after(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_CONFESSIONS", "1/10")
+    limiter = RateLimiter()
+
+    async def scenario():
+        await limiter.check("confessions", "ip:1.2.3.4")
+        with pytest.raises(HTTPException) as raised:
+            await limiter.check("confessions", "ip:1.2.3.4")
+        assert raised.value.status_code == 429
+        assert raised.value.headers["Retry-After"] == "10"
+        # Other clients have their own bucket
+        await limiter.check("confessions", "ip:5.6.7.8")
+
+    asyncio.run(scenario())
+    assert limiter.rejected == {"confessions": 1}
+
+
+def test_rate_limiter_falls_back_to_local_buckets():
+    class Broken:
+        async def take(self, *args, **kwargs):
+            raise RuntimeError("mongo down")
+
+    limiter = RateLimiter(shared=Broken())
+    asyncio.run(limiter.check("votes", "ip:1.2.3.4"))
+    assert limiter.local._buckets
+
+
+def test_client_ip_trusts_only_proxy_appended_entries():
+    request = make_request({"X-Forwarded-For": "6.6.6.6, 1.2.3.4, 10.0.0.9"})
+    assert client_ip(request, trusted_hops=1) == "10.0.0.9"
+    assert client_ip(request, trusted_hops=2) == "1.2.3.4"
+    assert client_ip(request, trusted_hops=5) == "6.6.6.6"
+    assert client_ip(request, trusted_hops=0) == "10.0.0.1"
+    assert client_ip(make_request(), trusted_hops=1) == "10.0.0.1"
+
+
+def test_forwarded_header_is_ignored_unless_proxies_are_configured():
+    assert rate_limit.TRUSTED_PROXY_HOPS == 0
+    assert client_ip(make_request({"X-Forwarded-For": "6.6.6.6"})) == "10.0.0.1"
+
+
+def test_client_key_prefers_a_valid_token():
+    token = jwt.encode({"sub": "user-1"}, SECRET, algorithm="HS256")
+    assert client_key(make_request({"Authorization": f"Bearer {token}"}), SECRET, "HS256") == "user:user-1"
+    assert client_key(make_request({"Authorization": "Bearer forged"}), SECRET, "HS256").startswith("ip:")
+
+
+def test_concurrency_limiter_sheds_past_the_queue():
+    limiter = ConcurrencyLimiter("analysis", limit=1, max_waiting=0, max_wait=1.0)
+
+    async def scenario():
+        async with limiter:
+            with pytest.raises(HTTPException) as raised:
+                async with limiter:
+                    pass
+            assert raised.value.status_code == 503
+        async with limiter:
+            assert limiter.active == 1
+
+    asyncio.run(scenario())
+    assert limiter.shed == 1
+    assert limiter.snapshot()["active"] == 0
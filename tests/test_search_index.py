@@ -0,0 +1,125 @@
+import math
+
+import pytest
+
+import search_index
+from search_index import SearchIndex, tokenize
+
+
+def confession(cid, content, tags=(), mood=None, author=None, timestamp="2024-03-01T12:00:00"):
+    return {"id": cid, "content": content, "tags": list(tags), "mood": mood, "author": author,
+            "timestamp": timestamp}
+
+
+@pytest.fixture
+def index():
+    ix = SearchIndex()
+    ix.add(confession("a", "I broke my sister's guitar", tags=["family"], mood="sad", author="ann"))
+    ix.add(confession("b", "guitar guitar guitar practice every day", mood="happy", author="bob"))
+    ix.add(confession("c", "Lost my job today", tags=["work"], mood="anxious", author="ann"))
+    return ix
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("The Guitar and THE drums") == ["guitar", "drums"]
+
+
+def test_bm25_ranks_by_term_frequency(index):
+    hits = index.search("guitar")
+    assert hits.ids == ["b", "a"]
+    assert hits.total == 2
+
+
+def test_bm25_idf_matches_formula(index):
+    scores = index.score("job", index.live)
+    doc = index.id_to_doc["c"]
+    n, df = 3, 1
+    avg_length = index.total_length / n
+    norm = search_index.BM25_K1 * (1 - search_index.BM25_B + search_index.BM25_B * index.doc_lengths[doc] / avg_length)
+    expected = math.log(1 + (n - df + 0.5) / (df + 0.5)) * (search_index.BM25_K1 + 1) / (1 + norm)
+    assert scores == {doc: pytest.approx(expected)}
+
+
+def test_tags_count_double(index):
+    index.add(confession("d", "we had a big family dinner at grandma's house"))
+    assert index.search("family").ids == ["a", "d"]
+
+
+def test_trailing_token_is_prefix_expanded(index):
+    assert set(index.search("guit").ids) == {"a", "b"}
+    assert index.search("guit ").ids == []
+
+
+def test_filters_combine_with_query(index):
+    assert index.search("guitar", mood="sad").ids == ["a"]
+    assert index.search(author="ann", sort_by="timestamp").total == 2
+    assert index.search(tags=["work"]).ids == ["c"]
+
+
+def test_cursor_pagination_covers_every_hit(index):
+    seen = []
+    cursor = None
+    while True:
+        hits = index.search(sort_by="timestamp", limit=1, cursor=cursor)
+        seen.extend(hits.ids)
+        cursor = hits.next_cursor
+        if cursor is None:
+            break
+    assert sorted(seen) == ["a", "b", "c"]
+
+
+def test_remove_updates_document_frequency(index):
+    assert index.doc_freq["guitar"] == 2
+    index.remove("b")
+    assert index.doc_freq["guitar"] == 1
+    assert index.search("guitar").ids == ["a"]
+    assert len(index) == 2
+
+
+def test_compact_renumbers_live_documents(index, monkeypatch):
+    monkeypatch.setattr(search_index, "COMPACT_MIN_DEAD", 10 ** 6)
+    index.remove("a")
+    index.remove("b")
+    assert len(index.doc_ids) == 3
+
+    index.compact()
+    assert index.doc_ids == ["c"]
+    assert index.doc_lengths == [len(tokenize("Lost my job today")) + search_index.TAG_WEIGHT]
+    assert index.live == 1
+    assert index.id_to_doc == {"c": 0}
+    assert index.mood_bits == {"anxious": 1}
+    assert index.author_bits == {"ann": 1}
+    assert "guitar" not in index.postings
+    assert index.search("job").ids == ["c"]
+
+    index.add(confession("e", "new job, new me"))
+    assert index.id_to_doc["e"] == 1
+    assert index.search("job").total == 2
+
+
+def test_remove_compacts_once_enough_documents_are_dead(monkeypatch):
+    monkeypatch.setattr(search_index, "COMPACT_MIN_DEAD", 2)
+    ix = SearchIndex()
+    for i in range(4):
+        ix.add(confession(str(i), f"post number {i}"))
+    ix.remove("0")
+    assert len(ix.doc_ids) == 4
+    ix.remove("1")
+    assert ix.doc_ids == ["2", "3"]
+    assert ix.dead_count == 0
+
+
+def test_facet_counts(index):
+    facets = index.facet_counts(index.live)
+    assert facets["mood"] == [{"value": "anxious", "count": 1}, {"value": "happy", "count": 1},
+                              {"value": "sad", "count": 1}]
+    assert {"value": "work", "count": 1} in facets["tags"]
+
+
+def test_snapshot_round_trip(index):
+    index.remove("a")
+    restored = SearchIndex()
+    assert restored.load_state(index.to_state())
+    assert restored.search("guitar").ids == ["b"]
+    assert restored.doc_freq == index.doc_freq
+    assert len(restored) == 2
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+from snapshots import acquire_process_lock, claim_file, process_alive, read_snapshot, write_snapshot
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "nested" / "index.snapshot"
+    write_snapshot(path, {"version": 1, "docs": [1, 2, 3]})
+    assert read_snapshot(path) == {"version": 1, "docs": [1, 2, 3]}
+    assert [p.name for p in path.parent.iterdir()] == ["index.snapshot"]
+
+
+def test_missing_or_foreign_snapshots_read_as_none(tmp_path):
+    assert read_snapshot(tmp_path / "missing.snapshot") is None
+    foreign = tmp_path / "foreign.snapshot"
+    foreign.write_bytes(b"not a snapshot")
+    assert read_snapshot(foreign) is None
+
+
+def test_process_lock_is_exclusive(tmp_path):
+    path = tmp_path / "indexes.lock"
+    held = acquire_process_lock(path)
+    assert held is not None
+    assert acquire_process_lock(path) is None
+    os.close(held)
+    again = acquire_process_lock(path)
+    assert again is not None
+    os.close(again)
+
+
+def test_process_alive():
+    assert process_alive(os.getpid())
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    assert not process_alive(exited.pid)
+
+
+def test_only_one_claim_wins(tmp_path):
+    path = tmp_path / "timeseries.1.snapshot"
+    write_snapshot(path, {"version": 1})
+    assert claim_file(path, tmp_path / "timeseries.2-a.snapshot")
+    assert not claim_file(path, tmp_path / "timeseries.3-b.snapshot")
+    assert read_snapshot(tmp_path / "timeseries.2-a.snapshot") == {"version": 1}
@@ -0,0 +1,225 @@
+import asyncio
+import copy
+from datetime import datetime, timedelta
+
+from pymongo import ReadPreference
+
+from stats_rollup import TOTALS_ID, StatsRollup, drift, hour_id, mood_distribution
+
+NOW = datetime.utcnow().replace(minute=30, second=0, microsecond=0)
+HOUR = NOW.replace(minute=0)
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            for op, arg in condition.items():
+                if op == "$gte" and not (value is not None and value >= arg):
+                    return False
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+                if op == "$type" and not isinstance(value, datetime):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def group_key(doc, spec):
+    if isinstance(spec, str):
+        return doc.get(spec[1:])
+    if "$dateToString" in spec:
+        options = spec["$dateToString"]
+        return doc[options["date"][1:]].strftime(options["format"])
+    return {name: group_key(doc, sub) for name, sub in spec.items()}
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class Collection:
+    def __init__(self):
+        self.docs = []
+        self.read_preference = None
+
+    def with_options(self, read_preference=None):
+        self.read_preference = read_preference
+        return self
+
+    async def count_documents(self, query):
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    def aggregate(self, pipeline):
+        docs = self.docs
+        for stage in pipeline:
+            if "$match" in stage:
+                docs = [doc for doc in docs if matches(doc, stage["$match"])]
+            if "$group" in stage:
+                groups = {}
+                for doc in docs:
+                    key = group_key(doc, stage["$group"]["_id"])
+                    frozen = repr(key)
+                    groups.setdefault(frozen, {"_id": key, "count": 0})["count"] += 1
+                docs = list(groups.values())
+        return Cursor(docs)
+
+    def _first(self, query):
+        return next((doc for doc in self.docs if matches(doc, query)), None)
+
+    def find(self, query):
+        return Cursor([copy.deepcopy(doc) for doc in self.docs if matches(doc, query)])
+
+    async def find_one(self, query):
+        return copy.deepcopy(self._first(query))
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self._first(query)
+        if doc is None:
+            doc = dict(query, **update.get("$setOnInsert", {}))
+            self.docs.append(doc)
+        for path, value in update.get("$inc", {}).items():
+            target = doc
+            *parents, leaf = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = target.get(leaf, 0) + value
+
+
+class Database:
+    def __init__(self):
+        self.collections = {}
+        self.read_preference = None
+
+    def with_options(self, read_preference=None):
+        self.read_preference = read_preference
+        return self
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, Collection())
+
+
+def confession(at, mood="happy", public=True):
+    return {"timestamp": at, "mood": mood, "is_public": public}
+
+
+def test_records_running_totals_and_hour_buckets():
+    stats = StatsRollup(Collection())
+
+    async def run():
+        await stats.record_confession(confession(NOW, "happy"))
+        await stats.record_confession(confession(NOW, "sad", public=False))
+        await stats.record_reply({"timestamp": NOW})
+        await stats.record_user({"created_at": NOW - timedelta(hours=2)})
+        return await stats.totals()
+
+    totals = asyncio.run(run())
+
+    assert totals["confessions"] == 2
+    assert totals["public_confessions"] == 1
+    assert totals["replies"] == 1
+    assert totals["users"] == 1
+    assert totals["mood"] == {"happy": 1, "sad": 1}
+    bucket = next(doc for doc in stats.collection.docs if doc["_id"] == hour_id(HOUR))
+    assert bucket["kind"] == "hour"
+    assert bucket["hour"] == HOUR
+    assert bucket["confessions"] == 2
+
+
+def test_range_sums_buckets_in_window():
+    stats = StatsRollup(Collection())
+
+    async def run():
+        for hours_ago in range(5):
+            await stats.record_confession(confession(NOW - timedelta(hours=hours_ago)))
+        return (
+            await stats.range(NOW - timedelta(hours=2)),
+            await stats.range(NOW - timedelta(hours=4), HOUR - timedelta(hours=1)),
+            await stats.range(),
+        )
+
+    recent, earlier, everything = asyncio.run(run())
+
+    # The start rounds down to its hour; the end is exclusive
+    assert recent["confessions"] == 3
+    assert earlier["confessions"] == 3
+    assert everything["confessions"] == 5
+    assert everything["mood"] == {"happy": 5}
+
+
+def test_reconcile_corrects_drift_on_the_primary():
+    stats = StatsRollup(Collection())
+    db = Database()
+    db["confessions"].docs = [confession(NOW, "happy"), confession(NOW, "happy"), confession(NOW, None, public=False)]
+    db["confessions_archive"].docs = [confession(NOW - timedelta(days=400), "sad")]
+    db["users"].docs = [{"created_at": NOW}]
+
+    async def run():
+        # Drifted: one confession lost, a stale mood and a reply that no longer exists
+        await stats.record_confession(confession(NOW, "happy"))
+        await stats.record_confession(confession(NOW, "angry"))
+        await stats.record_reply({"timestamp": NOW})
+        await stats.reconcile(db, hours=None)
+        return await stats.totals()
+
+    totals = asyncio.run(run())
+
+    assert db.read_preference == ReadPreference.PRIMARY
+    assert stats.primary.read_preference == ReadPreference.PRIMARY
+    assert totals["confessions"] == 4
+    assert totals["public_confessions"] == 3
+    assert totals["users"] == 1
+    assert totals["replies"] == 0
+    assert {mood: count for mood, count in totals["mood"].items() if count} == {"happy": 2, "unknown": 1, "sad": 1}
+    bucket = next(doc for doc in stats.collection.docs if doc["_id"] == hour_id(HOUR))
+    assert (bucket["confessions"], bucket["public_confessions"], bucket["replies"]) == (3, 2, 0)
+
+
+def test_reconcile_keeps_increments_that_land_while_it_counts():
+    stats = StatsRollup(Collection())
+    db = Database()
+    db["confessions"].docs = [confession(NOW)]
+    find_one = stats.primary.find_one
+
+    async def racing_find_one(query):
+        current = await find_one(query)
+        # A new confession's increment lands between reading the totals and correcting them
+        stats.primary.find_one = find_one
+        await stats.record_confession(confession(NOW))
+        return current
+
+    async def run():
+        await stats.record_confession(confession(NOW))
+        await stats.record_confession(confession(NOW))
+        stats.primary.find_one = racing_find_one
+        await stats.reconcile(db, hours=1)
+        return await stats.totals()
+
+    assert asyncio.run(run())["confessions"] == 2
+
+
+def test_drift_is_an_increment_document():
+    current = {"_id": TOTALS_ID, "confessions": 5, "public_confessions": 3, "users": 2, "replies": 1,
+               "mood": {"happy": 3, "gone": 2}}
+    counted = {"confessions": 6, "public_confessions": 3, "users": 2, "replies": 0, "mood": {"happy": 4, "sad": 2}}
+
+    assert drift(counted, current) == {"confessions": 1, "replies": -1, "mood.happy": 1, "mood.gone": -2, "mood.sad": 2}
+    assert drift(current, current) == {}
+
+
+def test_mood_distribution_orders_by_count():
+    rows = mood_distribution({"happy": 2, "unknown": 5, "sad": 1}, limit=2)
+
+    assert rows == [{"_id": None, "count": 5}, {"_id": "happy", "count": 2}]
@@ -0,0 +1,58 @@
+from tag_counters import BUCKET_SECONDS, RollingTagCounter
+
+HOUR = BUCKET_SECONDS
+NOW = 1_000_000 * HOUR + 1800
+
+
+def test_windows_count_tags_by_age():
+    counter = RollingTagCounter()
+    counter.add(["work", "life"], NOW - 60, now=NOW)
+    counter.add(["work"], NOW - 5 * HOUR, now=NOW)
+    counter.add(["travel"], NOW - 3 * 24 * HOUR, now=NOW)
+    assert counter.top("1h", now=NOW) == [{"count": 1, "tag": "life"}, {"count": 1, "tag": "work"}]
+    assert counter.top("24h", now=NOW) == [{"count": 2, "tag": "work"}, {"count": 1, "tag": "life"}]
+    assert counter.top("7d", now=NOW)[-1] == {"count": 1, "tag": "travel"}
+
+
+def test_buckets_slide_out_of_windows():
+    counter = RollingTagCounter()
+    counter.add(["work"], NOW, now=NOW)
+    assert counter.top("1h", now=NOW + HOUR) == []
+    assert counter.top("24h", now=NOW + 23 * HOUR) == [{"count": 1, "tag": "work"}]
+    assert counter.top("24h", now=NOW + 24 * HOUR) == []
+    assert counter.top("7d", now=NOW + 24 * HOUR) == [{"count": 1, "tag": "work"}]
+
+
+def test_ring_wraps_without_leaking_old_counts():
+    counter = RollingTagCounter(windows={"1h": 1, "3h": 3})
+    counter.add(["a"], NOW, now=NOW)
+    counter.add(["b"], NOW + 3 * HOUR, now=NOW + 3 * HOUR)
+    assert counter.top("3h", now=NOW + 3 * HOUR) == [{"count": 1, "tag": "b"}]
+    # A jump past the whole ring starts over
+    assert counter.top("3h", now=NOW + 10 * HOUR) == []
+
+
+def test_events_older_than_the_largest_window_are_ignored():
+    counter = RollingTagCounter()
+    counter.add(["ancient"], NOW - 30 * 24 * HOUR, now=NOW)
+    assert counter.top("7d", now=NOW) == []
+
+
+def test_remove_reverses_add_and_never_goes_negative():
+    counter = RollingTagCounter()
+    counter.add(["work", "life"], NOW, now=NOW)
+    counter.remove(["work"], NOW, now=NOW)
+    counter.remove(["work", "unknown"], NOW, now=NOW)
+    assert counter.top("24h", now=NOW) == [{"count": 1, "tag": "life"}]
+
+
+def test_space_saving_replaces_the_least_frequent_tag():
+    counter = RollingTagCounter(capacity=2)
+    counter.add(["heavy"], NOW, now=NOW)
+    counter.add(["heavy"], NOW, now=NOW)
+    counter.add(["light"], NOW, now=NOW)
+    counter.add(["newcomer"], NOW, now=NOW)
+    bucket = counter._held(int(NOW // HOUR))
+    assert bucket == {"heavy": 2, "newcomer": 2}
+    # The newcomer inherits the evicted count: an overestimate, never an undercount
+    assert counter.top("1h", now=NOW) == [{"count": 2, "tag": "heavy"}, {"count": 2, "tag": "newcomer"}]
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+import timeseries
+from timeseries import RESOLUTIONS, TimeSeriesStore
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # Swap the module's time reference only, not the process-wide clock
+    monkeypatch.setattr(timeseries, "time", SimpleNamespace(time=lambda: NOW))
+
+
+def test_record_counts_into_every_resolution():
+    store = TimeSeriesStore()
+    store.record("votes", at=NOW - 30)
+    store.record("votes", 2, at=NOW - 90)
+    minute = store.query(["votes"], "minute", start=NOW - 180)
+    assert minute["step"] == RESOLUTIONS["minute"]
+    assert sum(minute["series"]["votes"]) == 3
+    assert sum(store.query(["votes"], "hour")["series"]["votes"]) == 3
+    assert sum(store.query(["votes"], "day")["series"]["votes"]) == 3
+
+
+def test_wildcards_expand_to_recorded_metrics():
+    store = TimeSeriesStore()
+    store.record("mood.sad")
+    store.record("mood.happy")
+    store.record("votes")
+    assert list(store.query(["mood.*"], "hour")["series"]) == ["mood.happy", "mood.sad"]
+
+
+def test_prune_drops_expired_minute_buckets():
+    store = TimeSeriesStore()
+    store.record("votes", at=NOW - 2 * 86400)
+    store.prune()
+    assert not store.buckets["minute"]
+    assert store.buckets["hour"]
+
+
+def test_query_rejects_bad_ranges():
+    store = TimeSeriesStore()
+    with pytest.raises(ValueError):
+        store.query(["votes"], "week")
+    with pytest.raises(ValueError):
+        store.query(["votes"], "minute", start=NOW - 3600, end=NOW + 30 * 86400)
+
+
+def test_merged_snapshots_are_queried_but_not_persisted():
+    other = TimeSeriesStore()
+    other.record("votes", 5, at=NOW)
+    own = TimeSeriesStore()
+    own.record("votes", 1, at=NOW)
+    previous = own.to_state()
+
+    worker = TimeSeriesStore()
+    assert worker.load_state(previous)
+    assert worker.load_state(other.to_state(), own=False)
+    worker.record("votes", at=NOW)
+    assert worker.query(["votes"], "hour")["series"]["votes"][-1] == 7
+    # Only this worker's own counts are written back, so restarts don't multiply history
+    restarted = TimeSeriesStore()
+    restarted.load_state(worker.to_state())
+    assert restarted.query(["votes"], "hour")["series"]["votes"][-1] == 2
@@ -0,0 +1,119 @@
+import math
+import time
+
+import pytest
+
+from trending import BASE_WEIGHT, EVENT_WEIGHTS, T0, TrendingEngine, log_add, log_sub
+
+
+def test_log_arithmetic():
+    assert math.exp(log_add(math.log(2), math.log(3))) == pytest.approx(5)
+    assert math.exp(log_sub(math.log(5), math.log(3))) == pytest.approx(2)
+    assert log_sub(math.log(3), math.log(3)) == float("-inf")
+
+
+def test_quiet_confessions_trend_newest_first_behind_engagement():
+    now = time.time()
+    engine = TrendingEngine()
+    engine.add_confession("older", now - 7200)
+    engine.add_confession("newer", now - 60)
+    engine.add_confession("viewed", now - 7200)
+    engine.record("viewed", "view", now=now - 3600)
+    assert engine.top("24h", 10) == ["viewed", "newer", "older"]
+
+
+def test_engagement_weights_rank_confessions():
+    now = time.time()
+    engine = TrendingEngine()
+    for cid in ("upvoted", "replied", "viewed"):
+        engine.add_confession(cid, now - 60)
+    engine.record("upvoted", "upvote", now=now)
+    engine.record("replied", "reply", now=now)
+    engine.record("viewed", "view", now=now)
+    assert engine.top("24h", 10) == ["replied", "upvoted", "viewed"]
+
+
+def test_recent_events_outweigh_older_ones():
+    now = time.time()
+    engine = TrendingEngine()
+    engine.add_confession("old", now - 3600)
+    engine.add_confession("new", now - 3600)
+    engine.record("old", "reply", now=now - 3 * 3600)
+    engine.record("new", "reply", now=now)
+    assert engine.top("24h", 10) == ["new", "old"]
+
+
+def test_negative_weight_retracts_an_event():
+    now = time.time()
+    engine = TrendingEngine()
+    engine.add_confession("a", now)
+    engine.add_confession("b", now)
+    engine.record("a", "upvote", now=now)
+    engine.record("a", "upvote", now=now)
+    engine.record("b", "upvote", now=now)
+    assert engine.top("1h", 10) == ["a", "b"]
+    engine.record("a", "upvote", -EVENT_WEIGHTS["upvote"], now=now)
+    engine.record("a", "upvote", -EVENT_WEIGHTS["upvote"], now=now)
+    assert engine.top("1h", 10) == ["b", "a"]
+    assert engine.scores["1h"]["a"] < engine.scores["1h"]["b"]
+
+
+def test_retracting_an_old_event_at_its_own_time_cancels_it():
+    now = time.time()
+    engine = TrendingEngine()
+    engine.add_confession("flipped", now - 23 * 3600)
+    engine.add_confession("replied", now - 23 * 3600)
+    for cid in ("flipped", "replied"):
+        for _ in range(5):
+            engine.record(cid, "reply", now=now - 23 * 3600)
+    voted_at = now - 22 * 3600
+    engine.record("flipped", "upvote", now=voted_at)
+    engine.record("flipped", "upvote", -EVENT_WEIGHTS["upvote"], now=voted_at)
+    assert set(engine.top("24h", 10)) == {"flipped", "replied"}
+    assert engine.scores["24h"]["flipped"] == pytest.approx(engine.scores["24h"]["replied"])
+
+
+def test_oversized_retraction_stops_at_the_creation_weight():
+    now = time.time()
+    engine = TrendingEngine()
+    engine.add_confession("a", now - 3600)
+    # Warm-up replays counters at creation time; the vote being undone was recorded later
+    engine.record("a", "upvote", now=now - 3600)
+    engine.record("a", "upvote", -EVENT_WEIGHTS["upvote"], now=now)
+    assert engine.top("24h", 10) == ["a"]
+    floor = math.log(BASE_WEIGHT) + engine.rates["24h"] * (now - 3600 - T0)
+    assert engine.scores["24h"]["a"] == pytest.approx(floor)
+
+
+def test_timeframes_only_include_confessions_created_inside_them():
+    now = time.time()
+    engine = TrendingEngine()
+    engine.add_confession("today", now - 600)
+    engine.add_confession("last_week", now - 3 * 86400)
+    engine.record("today", "upvote", now=now)
+    engine.record("last_week", "reply", now=now)
+    assert engine.top("1h", 10) == ["today"]
+    assert engine.top("7d", 10) == ["last_week", "today"]
+
+
+def test_top_k_refills_after_a_leader_is_forgotten():
+    now = time.time()
+    engine = TrendingEngine(top_k=2)
+    for i, cid in enumerate(("a", "b", "c")):
+        engine.add_confession(cid, now)
+        engine.record(cid, "upvote", weight=3 - i, now=now)
+    assert engine.top("24h", 2) == ["a", "b"]
+    engine.forget("a")
+    assert engine.top("24h", 2) == ["b", "c"]
+
+
+def test_snapshot_round_trip():
+    now = time.time()
+    engine = TrendingEngine()
+    engine.add_confession("a", now)
+    engine.add_confession("b", now)
+    engine.record("b", "reply", now=now)
+    engine.record("a", "upvote", now=now)
+    restored = TrendingEngine()
+    assert restored.load_state(engine.to_state())
+    assert restored.top("24h", 10) == ["b", "a"]
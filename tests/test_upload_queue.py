@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from local_analysis import local_analysis
+from upload_queue import UploadQueue
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict) and "$lte" in condition:
+            if value is None or value > condition["$lte"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    """Just the Motor collection calls UploadQueue makes, over a list of dicts"""
+
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def count_documents(self, query):
+        return sum(matches(doc, query) for doc in self.docs)
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        found = [doc for doc in self.docs if matches(doc, query)]
+        for field, direction in reversed(sort or []):
+            found.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        if not found:
+            return None
+        found[0].update(update["$set"])
+        return dict(found[0])
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                doc.update(update["$set"])
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+    async def delete_one(self, query):
+        for doc in self.docs:
+            if matches(doc, query):
+                self.docs.remove(doc)
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+
+def make_queue():
+    queue = UploadQueue(FakeCollection())
+    confessions = FakeCollection()
+    confessions.docs.append({"id": "c1", "tx_id": None, "gateway_url": None, "verified": False})
+    return queue, {"confessions": confessions}
+
+
+def uploaded(request):
+    async def upload(_):
+        return {"success": True, "tx_id": request, "gateway_url": f"https://gateway/{request}"}
+    return upload
+
+
+def test_drain_fills_in_the_target_and_empties_the_queue():
+    queue, db = make_queue()
+
+    async def scenario():
+        await queue.enqueue({"data": "x"}, "confessions", "c1")
+        assert await queue.drain(db, uploaded("tx-1")) == 1
+        assert await queue.depth() == 0
+
+    asyncio.run(scenario())
+    assert db["confessions"].docs[0] == {"id": "c1", "tx_id": "tx-1", "gateway_url": "https://gateway/tx-1",
+                                         "verified": True}
+
+
+def test_failed_upload_backs_off_and_releases_the_lease():
+    queue, db = make_queue()
+
+    async def fail(_):
+        return {"success": False, "error": "irys down"}
+
+    async def scenario():
+        await queue.enqueue({"data": "x"}, "confessions", "c1")
+        assert await queue.drain(db, fail) == 0
+        assert await queue.claim() is None
+
+    asyncio.run(scenario())
+    item = queue.collection.docs[0]
+    assert item["attempts"] == 1
+    assert item["last_error"] == "irys down"
+    assert item["lease"] is None
+    assert item["next_attempt"] > datetime.utcnow() + timedelta(seconds=30)
+    assert db["confessions"].docs[0]["tx_id"] is None
+
+
+def test_claimed_items_are_not_handed_out_twice():
+    queue, db = make_queue()
+
+    async def scenario():
+        await queue.enqueue({"data": "x"}, "confessions", "c1")
+        first = await queue.claim()
+        assert first["lease"]
+        assert await queue.claim() is None
+
+    asyncio.run(scenario())
+
+
+def test_only_the_current_lease_holder_records_the_upload():
+    queue, db = make_queue()
+
+    async def scenario():
+        await queue.enqueue({"data": "x"}, "confessions", "c1")
+
+        async def slow_upload(_):
+            # The lease runs out mid-upload and another worker claims the item
+            queue.collection.docs[0]["next_attempt"] = datetime.utcnow() - timedelta(seconds=1)
+            assert await queue.claim() is not None
+            return {"success": True, "tx_id": "tx-stale", "gateway_url": "https://gateway/tx-stale"}
+
+        assert await queue.drain(db, slow_upload, limit=1) == 0
+        assert await queue.depth() == 1
+
+    asyncio.run(scenario())
+    assert db["confessions"].docs[0]["tx_id"] is None
+
+
+def test_local_moderation_fails_closed():
+    result = local_analysis("I feel hopeless and worthless", "moderation")
+    assert result["recommended_action"] == "flag"
+    assert result["toxic"] is None
+    assert result["crisis_level"] == "medium"
+    assert local_analysis("just a normal day", "moderation")["recommended_action"] == "flag"
+
+
+def test_local_enhancement_keeps_the_author_mood():
+    result = local_analysis("new job #Work #life #work", "enhancement")
+    assert "mood" not in result
+    assert result["tags"] == ["work", "life"]